@@ -1,4 +1,5 @@
 import os
+import redis
 import logging
 
 # Basic logging configuration for consistency
@@ -8,4 +9,70 @@ logger = logging.getLogger("AlertService")
 # Infrastructure & Integration Settings
 KAFKA_BROKER = os.environ.get("KAFKA_BROKER", "kafka:9092")
 KAFKA_ALERTS_TOPIC = "monitoring-alerts"
+# Fallback channel for alerts whose owner has no Slack webhook of their own
 SLACK_WEBHOOK_URL = os.environ.get("SLACK_WEBHOOK_URL", "")
+REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+USER_SERVICE_URL = os.environ.get("USER_SERVICE_URL", "http://user_service:5000")
+INTERNAL_API_KEY = os.environ.get("INTERNAL_API_KEY")
+KAFKA_CONSUMER_GROUP = "alert-service-group-v1.6"
+
+# Dispatch: alerts are sent concurrently, with a bound on sends in flight and
+# on alerts waiting (a full dispatcher pauses consumption)
+ALERT_MAX_IN_FLIGHT = int(os.environ.get("ALERT_MAX_IN_FLIGHT", 20))
+ALERT_MAX_PENDING = int(os.environ.get("ALERT_MAX_PENDING", 1000))
+ALERT_BATCH_SIZE = int(os.environ.get("ALERT_BATCH_SIZE", 100))
+COMMIT_INTERVAL_SECONDS = float(os.environ.get("COMMIT_INTERVAL_SECONDS", 1))
+# An alert that could not be delivered or handed off keeps its offset
+# uncommitted and is dispatched again with backoff; consumption pauses meanwhile
+REDISPATCH_BACKOFF_BASE = float(os.environ.get("REDISPATCH_BACKOFF_BASE", 5))
+REDISPATCH_BACKOFF_MAX = float(os.environ.get("REDISPATCH_BACKOFF_MAX", 300))
+SLACK_TIMEOUT = float(os.environ.get("SLACK_TIMEOUT", 10))
+# Per-destination token bucket (Slack webhooks allow about one message a second)
+DESTINATION_RATE_PER_SECOND = float(os.environ.get("DESTINATION_RATE_PER_SECOND", 1))
+DESTINATION_BURST = int(os.environ.get("DESTINATION_BURST", 5))
+# In-process retries for transient failures (timeouts, 5xx)
+SEND_MAX_ATTEMPTS = int(os.environ.get("SEND_MAX_ATTEMPTS", 3))
+SEND_BACKOFF_BASE = float(os.environ.get("SEND_BACKOFF_BASE", 1))
+# Storm coalescing: past THRESHOLD alerts per destination within WINDOW
+# seconds, further alerts go out as one digest per window
+COALESCE_WINDOW_SECONDS = float(os.environ.get("COALESCE_WINDOW_SECONDS", 10))
+COALESCE_THRESHOLD = int(os.environ.get("COALESCE_THRESHOLD", 5))
+DIGEST_MAX_LINES = int(os.environ.get("DIGEST_MAX_LINES", 20))
+# Route cache (monitor -> owner -> channels): delta sync period, full reload
+# period, and how long a lookup of an unknown monitor waits for a refresh
+ROUTE_REFRESH_SECONDS = float(os.environ.get("ROUTE_REFRESH_SECONDS", 10))
+ROUTE_FULL_REFRESH_SECONDS = float(os.environ.get("ROUTE_FULL_REFRESH_SECONDS", 600))
+ROUTE_MISS_WAIT_SECONDS = float(os.environ.get("ROUTE_MISS_WAIT_SECONDS", 2))
+# Durable retries of failed notifications (Redis sorted set + dead letters)
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", 8))
+RETRY_BACKOFF_BASE = float(os.environ.get("RETRY_BACKOFF_BASE", 5))
+RETRY_BACKOFF_MAX = float(os.environ.get("RETRY_BACKOFF_MAX", 1800))
+RETRY_POLL_SECONDS = float(os.environ.get("RETRY_POLL_SECONDS", 1))
+RETRY_BATCH_SIZE = int(os.environ.get("RETRY_BATCH_SIZE", 50))
+RETRY_LEASE_SECONDS = float(os.environ.get("RETRY_LEASE_SECONDS", 120))
+DEAD_LETTER_MAX = int(os.environ.get("DEAD_LETTER_MAX", 10000))
+# Email channel: alerts also go to the owner's notification address when an
+# SMTP relay is configured; sessions are pooled and reused across alerts
+SMTP_HOST = os.environ.get("SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_USERNAME = os.environ.get("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_SSL = os.environ.get("SMTP_SSL", "false").lower() == "true"
+SMTP_FROM = os.environ.get("SMTP_FROM", "alerts@uptime.local")
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 4))
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 10))
+SMTP_IDLE_CHECK_SECONDS = float(os.environ.get("SMTP_IDLE_CHECK_SECONDS", 30))
+METRICS_LOG_SECONDS = int(os.environ.get("METRICS_LOG_SECONDS", 30))
+
+def get_redis_client():
+    """Initializes and returns a Redis client."""
+    try:
+        client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+        # Verify connection immediately
+        client.ping()
+        return client
+    except Exception as e:
+        logger.error(f"Redis initialization failed: {e}")
+        return None
@@ -1,31 +1,138 @@
-from confluent_kafka import Consumer, KafkaError
+from confluent_kafka import Consumer, KafkaError, TopicPartition
 import json
+import threading
 import time
-from app.config import logger, KAFKA_BROKER, KAFKA_ALERTS_TOPIC
-from app.services.notifier import handle_alert_event
+from app.config import (
+    logger, KAFKA_BROKER, KAFKA_ALERTS_TOPIC, KAFKA_CONSUMER_GROUP,
+    ALERT_BATCH_SIZE, COMMIT_INTERVAL_SECONDS, METRICS_LOG_SECONDS,
+    REDISPATCH_BACKOFF_BASE, REDISPATCH_BACKOFF_MAX
+)
+from app.services.notifier import handle_alert_event, dispatcher, coalescer, routes, retry_queue, smtp_pool
+from app.services.offsets import OffsetTracker
+
+# Offsets are committed only once every earlier alert of the partition is settled
+offset_tracker = OffsetTracker()
+
+# Alerts neither delivered nor handed off, waiting to be dispatched again to
+# the destinations that failed (None = route again):
+# [(due, partition, offset, data, attempts, destinations)]
+redispatch = []
+redispatch_lock = threading.Lock()
+paused = []  # Partitions held back meanwhile
+
+def schedule_redispatch(partition: int, offset: int, data: dict, attempts: int, destinations):
+    """Keep the offset unsettled and dispatch the alert again after a backoff."""
+    delay = min(REDISPATCH_BACKOFF_MAX, REDISPATCH_BACKOFF_BASE * 2 ** attempts)
+    logger.error(
+        f"Alert at {partition}:{offset} could not be delivered or queued; dispatching again in {delay:.0f}s."
+    )
+    with redispatch_lock:
+        redispatch.append((time.monotonic() + delay, partition, offset, data, attempts + 1, destinations))
+
+def settle(partition: int, offset: int, data: dict, attempts: int = 0):
+    """
+    Completion callback for one alert.
+
+    Delivered (or stored for retry) everywhere settles the offset.
+    Otherwise the offset stays unsettled, so it is not committed, and the
+    alert is dispatched again to the failed destinations only.
+    """
+    def on_done(failed: list):
+        if not failed:
+            offset_tracker.done(partition, offset)
+            return
+        schedule_redispatch(partition, offset, data, attempts, failed)
+    return on_done
+
+def redispatch_due() -> bool:
+    """Dispatch again the alerts whose backoff ran out; True while any still wait."""
+    now = time.monotonic()
+    with redispatch_lock:
+        due = [entry for entry in redispatch if entry[0] <= now]
+        redispatch[:] = [entry for entry in redispatch if entry[0] > now]
+    for _, partition, offset, data, attempts, destinations in due:
+        try:
+            handle_alert_event(data, settle(partition, offset, data, attempts), destinations)
+        except Exception as e:
+            logger.error(f"Failed to dispatch alert again: {e}")
+            schedule_redispatch(partition, offset, data, attempts, destinations)
+    with redispatch_lock:
+        return bool(redispatch)
+
+def dispatch(msg):
+    offset_tracker.track(msg.partition(), msg.offset())
+    try:
+        # Decode and queue the alert event; delivery happens on the dispatcher
+        data = json.loads(msg.value().decode('utf-8'))
+    except Exception as e:
+        # Unreadable: nothing could ever deliver it
+        logger.error(f"Dropping undecodable alert at {msg.partition()}:{msg.offset()}: {e}")
+        offset_tracker.done(msg.partition(), msg.offset())
+        return
+    logger.debug(f"Handling alert event for {data.get('url')}")
+    try:
+        handle_alert_event(data, settle(msg.partition(), msg.offset(), data))
+    except Exception as e:
+        logger.error(f"Failed to dispatch alert for monitor: {e}")
+        schedule_redispatch(msg.partition(), msg.offset(), data, 0, None)
+
+def commit_settled(consumer, asynchronous=True):
+    positions = offset_tracker.release()
+    if not positions:
+        return
+    try:
+        consumer.commit(
+            offsets=[TopicPartition(KAFKA_ALERTS_TOPIC, p, o) for p, o in positions.items()],
+            asynchronous=asynchronous
+        )
+    except Exception as e:
+        logger.warning(f"Offset commit failed: {e}")
+
+def log_metrics():
+    logger.info(
+        f"Alert pipeline: dispatch={dispatcher.stats()} coalescer={coalescer.stats()} "
+        f"routes={routes.stats()} retry={retry_queue.stats()} unsettled={offset_tracker.pending()} "
+        f"redispatch={len(redispatch)}"
+        + (f" smtp={smtp_pool.stats()}" if smtp_pool else "")
+    )
+
+def on_revoke(consumer, partitions):
+    """Rebalance: settle held and in-flight alerts and commit them before handing over."""
+    coalescer.flush_all()
+    dispatcher.drain(timeout=30)
+    commit_settled(consumer, asynchronous=False)
+    revoked = {tp.partition for tp in partitions}
+    offset_tracker.forget(revoked)
+    # Uncommitted, so the new owner reads them again
+    with redispatch_lock:
+        redispatch[:] = [entry for entry in redispatch if entry[1] not in revoked]
+    # A new assignment starts unpaused
+    paused.clear()
 
 def run_alert_worker():
     """
     Main worker loop for alert processing.
-    
-    Subscribes to the 'monitoring-alerts' topic to handle pre-filtered 
-    incident events.
+
+    Subscribes to the 'monitoring-alerts' topic to handle pre-filtered
+    incident events. Alerts are handed to the dispatcher, which delivers
+    them concurrently; offsets are committed once the alerts up to them
+    are settled.
     """
-    logger.info(f"Alert Worker initializing. Group: alert-service-v1.6")
-    
+    logger.info(f"Alert Worker initializing. Group: {KAFKA_CONSUMER_GROUP}")
+
     conf = {
         'bootstrap.servers': KAFKA_BROKER,
-        'group.id': 'alert-service-group-v1.6',
+        'group.id': KAFKA_CONSUMER_GROUP,
         'auto.offset.reset': 'latest',
-        'enable.auto.commit': True
+        'enable.auto.commit': False
     }
-    
+
     consumer = None
     # Wait for Kafka to become available
     for i in range(20):
         try:
             consumer = Consumer(conf)
-            consumer.subscribe([KAFKA_ALERTS_TOPIC])
+            consumer.subscribe([KAFKA_ALERTS_TOPIC], on_revoke=on_revoke)
             logger.info(f"Alert Service online and listening to: {KAFKA_ALERTS_TOPIC}")
             break
         except Exception as e:
@@ -36,27 +143,51 @@ def run_alert_worker():
         logger.error("Alert Worker failed to start: No Kafka connection.")
         return
 
+    routes.start()
+    dispatcher.start()
+    coalescer.start()
+    # Retries only take free dispatcher capacity, never blocking fresh alerts
+    retry_queue.start(lambda channel, target, payload, on_done: dispatcher.submit(
+        channel, target, payload, on_done, block=False
+    ))
+    last_commit = last_metrics = time.monotonic()
     try:
         while True:
+            # Hold back new alerts while earlier ones cannot even be handed off
+            if redispatch_due():
+                fresh = [tp for tp in consumer.assignment() if tp not in paused]
+                if fresh:
+                    consumer.pause(fresh)
+                    paused.extend(fresh)
+                    logger.warning("Alert consumption paused until undeliverable alerts are handed off.")
+            elif paused:
+                consumer.resume(paused)
+                paused.clear()
+                logger.info("Alert consumption resumed.")
+
             # Poll frequently for fast response times
-            msg = consumer.poll(1.0)
-            if msg is None:
-                continue
-            if msg.error():
-                if msg.error().code() == KafkaError._PARTITION_EOF:
+            messages = consumer.consume(num_messages=ALERT_BATCH_SIZE, timeout=1.0)
+            for msg in messages:
+                if msg.error():
+                    if msg.error().code() != KafkaError._PARTITION_EOF:
+                        logger.error(f"Kafka worker error: {msg.error()}")
                     continue
-                logger.error(f"Kafka worker error: {msg.error()}")
-                continue
+                dispatch(msg)
 
-            try:
-                # Decode and process the alert event
-                data = json.loads(msg.value().decode('utf-8'))
-                logger.debug(f"Handling alert event for {data.get('url')}")
-                handle_alert_event(data)
-            except Exception as e:
-                logger.error(f"Failed to dispatch alert for monitor: {e}")
+            if time.monotonic() - last_commit >= COMMIT_INTERVAL_SECONDS:
+                commit_settled(consumer)
+                last_commit = time.monotonic()
+            if time.monotonic() - last_metrics >= METRICS_LOG_SECONDS:
+                log_metrics()
+                last_metrics = time.monotonic()
 
     finally:
+        # Deliver what is held and in flight, then commit it
+        coalescer.stop()
+        dispatcher.stop()
+        if smtp_pool:
+            smtp_pool.close()
+        commit_settled(consumer, asynchronous=False)
         consumer.close()
 
 if __name__ == "__main__":
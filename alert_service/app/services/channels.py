@@ -0,0 +1,213 @@
+from email.message import EmailMessage
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import queue
+import smtplib
+import ssl
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from app.config import logger
+
+def parse_retry_after(value, default: float = 1.0) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+class SlackChannel:
+    """
+    Posts messages to Slack incoming webhooks over pooled keep-alive connections.
+
+    `send` never raises. It returns (delivered, retryable, retry_after):
+    retry_after is set when Slack answered 429 and says when to try again.
+    """
+    name = "slack"
+
+    def __init__(self, timeout: float, pool_size: int):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def send(self, target: str, payload: dict) -> tuple:
+        try:
+            response = self.session.post(target, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Slack unreachable: {e}")
+            return False, True, None
+
+        if response.status_code == 429:
+            return False, True, parse_retry_after(response.headers.get("Retry-After"))
+        if response.status_code >= 500:
+            logger.warning(f"Slack returned {response.status_code}.")
+            return False, True, None
+        if response.status_code >= 400:
+            # Revoked or malformed webhook: retrying cannot help
+            logger.error(f"Slack rejected the notification ({response.status_code}): {response.text[:200]}")
+            return False, False, None
+        return True, False, None
+
+class SMTPPool:
+    """
+    Bounded pool of authenticated SMTP sessions.
+
+    Sessions are handed out most recently used first and kept open between
+    messages, so TLS and AUTH happen once per session rather than per
+    alert. A session idle for longer than `idle_check` is probed with NOOP
+    before reuse, and one the server dropped is replaced transparently.
+    At most `size` sessions exist; callers beyond that wait for one.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str,
+                 starttls: bool, use_ssl: bool, size: int, timeout: float, idle_check: float):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self._idle = queue.LifoQueue()  # (session, last used)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+        # Counters exposed through stats()
+        self.opened = 0
+        self.reused = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            session = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                       context=ssl.create_default_context())
+        else:
+            session = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            session.ehlo()
+            if self.starttls and not self.use_ssl:
+                session.starttls(context=ssl.create_default_context())
+                session.ehlo()
+            if self.username:
+                session.login(self.username, self.password)
+        except Exception:
+            self._discard(session)
+            raise
+        with self._lock:
+            self.opened += 1
+        return session
+
+    @staticmethod
+    def _discard(session):
+        try:
+            session.quit()
+        except Exception:
+            session.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                session, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used > self.idle_check:
+                # Servers drop idle sessions; find out before sending on one
+                try:
+                    if session.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP refused")
+                except (smtplib.SMTPException, OSError):
+                    session.close()
+                    continue
+            with self._lock:
+                self.reused += 1
+            return session
+
+    def send(self, message: EmailMessage, fresh: bool = False):
+        """
+        Send on a pooled session, opening one if none is idle (or `fresh`).
+
+        A session is returned to the pool after a successful send or a
+        refusal of this message; on any other error it is discarded.
+        """
+        with self._slots:
+            session = self._connect() if fresh else self._checkout()
+            try:
+                session.send_message(message)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # The server refused this message but the session is still usable
+                try:
+                    session.rset()
+                    self._idle.put((session, time.monotonic()))
+                except (smtplib.SMTPException, OSError):
+                    session.close()
+                raise
+            except Exception:
+                session.close()
+                raise
+            self._idle.put((session, time.monotonic()))
+
+    def close(self):
+        while True:
+            try:
+                session, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(session)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": self._idle.qsize(), "opened": self.opened, "reused": self.reused}
+
+class EmailChannel:
+    """
+    Sends alerts by email over a pool of persistent SMTP sessions.
+
+    Used by the dispatcher like the Slack channel, so emails go out on the
+    same sender threads, concurrently with Slack and rate limited per
+    recipient. `send` never raises and returns (delivered, retryable,
+    retry_after); SMTP never asks for a delay, so retry_after is None.
+    A session that turns out to be dead is replaced and the message resent
+    once on a new one before the failure counts.
+    """
+    name = "email"
+
+    def __init__(self, pool: SMTPPool, sender: str):
+        self.pool = pool
+        self.sender = sender
+
+    def send(self, target: str, payload: dict) -> tuple:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = target
+        message["Subject"] = payload["subject"]
+        message.set_content(payload["text"])
+
+        for fresh in (False, True):
+            try:
+                self.pool.send(message, fresh=fresh)
+                return True, False, None
+            except smtplib.SMTPServerDisconnected as e:
+                if not fresh:
+                    continue
+                logger.warning(f"SMTP server disconnected: {e}")
+                return False, True, None
+            except smtplib.SMTPRecipientsRefused as e:
+                codes = [code for code, _ in e.recipients.values()]
+                logger.error(f"SMTP refused recipient {target}: {codes}")
+                return False, all(400 <= code < 500 for code in codes), None
+            except smtplib.SMTPResponseException as e:
+                # 4xx is temporary (greylisting, throttling); 5xx is final
+                logger.warning(f"SMTP error {e.smtp_code} for {target}: {e.smtp_error!r}")
+                return False, 400 <= e.smtp_code < 500, None
+            except (smtplib.SMTPException, OSError) as e:
+                logger.warning(f"SMTP unreachable: {e}")
+                return False, True, None
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+from app.config import logger
+
+class AlertCoalescer:
+    """
+    Folds alert storms into one digest per destination and window.
+
+    Up to `threshold` alerts per destination within `window` seconds go out
+    immediately, one message each. Beyond that, alerts are held and sent as
+    a single digest when the window closes, so a storm costs one message per
+    window and no alert waits longer than `window`.
+
+    `emit(destination, events)` does the sending; `events` is a list of
+    (data, on_done) with a single entry outside storms. A background thread
+    flushes due digests.
+    """
+
+    def __init__(self, window: float, threshold: int, emit):
+        self.window = window
+        self.threshold = threshold
+        self._emit = emit
+        self._cond = threading.Condition()
+        self._recent = {}  # { destination: deque of send times within the window }
+        self._held = {}  # { destination: (flush_at, [(data, on_done)]) }
+        self._running = False
+
+        # Counters exposed through stats()
+        self.digests = 0
+        self.coalesced = 0
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, name="alert-coalescer", daemon=True).start()
+
+    def add(self, destination, data: dict, on_done=None):
+        now = time.monotonic()
+        with self._cond:
+            held = self._held.get(destination)
+            if held is not None:
+                held[1].append((data, on_done))
+                return
+
+            recent = self._recent.setdefault(destination, deque())
+            while recent and recent[0] <= now - self.window:
+                recent.popleft()
+            if len(recent) < self.threshold:
+                recent.append(now)
+                send_now = True
+            else:
+                # Storm: hold this and following alerts until the window closes
+                self._held[destination] = (now + self.window, [(data, on_done)])
+                self._cond.notify_all()
+                send_now = False
+
+        if send_now:
+            self._emit(destination, [(data, on_done)])
+
+    def _run(self):
+        while self._running:
+            with self._cond:
+                now = time.monotonic()
+                due = [d for d, (flush_at, _) in self._held.items() if flush_at <= now]
+                if not due:
+                    next_at = min((flush_at for flush_at, _ in self._held.values()), default=None)
+                    self._cond.wait(None if next_at is None else next_at - now)
+                    continue
+            for destination in due:
+                self._flush(destination)
+
+    def _flush(self, destination):
+        with self._cond:
+            held = self._held.pop(destination, None)
+            if held is None:
+                return
+            events = held[1]
+            # The digest counts towards the next window, so the storm stays coalesced
+            self._recent.setdefault(destination, deque()).append(time.monotonic())
+            if len(events) > 1:
+                self.digests += 1
+                self.coalesced += len(events)
+        try:
+            self._emit(destination, events)
+        except Exception as e:
+            logger.error(f"Failed to emit digest of {len(events)} alert(s): {e}")
+
+    def flush_all(self):
+        """Send everything held now (before a rebalance or shutdown)."""
+        with self._cond:
+            destinations = list(self._held)
+        for destination in destinations:
+            self._flush(destination)
+
+    def stop(self):
+        self.flush_all()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "held": sum(len(events) for _, events in self._held.values()),
+                "digests": self.digests,
+                "coalesced": self.coalesced
+            }
@@ -0,0 +1,211 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from app.config import logger
+
+class RateLimiter:
+    """
+    Token bucket for one destination, plus a block honoring Retry-After.
+
+    Not thread-safe on its own; the dispatcher calls it under its lock.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Monotonic time at which the next send may start."""
+        self._refill(now)
+        if self.blocked_until > now:
+            return self.blocked_until
+        if self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst and self.blocked_until <= now
+
+class AlertDispatcher:
+    """
+    Sends notifications concurrently without blocking the Kafka consumer.
+
+    Notifications are queued per destination (channel + target) and started
+    by a scheduler thread on a bounded pool of sender threads, as long as
+    fewer than `max_in_flight` sends are running and the destination's rate
+    limiter allows it. A 429 blocks only its destination for the time the
+    server asks for; timeouts and 5xx are retried with backoff up to
+    `max_attempts`. Each notification ends in exactly one on_done(delivered)
+    call, from a sender thread.
+
+    `submit` blocks while `max_pending` notifications are waiting, which
+    pauses consumption during a storm instead of growing memory.
+    """
+
+    def __init__(self, channels: dict, max_in_flight: int, max_pending: int,
+                 rate: float, burst: int, max_attempts: int, backoff_base: float):
+        self.channels = channels  # { name: channel with send(target, payload) }
+        self.max_in_flight = max_in_flight
+        self.max_pending = max_pending
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+
+        self._cond = threading.Condition()
+        self._queues = {}  # { (channel, target): deque of jobs }
+        self._limiters = {}  # { (channel, target): RateLimiter }
+        self._in_flight = 0
+        self._pending = 0
+        self._running = False
+        self._executor = ThreadPoolExecutor(max_in_flight, thread_name_prefix="alert-send")
+        self._scheduler = None
+
+        # Counters exposed through stats()
+        self.delivered = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    def start(self):
+        self._running = True
+        self._scheduler = threading.Thread(target=self._schedule, name="alert-dispatch", daemon=True)
+        self._scheduler.start()
+
+    def submit(self, channel: str, target: str, payload: dict, on_done=None, block: bool = True) -> bool:
+        """
+        Queue a notification; on_done(delivered: bool) is called once it is settled.
+
+        With block=False, returns False instead of waiting when the
+        dispatcher is full.
+        """
+        job = {"payload": payload, "on_done": on_done, "attempts": 0, "not_before": 0.0}
+        key = (channel, target)
+        with self._cond:
+            while self._pending >= self.max_pending:
+                if not block:
+                    return False
+                self._cond.wait()
+            self._queues.setdefault(key, deque()).append(job)
+            if key not in self._limiters:
+                self._limiters[key] = RateLimiter(self.rate, self.burst)
+            self._pending += 1
+            self._cond.notify_all()
+        return True
+
+    def _schedule(self):
+        with self._cond:
+            while self._running or self._pending:
+                wake_at = self._launch_ready(time.monotonic())
+                timeout = None if wake_at is None else max(0.0, wake_at - time.monotonic())
+                self._cond.wait(timeout)
+
+    def _launch_ready(self, now: float):
+        """Start every send that may start now; returns the next time one may (or None)."""
+        wake_at = None
+        for key in list(self._queues):
+            queue = self._queues[key]
+            limiter = self._limiters[key]
+            if not queue:
+                if limiter.idle(now):
+                    del self._queues[key]
+                    del self._limiters[key]
+                continue
+            while queue and self._in_flight < self.max_in_flight:
+                ready = max(limiter.ready_at(now), queue[0]["not_before"])
+                if ready > now:
+                    wake_at = ready if wake_at is None else min(wake_at, ready)
+                    break
+                job = queue.popleft()
+                limiter.take()
+                self._in_flight += 1
+                self._executor.submit(self._send, key, job)
+        return wake_at
+
+    def _send(self, key: tuple, job: dict):
+        channel, target = key
+        try:
+            delivered, retryable, retry_after = self.channels[channel].send(target, job["payload"])
+        except Exception as e:
+            logger.error(f"Unexpected {channel} send failure: {e}")
+            delivered, retryable, retry_after = False, False, None
+
+        settled = True
+        with self._cond:
+            self._in_flight -= 1
+            # The destination may have been pruned while this send was running
+            limiter = self._limiters.setdefault(key, RateLimiter(self.rate, self.burst))
+            if retry_after is not None:
+                # Rate limited: not the message's fault, so no attempt is spent
+                self.rate_limited += 1
+                limiter.block(retry_after)
+                self._queues.setdefault(key, deque()).appendleft(job)
+                settled = False
+            elif not delivered and retryable and job["attempts"] + 1 < self.max_attempts:
+                job["attempts"] += 1
+                backoff = self.backoff_base * 2 ** (job["attempts"] - 1)
+                job["not_before"] = time.monotonic() + random.uniform(0, backoff)
+                self._queues.setdefault(key, deque()).appendleft(job)
+                settled = False
+            elif delivered:
+                self.delivered += 1
+            else:
+                self.failed += 1
+            self._cond.notify_all()
+        if not settled:
+            return
+
+        if job["on_done"]:
+            try:
+                job["on_done"](delivered)
+            except Exception as e:
+                logger.error(f"Alert completion callback failed: {e}")
+        # Counted as pending until settled, so drain() covers the callbacks
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until every submitted notification is settled."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 30):
+        if not self.drain(timeout):
+            logger.warning(f"Stopping with {self._pending} notification(s) unsent.")
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": self._pending,
+                "in_flight": self._in_flight,
+                "destinations": len(self._queues),
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "rate_limited": self.rate_limited
+            }
@@ -1,28 +1,92 @@
-import requests
-from app.config import logger, SLACK_WEBHOOK_URL
+import threading
+from app.config import (
+    logger, SLACK_WEBHOOK_URL, SLACK_TIMEOUT, ALERT_MAX_IN_FLIGHT, ALERT_MAX_PENDING,
+    DESTINATION_RATE_PER_SECOND, DESTINATION_BURST, SEND_MAX_ATTEMPTS, SEND_BACKOFF_BASE,
+    COALESCE_WINDOW_SECONDS, COALESCE_THRESHOLD, DIGEST_MAX_LINES,
+    ROUTE_REFRESH_SECONDS, ROUTE_FULL_REFRESH_SECONDS, ROUTE_MISS_WAIT_SECONDS,
+    get_redis_client, RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX,
+    RETRY_POLL_SECONDS, RETRY_BATCH_SIZE, RETRY_LEASE_SECONDS, DEAD_LETTER_MAX,
+    SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_STARTTLS, SMTP_SSL,
+    SMTP_FROM, SMTP_POOL_SIZE, SMTP_TIMEOUT, SMTP_IDLE_CHECK_SECONDS
+)
+from app.services.channels import SlackChannel, EmailChannel, SMTPPool
+from app.services.coalescer import AlertCoalescer
+from app.services.dispatcher import AlertDispatcher
+from app.services.retry_queue import RetryQueue
+from app.services.routes import RouteCache
 
-def send_slack_notification(message: str):
+channels = {"slack": SlackChannel(SLACK_TIMEOUT, ALERT_MAX_IN_FLIGHT)}
+# Email is only offered when an SMTP relay is configured
+smtp_pool = None
+if SMTP_HOST:
+    smtp_pool = SMTPPool(
+        SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD,
+        starttls=SMTP_STARTTLS,
+        use_ssl=SMTP_SSL,
+        size=SMTP_POOL_SIZE,
+        timeout=SMTP_TIMEOUT,
+        idle_check=SMTP_IDLE_CHECK_SECONDS
+    )
+    channels["email"] = EmailChannel(smtp_pool, SMTP_FROM)
+
+# Concurrent, rate-limited delivery shared by every alert
+dispatcher = AlertDispatcher(
+    channels,
+    max_in_flight=ALERT_MAX_IN_FLIGHT,
+    max_pending=ALERT_MAX_PENDING,
+    rate=DESTINATION_RATE_PER_SECOND,
+    burst=DESTINATION_BURST,
+    max_attempts=SEND_MAX_ATTEMPTS,
+    backoff_base=SEND_BACKOFF_BASE
+)
+
+# Notifications that failed in-process retries wait here for another attempt;
+# it connects to Redis on first use, so Redis may come up after this service
+retry_queue = RetryQueue(
+    get_redis_client, "alerts:retry",
+    max_attempts=RETRY_MAX_ATTEMPTS,
+    backoff_base=RETRY_BACKOFF_BASE,
+    backoff_max=RETRY_BACKOFF_MAX,
+    poll_seconds=RETRY_POLL_SECONDS,
+    batch_size=RETRY_BATCH_SIZE,
+    lease_seconds=RETRY_LEASE_SECONDS,
+    dead_letter_max=DEAD_LETTER_MAX
+)
+
+def deliver(channel: str, target: str, payload: dict, on_done=None):
+    """
+    Send through the dispatcher; a notification that still fails is handed
+    to the durable retry queue, and counts as settled once stored there.
+    If it cannot be stored either, on_done(False) leaves it unsettled.
     """
-    Format and send a notification to a Slack channel.
+    def settled(delivered: bool):
+        if not delivered:
+            delivered = retry_queue.push(channel, target, payload)
+        if on_done:
+            on_done(delivered)
+
+    dispatcher.submit(channel, target, payload, settled)
+
+def send_slack_notification(message: str, on_done=None, webhook_url: str = SLACK_WEBHOOK_URL):
+    """
+    Queue a notification for a Slack channel.
+
+    Delivery happens on the dispatcher; on_done(delivered) is called once
+    the message is sent or has finally failed.
     """
-    if not SLACK_WEBHOOK_URL:
+    if not webhook_url:
         # Avoid crashing if the webhook isn't configured
         logger.warning(f"Notification skipped: No Slack Webhook configured. Message: {message}")
+        if on_done:
+            on_done(True)
         return
-    
-    try:
-        payload = {"text": message}
-        # 10s timeout to prevent hanging the worker on Slack outages
-        response = requests.post(SLACK_WEBHOOK_URL, json=payload, timeout=10)
-        response.raise_for_status()
-        logger.info("Slack notification dispatched successfully.")
-    except Exception as e:
-        logger.error(f"Failed to transmit Slack alert: {e}")
-
-def handle_alert_event(data: dict):
+
+    deliver("slack", webhook_url, {"text": message}, on_done)
+
+def format_alert(data: dict) -> str:
     """
     Convert a raw Kafka alert event into a user-friendly notification.
-    
+
     Emojis and markdown are used to improve readability on Slack clients.
     """
     url = data.get('url', 'Unknown URL')
@@ -30,21 +94,124 @@ def handle_alert_event(data: dict):
     status_code = data.get('status_code', 'N/A')
     latency = data.get('latency_ms', 'N/A')
     error_details = data.get('error', 'N/A')
-    
+
     if event_type == "DOWN":
-        msg = (
+        return (
             f"🚨 *MONITOR CRITICAL: Site is DOWN!* 🚨\n"
             f"*URL:* {url}\n"
             f"*Status Code:* {status_code}\n"
             f"*Latency:* {latency}ms\n"
             f"*Error Details:* {error_details}"
         )
+    # Recognition of recovery is just as important as the downtime alert
+    return (
+        f"✅ *MONITOR RECOVERY: Site back ONLINE!* ✅\n"
+        f"*URL:* {url}\n"
+        f"*Latency:* {latency}ms"
+    )
+
+def format_digest(alerts: list) -> str:
+    """One compact message for a burst of alerts, grouped by event type."""
+    down = [a for a in alerts if a.get('event_type') == "DOWN"]
+    up = [a for a in alerts if a.get('event_type') != "DOWN"]
+    sections = []
+    if down:
+        lines = [f"🚨 *{len(down)} monitor{'s' if len(down) != 1 else ''} DOWN*"]
+        lines += [
+            f"• {a.get('url', 'Unknown URL')} ({a.get('status_code') or a.get('error') or 'N/A'})"
+            for a in down[:DIGEST_MAX_LINES]
+        ]
+        if len(down) > DIGEST_MAX_LINES:
+            lines.append(f"…and {len(down) - DIGEST_MAX_LINES} more")
+        sections.append("\n".join(lines))
+    if up:
+        lines = [f"✅ *{len(up)} monitor{'s' if len(up) != 1 else ''} back ONLINE*"]
+        lines += [f"• {a.get('url', 'Unknown URL')}" for a in up[:DIGEST_MAX_LINES]]
+        if len(up) > DIGEST_MAX_LINES:
+            lines.append(f"…and {len(up) - DIGEST_MAX_LINES} more")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+def format_subject(alerts: list) -> str:
+    """Email subject line for one alert or a digest."""
+    if len(alerts) == 1:
+        state = "DOWN" if alerts[0].get('event_type') == "DOWN" else "back ONLINE"
+        return f"[Uptime] {alerts[0].get('url', 'Unknown URL')} is {state}"
+    down = sum(1 for a in alerts if a.get('event_type') == "DOWN")
+    return f"[Uptime] {down} monitor(s) DOWN, {len(alerts) - down} back ONLINE"
+
+def emit(destination, events: list):
+    """Send one alert as is, or several as a digest; settles every event."""
+    callbacks = [on_done for _, on_done in events if on_done]
+
+    def on_done(delivered: bool):
+        for callback in callbacks:
+            callback(delivered)
+
+    alerts = [data for data, _ in events]
+    message = format_alert(alerts[0]) if len(alerts) == 1 else format_digest(alerts)
+    channel, target = destination
+    if channel == "email":
+        # Slack markup reads as noise in a plain-text email
+        deliver("email", target, {"subject": format_subject(alerts), "text": message.replace("*", "")}, on_done)
     else:
-        # Recognition of recovery is just as important as the downtime alert
-        msg = (
-            f"✅ *MONITOR RECOVERY: Site back ONLINE!* ✅\n"
-            f"*URL:* {url}\n"
-            f"*Latency:* {latency}ms"
-        )
-    
-    send_slack_notification(msg)
+        send_slack_notification(message, on_done, target)
+
+# Monitor owners' channels, kept warm in memory
+routes = RouteCache(ROUTE_REFRESH_SECONDS, ROUTE_FULL_REFRESH_SECONDS, ROUTE_MISS_WAIT_SECONDS)
+
+# Bursts towards a destination are folded into one digest per window
+coalescer = AlertCoalescer(COALESCE_WINDOW_SECONDS, COALESCE_THRESHOLD, emit)
+
+def destinations_for(data: dict) -> list:
+    """[(channel, target)] an alert goes to, from its monitor owner's preferences."""
+    route = routes.lookup(data.get('monitor_id'))
+    destinations = []
+    if route and route.get('slack_webhook_url'):
+        destinations.append(("slack", route['slack_webhook_url']))
+    if not destinations and SLACK_WEBHOOK_URL:
+        destinations.append(("slack", SLACK_WEBHOOK_URL))
+    if route and route.get('email') and "email" in dispatcher.channels:
+        destinations.append(("email", route['email']))
+    return destinations
+
+def join_callbacks(destinations: list, on_done):
+    """
+    One callback per destination; once all settled, on_done(failed) gets
+    the destinations that were neither delivered nor queued for retry.
+    """
+    lock = threading.Lock()
+    state = {"left": len(destinations), "failed": []}
+
+    def for_destination(destination):
+        def settled(delivered: bool):
+            with lock:
+                state["left"] -= 1
+                if not delivered:
+                    state["failed"].append(destination)
+                finished = state["left"] == 0
+            if finished and on_done:
+                on_done(state["failed"])
+        return settled
+    return for_destination
+
+def handle_alert_event(data: dict, on_done=None, destinations: list = None):
+    """
+    Route an alert to its owner's channels via the coalescer, which sends
+    it now or in a digest.
+
+    on_done(failed) reports the destinations that still need the alert;
+    passing them back as `destinations` sends to those alone, so the
+    destinations that already have it are not notified twice.
+    """
+    if destinations is None:
+        destinations = destinations_for(data)
+    if not destinations:
+        logger.warning(f"Notification skipped: no channel for monitor {data.get('monitor_id')}.")
+        if on_done:
+            on_done([])
+        return
+
+    settled = join_callbacks(destinations, on_done)
+    for destination in destinations:
+        coalescer.add(destination, data, settled(destination))
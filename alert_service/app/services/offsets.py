@@ -0,0 +1,47 @@
+import threading
+from collections import deque
+
+class OffsetTracker:
+    """
+    Tracks which consumed alert offsets are settled, per partition.
+
+    Alerts are delivered concurrently and finish out of order. An offset is
+    only released for commit once it and every earlier offset of the same
+    partition are settled, so a crash never skips an undelivered alert.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # { partition: deque of offsets, in consume order }
+        self._done = {}  # { partition: set of settled offsets }
+
+    def track(self, partition: int, offset: int):
+        with self._lock:
+            self._inflight.setdefault(partition, deque()).append(offset)
+
+    def done(self, partition: int, offset: int):
+        with self._lock:
+            if partition in self._inflight:
+                self._done.setdefault(partition, set()).add(offset)
+
+    def release(self) -> dict:
+        """Pop every contiguously settled offset; returns {partition: next offset to commit}."""
+        positions = {}
+        with self._lock:
+            for partition, inflight in self._inflight.items():
+                done = self._done.get(partition)
+                while inflight and done and inflight[0] in done:
+                    done.discard(inflight[0])
+                    positions[partition] = inflight.popleft() + 1
+        return positions
+
+    def forget(self, partitions):
+        """Drop state for partitions this consumer no longer owns."""
+        with self._lock:
+            for partition in partitions:
+                self._inflight.pop(partition, None)
+                self._done.pop(partition, None)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._inflight.values())
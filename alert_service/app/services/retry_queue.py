@@ -0,0 +1,177 @@
+import json
+import random
+import threading
+import time
+import uuid
+from app.config import logger
+
+# Claim up to ARGV[2] entries of KEYS[1] due at ARGV[1] by pushing their
+# score to ARGV[3] (a lease): a claimer that dies before acking leaves them
+# to be claimed again once the lease runs out.
+CLAIM_DUE_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, member in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[3], member)
+end
+return due
+"""
+
+class RetryQueue:
+    """
+    Durable delayed retries for notifications that could not be delivered.
+
+    Entries live in a Redis sorted set scored by their next attempt time,
+    so they survive restarts and are shared by every alert service replica.
+    A background thread claims due entries and resends them through the
+    dispatcher without ever waiting for room in it, so retries cannot hold
+    up fresh alerts. Each failed attempt is rescheduled with exponential
+    backoff; after `max_attempts` the entry moves to a capped dead-letter
+    list for inspection.
+    """
+
+    def __init__(self, connect, key: str, max_attempts: int, backoff_base: float, backoff_max: float,
+                 poll_seconds: float, batch_size: int, lease_seconds: float, dead_letter_max: int):
+        self._connect = connect  # () -> Redis client, or None while unreachable
+        self._client = None
+        self._claim = None
+        self._connect_lock = threading.Lock()
+        self._next_connect = 0.0
+        self.key = key
+        self.dead_key = f"{key}:dead"
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.dead_letter_max = dead_letter_max
+        self._send = None
+
+        # Counters exposed through stats()
+        self.queued = 0
+        self.retried = 0
+        self.dead = 0
+
+    def _redis(self):
+        """
+        The Redis client, connecting on first use; None while unreachable.
+
+        Connection attempts are at least five seconds apart. Once created,
+        the client reconnects by itself after connection errors.
+        """
+        if self._client is not None:
+            return self._client
+        with self._connect_lock:
+            if self._client is None and time.monotonic() >= self._next_connect:
+                client = self._connect()
+                if client is None:
+                    self._next_connect = time.monotonic() + max(self.poll_seconds, 5)
+                else:
+                    self._claim = client.register_script(CLAIM_DUE_LUA)
+                    self._client = client
+                    logger.info("Retry queue connected to Redis.")
+        return self._client
+
+    def _backoff(self, attempts: int) -> float:
+        # Full jitter spreads retries of a storm over the backoff window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempts))
+
+    def push(self, channel: str, target: str, payload: dict) -> bool:
+        """Hand a failed notification over; True once it is stored durably."""
+        client = self._redis()
+        if client is None:
+            logger.error("Could not queue notification for retry: Redis unavailable.")
+            return False
+        entry = {"id": uuid.uuid4().hex, "channel": channel, "target": target, "payload": payload, "attempts": 0}
+        try:
+            client.zadd(self.key, {json.dumps(entry): time.time() + self._backoff(0)})
+        except Exception as e:
+            logger.error(f"Could not queue notification for retry: {e}")
+            return False
+        self.queued += 1
+        return True
+
+    def start(self, send):
+        """
+        Drain due entries in the background.
+
+        send(channel, target, payload, on_done) must return False instead of
+        blocking when it has no room; the entry is then tried again shortly.
+        """
+        self._send = send
+        threading.Thread(target=self._run, name="alert-retry", daemon=True).start()
+
+    def _run(self):
+        while True:
+            if self._redis() is None:
+                time.sleep(self.poll_seconds)
+                continue
+            try:
+                claimed = self._claim(
+                    keys=[self.key],
+                    args=[time.time(), self.batch_size, time.time() + self.lease_seconds]
+                )
+            except Exception as e:
+                logger.warning(f"Retry queue unavailable: {e}")
+                claimed = []
+
+            for member in claimed:
+                entry = json.loads(member)
+                if not self._send(entry["channel"], entry["target"], entry["payload"],
+                                  lambda delivered, m=member, e=entry: self._settle(m, e, delivered)):
+                    # Dispatcher busy with fresh alerts: back off until the next poll
+                    self._reschedule(member, None, time.time() + self.poll_seconds)
+
+            if len(claimed) < self.batch_size:
+                time.sleep(self.poll_seconds)
+
+    def _settle(self, member: str, entry: dict, delivered: bool):
+        if delivered:
+            self.retried += 1
+            self._reschedule(member, None, None)
+            return
+
+        entry["attempts"] += 1
+        if entry["attempts"] >= self.max_attempts:
+            self.dead += 1
+            logger.error(
+                f"Notification to {entry['channel']} failed {entry['attempts']} retries; moved to {self.dead_key}."
+            )
+            entry["dead_at"] = time.time()
+            self._reschedule(member, None, None, dead=json.dumps(entry))
+        else:
+            self._reschedule(member, json.dumps(entry), time.time() + self._backoff(entry["attempts"]))
+
+    def _reschedule(self, member: str, replacement, next_at, dead=None):
+        """Atomically replace (or remove) a claimed entry."""
+        try:
+            pipe = self._client.pipeline(transaction=True)
+            if replacement is None and next_at is not None:
+                pipe.zadd(self.key, {member: next_at})
+            else:
+                pipe.zrem(self.key, member)
+                if replacement is not None:
+                    pipe.zadd(self.key, {replacement: next_at})
+            if dead is not None:
+                pipe.lpush(self.dead_key, dead)
+                pipe.ltrim(self.dead_key, 0, self.dead_letter_max - 1)
+            pipe.execute()
+        except Exception as e:
+            # The lease runs out and the entry is claimed again
+            logger.warning(f"Could not update retry entry: {e}")
+
+    def stats(self) -> dict:
+        depth = dead_depth = None
+        if self._client is not None:
+            try:
+                depth = self._client.zcard(self.key)
+                dead_depth = self._client.llen(self.dead_key)
+            except Exception:
+                pass
+        return {
+            "depth": depth,
+            "dead_letters": dead_depth,
+            "queued": self.queued,
+            "retried": self.retried,
+            "dead": self.dead
+        }
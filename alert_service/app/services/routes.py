@@ -0,0 +1,98 @@
+import threading
+import time
+import requests
+from app.config import logger, USER_SERVICE_URL, INTERNAL_API_KEY
+
+class RouteCache:
+    """
+    In-memory monitor -> owner -> channels map for routing alerts.
+
+    Loaded in bulk from the User Service's route feed and kept warm by a
+    background thread: a delta sync every `refresh_seconds` picks up
+    profile edits and new or deleted monitors, and a full reload every
+    `full_refresh_seconds` bounds drift. Lookups never make an HTTP call;
+    an unknown monitor only triggers an early refresh, which the lookup
+    waits for briefly.
+    """
+
+    def __init__(self, refresh_seconds: float, full_refresh_seconds: float, miss_wait: float):
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.miss_wait = miss_wait
+        self.url = f"{USER_SERVICE_URL}/notification_routes"
+        self.session = requests.Session()
+
+        self._lock = threading.Lock()
+        self._owners = {}  # { monitor_id: user_id }
+        self._users = {}  # { user_id: {"slack_webhook_url", "email"} }
+        self._cursor = None
+        self._last_full = 0.0
+        self._wake = threading.Event()
+        self._synced = threading.Condition(self._lock)
+        self._syncs = 0
+        self._missed = {}  # { monitor_id: when a lookup last waited for it }
+
+        # Counters exposed through stats()
+        self.misses = 0
+
+    def start(self):
+        threading.Thread(target=self._run, name="route-cache", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            self._wake.wait(self.refresh_seconds)
+            self._wake.clear()
+
+    def refresh(self):
+        full = self._cursor is None or time.monotonic() - self._last_full > self.full_refresh_seconds
+        params = {} if full else {"since": self._cursor}
+        try:
+            response = self.session.get(
+                self.url, params=params, headers={"X-Internal-API-Key": INTERNAL_API_KEY}, timeout=10
+            )
+            response.raise_for_status()
+            feed = response.json()
+        except Exception as e:
+            # Keep serving the routes we have; retried on the next cycle
+            logger.error(f"Route sync failed: {e}")
+            return
+
+        with self._lock:
+            if feed["full"]:
+                self._owners.clear()
+                self._users.clear()
+                self._last_full = time.monotonic()
+            for user in feed["users"]:
+                self._users[user["user_id"]] = user
+            for monitor in feed["monitors"]:
+                self._owners[monitor["id"]] = monitor["user_id"]
+            for monitor_id in feed["deleted"]:
+                self._owners.pop(monitor_id, None)
+            self._cursor = feed["cursor"]
+            now = time.monotonic()
+            self._missed = {m: t for m, t in self._missed.items() if now - t < self.refresh_seconds}
+            self._syncs += 1
+            self._synced.notify_all()
+        if feed["full"]:
+            logger.info(f"Route cache loaded: {len(self._owners)} monitors, {len(self._users)} users.")
+
+    def lookup(self, monitor_id):
+        """Owner's channels for a monitor, or None if it is unknown."""
+        with self._lock:
+            user_id = self._owners.get(monitor_id)
+            now = time.monotonic()
+            if user_id is None and self.miss_wait > 0 and now - self._missed.get(monitor_id, -self.refresh_seconds) >= self.refresh_seconds:
+                # Possibly created since the last sync: refresh early, briefly wait
+                # for it (once per refresh period, so deleted monitors cost nothing)
+                self.misses += 1
+                self._missed[monitor_id] = now
+                syncs = self._syncs
+                self._wake.set()
+                self._synced.wait_for(lambda: self._syncs != syncs, timeout=self.miss_wait)
+                user_id = self._owners.get(monitor_id)
+            return self._users.get(user_id) if user_id is not None else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"monitors": len(self._owners), "users": len(self._users), "misses": self.misses}
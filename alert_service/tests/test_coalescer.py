@@ -0,0 +1,74 @@
+import time
+import pytest
+from app.services.coalescer import AlertCoalescer
+
+SLACK = ("slack", "https://hooks.slack.test/owner")
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+@pytest.fixture
+def emitted():
+    return []  # [(destination, [data])]
+
+@pytest.fixture
+def coalescer(emitted):
+    return AlertCoalescer(10, 3, lambda destination, events: emitted.append(
+        (destination, [data for data, _ in events])
+    ))
+
+def test_alerts_below_threshold_go_out_one_by_one(coalescer, emitted, clock):
+    coalescer.add(SLACK, {"n": 1})
+    coalescer.add(SLACK, {"n": 2})
+    assert emitted == [(SLACK, [{"n": 1}]), (SLACK, [{"n": 2}])]
+    assert coalescer.stats()["held"] == 0
+
+def test_threshold_is_the_last_alert_sent_immediately(coalescer, emitted, clock):
+    """Test that exactly `threshold` alerts go out before the storm is held."""
+    for n in range(1, 4):
+        coalescer.add(SLACK, {"n": n})
+    assert len(emitted) == 3
+
+    coalescer.add(SLACK, {"n": 4})
+    assert len(emitted) == 3
+    assert coalescer.stats()["held"] == 1
+
+def test_held_alerts_are_flushed_as_one_digest(coalescer, emitted, clock):
+    for n in range(1, 7):
+        coalescer.add(SLACK, {"n": n})
+    # Other destinations are not affected by the storm
+    coalescer.add(("email", "owner@example.com"), {"n": 0})
+
+    coalescer.flush_all()
+    assert emitted[-1] == (SLACK, [{"n": 4}, {"n": 5}, {"n": 6}])
+    assert emitted[-2] == (("email", "owner@example.com"), [{"n": 0}])
+    assert coalescer.stats() == {"held": 0, "digests": 1, "coalesced": 3}
+
+def test_digest_is_sent_when_the_window_closes(emitted):
+    """Test that the background thread sends a held digest after the window."""
+    coalescer = AlertCoalescer(0.2, 1, lambda destination, events: emitted.append(
+        (destination, [data for data, _ in events])
+    ))
+    coalescer.start()
+    try:
+        coalescer.add(SLACK, {"n": 1})
+        coalescer.add(SLACK, {"n": 2})
+        coalescer.add(SLACK, {"n": 3})
+        deadline = time.monotonic() + 5
+        while len(emitted) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        coalescer.stop()
+    assert emitted == [(SLACK, [{"n": 1}]), (SLACK, [{"n": 2}, {"n": 3}])]
+
+def test_sends_outside_the_window_no_longer_count(coalescer, emitted, clock):
+    for n in range(1, 4):
+        coalescer.add(SLACK, {"n": n})
+    clock[0] += 10
+
+    coalescer.add(SLACK, {"n": 4})
+    assert emitted[-1] == (SLACK, [{"n": 4}])
+    assert coalescer.stats()["held"] == 0
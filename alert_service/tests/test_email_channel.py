@@ -0,0 +1,119 @@
+import socket
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from app.services.channels import SMTPPool, EmailChannel
+from app.services.dispatcher import AlertDispatcher
+
+ALERT = {"subject": "[Uptime] https://example.com is DOWN", "text": "MONITOR CRITICAL: Site is DOWN!"}
+
+class Mailbox:
+    """aiosmtpd handler recording deliveries and the session each came over."""
+
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("unknown@"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((id(session), envelope.rcpt_tos[0]))
+        return "250 OK"
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=(auth_data.login, auth_data.password) == (b"alerts", b"secret"))
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class LocalSMTP:
+    """A local authenticated SMTP server that can be restarted on the same port."""
+
+    def __init__(self):
+        self.port = free_port()
+        self.mailbox = Mailbox()
+        self.controller = None
+
+    def start(self):
+        self.controller = Controller(
+            self.mailbox, hostname="127.0.0.1", port=self.port,
+            authenticator=authenticate, auth_require_tls=False
+        )
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+@pytest.fixture
+def smtp_server():
+    server = LocalSMTP()
+    server.start()
+    yield server
+    server.stop()
+
+def make_channel(server, size=3, idle_check=30.0):
+    pool = SMTPPool(
+        "127.0.0.1", server.port, "alerts", "secret",
+        starttls=False, use_ssl=False, size=size, timeout=5, idle_check=idle_check
+    )
+    return EmailChannel(pool, "alerts@uptime.local")
+
+def test_sessions_are_pooled_and_reused(smtp_server):
+    """Test that consecutive alerts share one authenticated session."""
+    channel = make_channel(smtp_server)
+
+    results = [channel.send(f"user{i}@example.com", ALERT) for i in range(10)]
+
+    assert results == [(True, False, None)] * 10
+    assert len(smtp_server.mailbox.received) == 10
+    assert len({session for session, _ in smtp_server.mailbox.received}) == 1
+    assert channel.pool.stats() == {"idle": 1, "opened": 1, "reused": 9}
+    channel.pool.close()
+
+def test_concurrent_sends_stay_within_the_pool(smtp_server):
+    """Test concurrent dispatch: every alert delivered over at most `size` sessions."""
+    channel = make_channel(smtp_server, size=3)
+    dispatcher = AlertDispatcher({"email": channel}, max_in_flight=10, max_pending=100,
+                                 rate=100, burst=100, max_attempts=3, backoff_base=0.1)
+    dispatcher.start()
+    settled = []
+    for i in range(30):
+        dispatcher.submit("email", f"user{i}@example.com", ALERT, settled.append)
+
+    assert dispatcher.drain(timeout=10)
+    dispatcher.stop()
+    assert settled == [True] * 30
+    assert len(smtp_server.mailbox.received) == 30
+    stats = channel.pool.stats()
+    assert stats["opened"] <= 3
+    assert stats["opened"] + stats["reused"] == 30
+    channel.pool.close()
+
+def test_reconnects_after_server_restart(smtp_server):
+    """Test that a session dropped by a restarted server is replaced transparently."""
+    channel = make_channel(smtp_server)
+    assert channel.send("first@example.com", ALERT) == (True, False, None)
+
+    smtp_server.stop()
+    smtp_server.start()
+
+    assert channel.send("second@example.com", ALERT) == (True, False, None)
+    assert [rcpt for _, rcpt in smtp_server.mailbox.received] == ["first@example.com", "second@example.com"]
+    assert channel.pool.stats()["opened"] == 2
+    channel.pool.close()
+
+def test_refused_recipient_is_final_and_keeps_the_session(smtp_server):
+    """Test that a 5xx recipient refusal is not retried and the session stays usable."""
+    channel = make_channel(smtp_server)
+
+    assert channel.send("unknown@example.com", ALERT) == (False, False, None)
+    assert channel.send("known@example.com", ALERT) == (True, False, None)
+    assert [rcpt for _, rcpt in smtp_server.mailbox.received] == ["known@example.com"]
+    assert channel.pool.stats()["opened"] == 1
+    channel.pool.close()
@@ -0,0 +1,27 @@
+from app.services.offsets import OffsetTracker
+
+def test_commit_holds_at_lowest_unsettled_offset():
+    """Test that out-of-order settlement only releases the contiguous prefix."""
+    tracker = OffsetTracker()
+    for offset in (3, 4, 5):
+        tracker.track(0, offset)
+
+    tracker.done(0, 5)
+    tracker.done(0, 4)
+    assert tracker.release() == {}
+
+    tracker.done(0, 3)
+    assert tracker.release() == {0: 6}
+    assert tracker.pending() == 0
+
+def test_forget_drops_revoked_partitions():
+    """Test that a revoked partition is dropped and late settlements are ignored."""
+    tracker = OffsetTracker()
+    tracker.track(0, 1)
+    tracker.track(1, 1)
+
+    tracker.forget([0])
+    tracker.done(0, 1)
+    tracker.done(1, 1)
+    assert tracker.release() == {1: 2}
+    assert tracker.pending() == 0
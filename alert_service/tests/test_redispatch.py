@@ -0,0 +1,59 @@
+import pytest
+from app import main
+from app.services import notifier
+
+SLACK = ("slack", "https://hooks.slack.test/owner")
+EMAIL = ("email", "owner@example.com")
+
+class FakeCoalescer:
+    """Records what would be sent to each destination; tests settle it by hand."""
+
+    def __init__(self):
+        self.sent = []  # [(destination, data, on_done)]
+
+    def add(self, destination, data, on_done=None):
+        self.sent.append((destination, data, on_done))
+
+@pytest.fixture
+def coalescer(monkeypatch):
+    coalescer = FakeCoalescer()
+    monkeypatch.setattr(notifier, "coalescer", coalescer)
+    monkeypatch.setattr(notifier, "destinations_for", lambda data: [SLACK, EMAIL])
+    monkeypatch.setattr(main, "offset_tracker", main.OffsetTracker())
+    main.redispatch.clear()
+    yield coalescer
+    main.redispatch.clear()
+
+def make_due():
+    with main.redispatch_lock:
+        main.redispatch[:] = [(0.0,) + entry[1:] for entry in main.redispatch]
+
+def test_partial_failure_is_redispatched_to_the_failed_destination_only(coalescer):
+    """Test that a destination that already has the alert is not notified again."""
+    alert = {"monitor_id": 7, "url": "https://example.com", "event_type": "DOWN"}
+    main.offset_tracker.track(0, 42)
+    notifier.handle_alert_event(alert, main.settle(0, 42, alert))
+
+    slack, email = (on_done for _, _, on_done in coalescer.sent)
+    slack(True)
+    email(False)
+    assert main.offset_tracker.release() == {}
+    assert [entry[5] for entry in main.redispatch] == [[EMAIL]]
+
+    coalescer.sent.clear()
+    make_due()
+    assert not main.redispatch_due()
+    assert [destination for destination, _, _ in coalescer.sent] == [EMAIL]
+
+    coalescer.sent[0][2](True)
+    assert main.offset_tracker.release() == {0: 43}
+
+def test_alert_delivered_everywhere_settles_at_once(coalescer):
+    alert = {"monitor_id": 7, "url": "https://example.com", "event_type": "UP"}
+    main.offset_tracker.track(0, 1)
+    notifier.handle_alert_event(alert, main.settle(0, 1, alert))
+
+    for _, _, on_done in coalescer.sent:
+        on_done(True)
+    assert main.redispatch == []
+    assert main.offset_tracker.release() == {0: 2}
@@ -1,5 +1,6 @@
 import os
-import redis
+import socket
+import redis.asyncio as aioredis
 from confluent_kafka import Producer
 import logging
 
@@ -15,31 +16,92 @@ REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
 USER_SERVICE_URL = os.environ.get("USER_SERVICE_URL", "http://user_service:5000")
 INTERNAL_API_KEY = os.environ.get("INTERNAL_API_KEY")
 
+# Kafka producer throughput tuning
+KAFKA_LINGER_MS = int(os.environ.get("KAFKA_LINGER_MS", 20))
+KAFKA_BATCH_BYTES = int(os.environ.get("KAFKA_BATCH_BYTES", 262144))
+KAFKA_COMPRESSION = os.environ.get("KAFKA_COMPRESSION", "lz4")
+KAFKA_QUEUE_MAX_MESSAGES = int(os.environ.get("KAFKA_QUEUE_MAX_MESSAGES", 100000))
+# Scheduler pauses dispatch once the local queue is this full
+KAFKA_BACKPRESSURE_RATIO = float(os.environ.get("KAFKA_BACKPRESSURE_RATIO", 0.8))
+KAFKA_PUBLISH_MAX_WAIT = float(os.environ.get("KAFKA_PUBLISH_MAX_WAIT", 30.0))
+
+# Shared HTTP engine tuning (pool is reused by every check)
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 10.0))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 200))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", 100))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 30.0))
+HTTP_MAX_PER_HOST = int(os.environ.get("HTTP_MAX_PER_HOST", 10))
+# Per-host limiters kept for recently probed hosts; idle ones beyond this are dropped
+HTTP_HOST_SLOTS_MAX = int(os.environ.get("HTTP_HOST_SLOTS_MAX", 10000))
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "false").lower() == "true"
+# Pinger DNS cache (seconds); TTLs come from the records when aiodns is installed
+DNS_MIN_TTL = float(os.environ.get("DNS_MIN_TTL", 5))
+DNS_MAX_TTL = float(os.environ.get("DNS_MAX_TTL", 300))
+DNS_NEGATIVE_TTL = float(os.environ.get("DNS_NEGATIVE_TTL", 30))
+DNS_DEFAULT_TTL = float(os.environ.get("DNS_DEFAULT_TTL", 60))
+DNS_CACHE_MAX_ENTRIES = int(os.environ.get("DNS_CACHE_MAX_ENTRIES", 10000))
+
+REDIS_POOL_SIZE = int(os.environ.get("REDIS_POOL_SIZE", 50))
+
+# Check scheduler tuning
+SCHEDULER_TICK_SECONDS = float(os.environ.get("SCHEDULER_TICK_SECONDS", 0.2))
+MAX_IN_FLIGHT_CHECKS = int(os.environ.get("MAX_IN_FLIGHT_CHECKS", 500))
+
+# Monitor definition sync (delta feed, with a periodic full resync to self-heal)
+MONITOR_SYNC_SECONDS = int(os.environ.get("MONITOR_SYNC_SECONDS", 15))
+FULL_SYNC_SECONDS = int(os.environ.get("FULL_SYNC_SECONDS", 3600))
+
+# Sharding across pinger replicas (pod name is unique per replica in K8s)
+PINGER_REPLICA_ID = os.environ.get("PINGER_REPLICA_ID", socket.gethostname())
+SHARD_HEARTBEAT_SECONDS = int(os.environ.get("SHARD_HEARTBEAT_SECONDS", 5))
+SHARD_MEMBER_TTL = int(os.environ.get("SHARD_MEMBER_TTL", 15))
+SHARD_VNODES = int(os.environ.get("SHARD_VNODES", 128))
+
+# Multi-process mode: N worker processes per container, each with its own slice
+PINGER_WORKERS = int(os.environ.get("PINGER_WORKERS", 1))
+PINGER_WORKER_INDEX = int(os.environ.get("PINGER_WORKER_INDEX", 0))
+WORKER_REPORT_SECONDS = float(os.environ.get("WORKER_REPORT_SECONDS", 5))
+
 # Redis client for distributed locking
 def get_redis_client():
     """
-    Establish a Redis connection. Ping the server to verify connectivity.
+    Build an asyncio Redis client backed by a bounded connection pool.
+
+    Connections are opened lazily on the event loop, so connectivity is
+    verified during app startup rather than at import time.
     """
     try:
-        r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-        r.ping()
-        logger.info(f"Connected to Redis at {REDIS_HOST}")
-        return r
+        # Blocking pool: callers wait for a free connection instead of failing
+        pool = aioredis.BlockingConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            max_connections=REDIS_POOL_SIZE,
+            decode_responses=True
+        )
+        return aioredis.Redis(connection_pool=pool)
     except Exception as e:
-        logger.error(f"Failed to connect to Redis: {e}")
+        logger.error(f"Failed to configure Redis: {e}")
         return None
 
 # Kafka Producer for streaming results
 def get_kafka_producer():
     """
     Initializes a Kafka producer with high reliability settings.
+
+    Results are small and frequent, so they are batched for a few
+    milliseconds and compressed; idempotence keeps retries from duplicating.
     """
     producer_conf = {
         'bootstrap.servers': KAFKA_BROKER,
         'client.id': 'pinger-service-v1.5',
         'acks': 'all',
+        'enable.idempotence': True,
         'retries': 5,
-        'retry.backoff.ms': 500
+        'retry.backoff.ms': 500,
+        'linger.ms': KAFKA_LINGER_MS,
+        'batch.size': KAFKA_BATCH_BYTES,
+        'compression.type': KAFKA_COMPRESSION,
+        'queue.buffering.max.messages': KAFKA_QUEUE_MAX_MESSAGES
     }
     try:
         p = Producer(**producer_conf)
@@ -49,5 +111,6 @@ def get_kafka_producer():
         logger.error(f"Failed to connect to Kafka: {e}")
         return None
 
+# Opens no connection until first used; the producer is built by the check
+# engine when it starts (see ResultPublisher.start), so a supervisor has none
 redis_client = get_redis_client()
-kafka_producer = get_kafka_producer()
@@ -1,51 +1,52 @@
 import asyncio
 from fastapi import FastAPI
-from apscheduler.triggers.interval import IntervalTrigger
-from app.config import logger, kafka_producer, redis_client, INTERNAL_API_KEY
-from app.services.scheduler import scheduler, sync_monitors, active_jobs
+from app.config import logger, PINGER_WORKERS
+from app.services.engine import start_engine, stop_engine, engine_stats
+from app.services.scheduler import shard
+from app.supervisor import WorkerSupervisor
 
 app = FastAPI(title="Pinger Engine")
 
+# With PINGER_WORKERS > 1 this process only supervises; checks run in the workers
+supervisor = WorkerSupervisor(PINGER_WORKERS) if PINGER_WORKERS > 1 else None
+
 @app.on_event("startup")
 async def startup_event():
     """
     Bootstrap process for the service.
     
-    1. Starts the async scheduler.
-    2. Registers a recurring job to sync monitor definitions from the source-of-truth.
-    3. Triggers an immediate first sync to start working without delay.
+    Runs the check engine on this event loop, or starts the worker processes
+    in multi-process mode.
     """
-    logger.info("Starting Pinger Engine infrastructure...")
-    
-    # Internal API key check for early failure if configuration is missing
-    if not INTERNAL_API_KEY:
-        logger.warning("INTERNAL_API_KEY is not set. Service-to-Service communication will fail.")
+    if supervisor:
+        logger.info(f"Starting Pinger Engine in supervisor mode with {PINGER_WORKERS} workers...")
+        supervisor.start()
+    else:
+        await start_engine()
 
-    scheduler.start()
-    
-    # Monitors are checked for updates every minute
-    scheduler.add_job(
-        sync_monitors, 
-        IntervalTrigger(seconds=60), 
-        id="sync_monitors_task",
-        replace_existing=True
-    )
-    
-    # Run the first sync in the background so it doesn't block app boot
-    asyncio.create_task(sync_monitors())
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stop scheduling new checks, then close pooled connections cleanly.
+    """
+    if supervisor:
+        # Joining worker processes blocks; keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, supervisor.stop)
+        # Workers share this replica's ring membership; drop it once all have stopped
+        await shard.leave()
+    else:
+        await stop_engine()
 
 @app.get("/health")
 def health():
     """
     Basic health check for Kubernetes or load balancers.
     Provides a quick overview of the service's internal state and connectivity.
+    In multi-process mode, job counts and throughput are aggregated across workers.
     """
+    stats = supervisor.stats() if supervisor else engine_stats()
     return {
         "status": "healthy", 
         "version": "1.5.2",
-        "jobs_active": len(active_jobs),
-        "infrastructure": {
-            "kafka": kafka_producer is not None, 
-            "redis": redis_client is not None
-        }
+        **stats
     }
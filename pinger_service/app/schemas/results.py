@@ -0,0 +1,28 @@
+from typing import Optional, TypedDict
+
+class PhaseTimings(TypedDict):
+    """Monotonic-clock breakdown of one check, in milliseconds."""
+    dns_ms: float
+    connect_ms: float
+    tls_ms: float
+    ttfb_ms: float
+    total_ms: float
+
+class CheckResult(TypedDict):
+    """
+    Message published to the 'monitoring-results' topic for every check.
+
+    `latency_ms` is kept for existing consumers and equals the rounded total.
+    `check_id` is unique per check, so consumers can recognise a replayed result.
+    """
+    check_id: str
+    monitor_id: int
+    url: str
+    timestamp: str
+    is_up: bool
+    status_code: Optional[int]
+    latency_ms: int
+    timings: PhaseTimings
+    probe_mode: str
+    bytes_read: int
+    error: Optional[str]
@@ -0,0 +1,177 @@
+import asyncio
+import heapq
+import time
+import zlib
+from app.config import logger
+
+class CheckJob:
+    """
+    Definition of one scheduled monitor.
+
+    Slots keep the per-monitor footprint small enough to hold a million jobs.
+    """
+    __slots__ = ("monitor_id", "url", "interval", "probe_mode", "max_body_bytes", "generation")
+
+    def __init__(self, monitor_id: int, url: str, interval: int, probe_mode: str = "GET",
+                 max_body_bytes: int = None, generation: int = 0):
+        self.monitor_id = monitor_id
+        self.url = url
+        self.interval = interval
+        self.probe_mode = probe_mode
+        self.max_body_bytes = max_body_bytes
+        self.generation = generation
+
+    def same_definition(self, url: str, interval: int, probe_mode: str, max_body_bytes: int) -> bool:
+        return (self.url == url and self.interval == interval
+                and self.probe_mode == probe_mode and self.max_body_bytes == max_body_bytes)
+
+class CheckScheduler:
+    """
+    Purpose-built scheduler for due checks, replacing one APScheduler job per monitor.
+
+    A single min-heap keyed on next-run time holds every monitor. Each tick pops
+    the entries that are due, re-queues them one interval later and launches
+    the checks, never exceeding `max_in_flight` concurrent checks. Monitors that
+    share an interval get a stable, hash-derived phase so their checks are spread
+    evenly across the interval instead of firing in one burst. An optional
+    `throttle` callback pauses dispatch while downstream stages are saturated.
+
+    Removals and updates are lazy: a generation counter invalidates stale heap
+    entries, which are dropped when they surface.
+    """
+
+    def __init__(self, run_check, tick_seconds: float = 0.2, max_in_flight: int = 500, throttle=None):
+        self._run_check = run_check  # async callable(job)
+        self._throttle = throttle  # callable() -> True when downstream needs a pause
+        self.tick_seconds = tick_seconds
+        self.max_in_flight = max_in_flight
+
+        self._heap = []  # [(next_run, monitor_id, generation)]
+        self._jobs = {}  # { monitor_id: CheckJob }
+        self._tasks = set()
+        self._runner = None
+        self._in_flight = 0
+
+        # Counters exposed through /health
+        self.dispatched = 0
+        self.completed = 0
+        self.deferred = 0
+        self.throttled = 0
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, monitor_id):
+        return monitor_id in self._jobs
+
+    def monitor_ids(self) -> set:
+        return set(self._jobs)
+
+    @staticmethod
+    def phase_delay(monitor_id: int, interval: int, wall_now: float) -> float:
+        """
+        Seconds until the monitor's next slot within its interval.
+
+        The phase is derived from the monitor id, so it is identical across
+        restarts and replicas and spreads monitors uniformly over the interval.
+        """
+        phase = (zlib.crc32(str(monitor_id).encode()) / 0xFFFFFFFF) * interval
+        return (phase - wall_now) % interval
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def upsert(self, monitor_id: int, url: str, interval: int, probe_mode: str = "GET",
+               max_body_bytes: int = None, now: float = None) -> bool:
+        """
+        Add a monitor or reschedule it if its definition changed.
+
+        Returns True when the schedule was modified.
+        """
+        job = self._jobs.get(monitor_id)
+        if job is not None and job.same_definition(url, interval, probe_mode, max_body_bytes):
+            return False
+
+        generation = job.generation + 1 if job is not None else 0
+        job = CheckJob(monitor_id, url, interval, probe_mode, max_body_bytes, generation)
+        self._jobs[monitor_id] = job
+
+        now = self._now() if now is None else now
+        next_run = now + self.phase_delay(monitor_id, interval, time.time())
+        heapq.heappush(self._heap, (next_run, monitor_id, generation))
+        return True
+
+    def remove(self, monitor_id: int) -> bool:
+        """Stop scheduling a monitor. Its heap entry is discarded lazily."""
+        return self._jobs.pop(monitor_id, None) is not None
+
+    def _dispatch_due(self, now: float) -> int:
+        """Launch every due check, within the in-flight cap. Returns the count launched."""
+        heap = self._heap
+        launched = 0
+        if self._throttle is not None and heap and heap[0][0] <= now and self._throttle():
+            # Downstream backpressure: due checks wait for a later tick
+            self.throttled += 1
+            return launched
+        while heap and heap[0][0] <= now:
+            if self._in_flight >= self.max_in_flight:
+                # Leave the rest queued; they run late rather than being dropped
+                self.deferred += 1
+                break
+
+            next_run, monitor_id, generation = heapq.heappop(heap)
+            job = self._jobs.get(monitor_id)
+            if job is None or job.generation != generation:
+                continue  # Removed or rescheduled since this entry was pushed
+
+            # Stay on the original phase, skipping slots missed while overloaded
+            following = next_run + job.interval
+            if following <= now:
+                following += ((now - following) // job.interval + 1) * job.interval
+            heapq.heappush(heap, (following, monitor_id, generation))
+
+            self._in_flight += 1
+            self.dispatched += 1
+            launched += 1
+            task = asyncio.ensure_future(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return launched
+
+    async def _execute(self, job: CheckJob):
+        try:
+            await self._run_check(job)
+        except Exception as e:
+            logger.error(f"Check for monitor {job.monitor_id} failed unexpectedly: {e}")
+        finally:
+            self._in_flight -= 1
+            self.completed += 1
+
+    async def _run(self):
+        while True:
+            self._dispatch_due(self._now())
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.ensure_future(self._run())
+            logger.info(f"Check scheduler started (tick={self.tick_seconds}s, max_in_flight={self.max_in_flight})")
+
+    async def stop(self):
+        """Stop dispatching and wait for in-flight checks to finish."""
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "jobs": len(self._jobs),
+            "in_flight": self._in_flight,
+            "dispatched": self.dispatched,
+            "completed": self.completed,
+            "deferred_ticks": self.deferred,
+            "throttled_ticks": self.throttled,
+            "heap_size": len(self._heap)
+        }
@@ -0,0 +1,93 @@
+import asyncio
+from apscheduler.triggers.interval import IntervalTrigger
+from app.config import (
+    logger, redis_client, INTERNAL_API_KEY,
+    MONITOR_SYNC_SECONDS, SHARD_HEARTBEAT_SECONDS
+)
+from app.services.scheduler import (
+    scheduler, check_scheduler, shard, sync_monitors, heartbeat_shards
+)
+from app.services.http_engine import http_engine
+from app.services.publisher import result_publisher
+
+async def start_engine():
+    """
+    Bootstrap the check pipeline on the running event loop.
+    
+    1. Verifies Redis, opens the shared HTTP engine and starts the Kafka delivery poller.
+    2. Starts the check scheduler and the housekeeping scheduler.
+    3. Joins the pinger ring so this replica only schedules its own shard.
+    4. Registers recurring jobs to sync monitor definitions and heartbeat the shard.
+    5. Triggers an immediate first sync to start working without delay.
+    """
+    logger.info("Starting Pinger Engine infrastructure...")
+    
+    # Internal API key check for early failure if configuration is missing
+    if not INTERNAL_API_KEY:
+        logger.warning("INTERNAL_API_KEY is not set. Service-to-Service communication will fail.")
+
+    if redis_client:
+        try:
+            await redis_client.ping()
+            logger.info("Connected to Redis (async pool).")
+        except Exception as e:
+            logger.error(f"Redis is unreachable; checks will run without locks: {e}")
+
+    http_engine.start()
+    result_publisher.start()
+    check_scheduler.start()
+    scheduler.start()
+
+    # Join the ring before the first sync so ownership is already known
+    await heartbeat_shards()
+    scheduler.add_job(
+        heartbeat_shards,
+        IntervalTrigger(seconds=SHARD_HEARTBEAT_SECONDS),
+        id="shard_heartbeat_task",
+        replace_existing=True
+    )
+    
+    # Delta syncs are cheap, so monitor changes are picked up quickly
+    scheduler.add_job(
+        sync_monitors, 
+        IntervalTrigger(seconds=MONITOR_SYNC_SECONDS), 
+        id="sync_monitors_task",
+        replace_existing=True
+    )
+    
+    # Run the first sync in the background so it doesn't block app boot
+    asyncio.create_task(sync_monitors())
+
+async def stop_engine(leave_ring: bool = True):
+    """
+    Stop scheduling new checks, then close pooled connections cleanly.
+
+    Worker processes pass leave_ring=False: their siblings share the
+    replica's ring membership and keep checking, so only the supervisor
+    deregisters the replica, once every worker has stopped.
+    """
+    logger.info("Shutting down Pinger Engine...")
+    scheduler.shutdown(wait=False)
+    await check_scheduler.stop()
+    if leave_ring:
+        await shard.leave()
+    await http_engine.close()
+    # Blocking flush is bounded; run it off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, result_publisher.stop)
+    if redis_client:
+        await redis_client.aclose()
+
+def engine_stats() -> dict:
+    """Internal state of this process's check pipeline."""
+    return {
+        "jobs_active": len(check_scheduler),
+        "scheduler": check_scheduler.stats(),
+        "shard": shard.stats(),
+        "infrastructure": {
+            "kafka": result_publisher.connected,
+            "redis": redis_client is not None
+        },
+        "http_pool": http_engine.stats(),
+        "dns_cache": http_engine.resolver.stats(),
+        "kafka_producer": result_publisher.stats()
+    }
@@ -0,0 +1,215 @@
+import asyncio
+from collections import OrderedDict
+import httpx
+from app.config import (
+    logger, HTTP_TIMEOUT, HTTP_POOL_SIZE, HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY, HTTP_MAX_PER_HOST, HTTP_HOST_SLOTS_MAX, HTTP2_ENABLED
+)
+from app.services.resolver import ResolvingBackend, dns_cache
+from app.services.timing import current_timer
+
+USER_AGENT = 'UptimeMonitor-Engine/1.5'
+
+def connection_pool(transport: httpx.AsyncHTTPTransport):
+    """
+    The httpcore pool behind an httpx transport.
+
+    httpx does not expose it; this relies on the private `_pool` attribute
+    of the pinned httpx/httpcore versions (see requirements.txt) and fails
+    loudly if an upgrade moved it.
+    """
+    pool = getattr(transport, "_pool", None)
+    if pool is None or not hasattr(pool, "_network_backend") or not hasattr(pool, "connections"):
+        raise RuntimeError(
+            f"httpx {httpx.__version__} no longer exposes its connection pool as "
+            f"transport._pool; update HttpEngine for this version or pin the previous one."
+        )
+    return pool
+
+class HttpEngine:
+    """
+    Long-lived HTTP client shared by every check of this pinger.
+
+    Connections are kept alive and reused across checks instead of paying a
+    TCP + TLS handshake per ping. A per-host semaphore caps how many
+    concurrent requests a single target receives from this instance; the
+    semaphores of the least recently probed idle hosts are dropped once
+    more than `max_host_slots` are kept.
+    """
+
+    def __init__(self, timeout: float, pool_size: int, max_keepalive: int,
+                 keepalive_expiry: float, max_per_host: int, http2: bool, max_host_slots: int = 10000):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.max_per_host = max_per_host
+        self.http2 = http2
+        self.max_host_slots = max_host_slots
+
+        self.resolver = dns_cache
+        self._client = None
+        self._transport = None
+        self._host_slots = OrderedDict()  # { "host:port": [asyncio.Semaphore, users] }, least recent first
+
+        # Counters exposed through /health
+        self.requests_total = 0
+        self.connections_opened = 0
+        self.waiting = 0
+        self.in_flight = 0
+
+    def start(self):
+        """Create the shared client. Safe to call more than once."""
+        if self._client is not None:
+            return
+
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but 'h2' is not installed. Falling back to HTTP/1.1.")
+                http2 = False
+
+        limits = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+        # httpx does not expose the network backend; resolve DNS ourselves so it can be timed
+        pool = connection_pool(self._transport)
+        pool._network_backend = ResolvingBackend(pool._network_backend, self.resolver)
+        self._client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT}
+        )
+        logger.info(
+            f"HTTP engine started (pool={self.pool_size}, keepalive={self.max_keepalive}, "
+            f"per_host={self.max_per_host}, http2={http2})"
+        )
+
+    async def close(self):
+        """Drain and close every pooled connection."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._transport = None
+            logger.info("HTTP engine closed.")
+
+    def _slot_for(self, url: httpx.URL) -> list:
+        key = f"{url.host}:{url.port or (443 if url.scheme == 'https' else 80)}"
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = [asyncio.Semaphore(self.max_per_host), 0]
+            self._host_slots[key] = slot
+            self._prune_slots()
+        else:
+            self._host_slots.move_to_end(key)
+        return slot
+
+    def _prune_slots(self):
+        """Drop the least recently used semaphores nobody holds or waits for."""
+        excess = len(self._host_slots) - self.max_host_slots
+        if excess <= 0:
+            return
+        for key in [k for k, (_, users) in self._host_slots.items() if users == 0][:excess]:
+            del self._host_slots[key]
+
+    async def _trace(self, event_name: str, info: dict):
+        # A completed TCP connect means the pool could not reuse a connection
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def probe(self, url: str, mode: str = "GET", max_body_bytes: int = None, timer=None) -> tuple:
+        """
+        Probe a target through the shared pool, respecting the per-host limit.
+
+        Modes: GET reads the whole body, HEAD sends a HEAD request, GET_HEADERS
+        closes the stream as soon as headers arrive, and GET_CAPPED stops
+        reading after `max_body_bytes`. Returns (status_code, bytes_read), where
+        bytes_read counts body bytes received off the wire. When a CheckTimer is
+        given, it receives the phase timings of the request.
+        """
+        if self._client is None:
+            self.start()
+
+        if timer is None:
+            trace = self._trace
+        else:
+            async def trace(event_name, info):
+                await self._trace(event_name, info)
+                await timer.trace(event_name, info)
+            current_timer.set(timer)
+
+        slot = self._slot_for(httpx.URL(url))
+        semaphore = slot[0]
+        # Counted while waiting too, so the semaphore is never pruned in use
+        slot[1] += 1
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            slot[1] -= 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.requests_total += 1
+        try:
+            method = "HEAD" if mode == "HEAD" else "GET"
+            request = self._client.build_request(method, url, extensions={"trace": trace})
+            response = await self._client.send(request, stream=True)
+            bytes_read = 0
+            try:
+                if mode in ("GET", "GET_CAPPED"):
+                    async for chunk in response.aiter_raw():
+                        bytes_read += len(chunk)
+                        if mode == "GET_CAPPED" and max_body_bytes and bytes_read >= max_body_bytes:
+                            break
+            finally:
+                # Closing an unread stream drops the connection instead of draining it
+                await response.aclose()
+            return response.status_code, bytes_read
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+            slot[1] -= 1
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage for the health endpoint."""
+        open_connections = 0
+        pool_queued = 0
+        pool = connection_pool(self._transport) if self._transport is not None else None
+        if pool is not None:
+            open_connections = len(pool.connections)
+            pool_queued = sum(1 for r in getattr(pool, "_requests", []) if r.is_queued())
+
+        reuse_ratio = 0.0
+        if self.requests_total:
+            reused = max(0, self.requests_total - self.connections_opened)
+            reuse_ratio = round(reused / self.requests_total, 3)
+
+        return {
+            "open_connections": open_connections,
+            "connections_opened": self.connections_opened,
+            "requests_total": self.requests_total,
+            "reuse_ratio": reuse_ratio,
+            "in_flight": self.in_flight,
+            "host_limiters": len(self._host_slots),
+            "queued_requests": self.waiting + pool_queued
+        }
+
+# Single engine owned by the pinger for its whole lifetime
+http_engine = HttpEngine(
+    timeout=HTTP_TIMEOUT,
+    pool_size=HTTP_POOL_SIZE,
+    max_keepalive=HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    max_per_host=HTTP_MAX_PER_HOST,
+    http2=HTTP2_ENABLED,
+    max_host_slots=HTTP_HOST_SLOTS_MAX
+)
@@ -0,0 +1,72 @@
+import asyncio
+from app.config import logger, redis_client
+
+LOCK_PREFIX = "lock:pinger:"
+# Upper bound on commands sent in a single pipeline round trip
+MAX_PIPELINE_SIZE = 1000
+
+class LockBatcher:
+    """
+    Acquire per-monitor Redis locks without blocking the event loop.
+
+    Lock requests issued during the same event-loop tick (e.g. every monitor
+    that fires in one scheduler tick) are coalesced and sent as one pipelined
+    batch of SET NX EX commands, so N due checks cost ~N/1000 round trips.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._pending = []  # [(monitor_id, ttl, future)]
+        self._flush_scheduled = False
+
+    async def acquire_many(self, items: list) -> list:
+        """
+        Try to lock several monitors at once.
+
+        Takes a list of (monitor_id, ttl_seconds) tuples and returns a list of
+        booleans in the same order. Fails open on Redis errors: running a check
+        twice is preferable to silently skipping it.
+        """
+        if self._client is None or not items:
+            return [True] * len(items)
+
+        acquired = []
+        for start in range(0, len(items), MAX_PIPELINE_SIZE):
+            chunk = items[start:start + MAX_PIPELINE_SIZE]
+            try:
+                async with self._client.pipeline(transaction=False) as pipe:
+                    for monitor_id, ttl in chunk:
+                        pipe.set(f"{LOCK_PREFIX}{monitor_id}", "active", ex=ttl, nx=True)
+                    results = await pipe.execute()
+                acquired.extend(bool(r) for r in results)
+            except Exception as e:
+                logger.warning(f"Lock batch of {len(chunk)} failed, proceeding without locks: {e}")
+                acquired.extend([True] * len(chunk))
+        return acquired
+
+    async def acquire(self, monitor_id: int, ttl: int) -> bool:
+        """
+        Queue a single lock request; it is sent with the rest of this tick's batch.
+        """
+        if self._client is None:
+            return True
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((monitor_id, ttl, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            # call_soon runs after every task that is ready in this tick
+            loop.call_soon(lambda: asyncio.ensure_future(self._flush()))
+        return await future
+
+    async def _flush(self):
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+
+        results = await self.acquire_many([(m_id, ttl) for m_id, ttl, _ in pending])
+        for (_, _, future), ok in zip(pending, results):
+            if not future.done():
+                future.set_result(ok)
+
+lock_batcher = LockBatcher(redis_client)
@@ -1,65 +1,67 @@
 import httpx
 import json
+import uuid
 from datetime import datetime
-from app.config import logger, redis_client, kafka_producer, KAFKA_TOPIC
+from app.config import logger
+from app.schemas.results import CheckResult
+from app.services.http_engine import http_engine
+from app.services.locks import lock_batcher
+from app.services.publisher import result_publisher
+from app.services.timing import CheckTimer
 
-async def ping_url(monitor_id: int, url: str, interval: int):
+async def ping_url(monitor_id: int, url: str, interval: int,
+                   probe_mode: str = "GET", max_body_bytes: int = None):
     """
     Check the health of a target URL.
     
+    The monitor's probe mode decides how much of the response is read
+    (see HttpEngine.probe), and the bytes read are reported with the result.
+    
     Uses a Redis lock to ensure only one pinger instance handles a given 
-    monitor at a time when scaled horizontally.
+    monitor at a time when scaled horizontally. Locks for checks firing in
+    the same tick are acquired together in one pipelined batch.
     """
-    lock_key = f"lock:pinger:{monitor_id}"
-    
-    if redis_client:
-        # Lock TTL is slightly shorter than the check interval
-        lock_ttl = max(5, interval - 1)
-        if not redis_client.set(lock_key, "active", ex=lock_ttl, nx=True):
-            logger.debug(f"Monitor {monitor_id} is already being handled. Skipping.")
-            return
+    # Lock TTL is slightly shorter than the check interval
+    lock_ttl = max(5, interval - 1)
+    if not await lock_batcher.acquire(monitor_id, lock_ttl):
+        logger.debug(f"Monitor {monitor_id} is already being handled. Skipping.")
+        return
 
+    # Wall clock only stamps the result; durations use the monotonic timer
     start_time = datetime.utcnow()
+    timer = CheckTimer()
     status_code = None
     is_up = False
     error = None
+    bytes_read = 0
     
-    logger.info(f"Pinging {url}...")
+    logger.info(f"Pinging {url} ({probe_mode})...")
     try:
-        # Use a timeout and custom User-Agent to avoid generic filters
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            headers = {'User-Agent': 'UptimeMonitor-Engine/1.5'}
-            response = await client.get(url, headers=headers)
-            status_code = response.status_code
-            is_up = 200 <= status_code < 400
+        # Shared pooled client: keep-alive connections are reused across checks
+        status_code, bytes_read = await http_engine.probe(url, probe_mode, max_body_bytes, timer=timer)
+        is_up = 200 <= status_code < 400
     except httpx.TimeoutException:
         error = "Network timeout"
     except Exception as e:
         # Capture any other network-related failures
         error = str(e)
     
-    end_time = datetime.utcnow()
-    latency_ms = int((end_time - start_time).total_seconds() * 1000)
+    timer.stop()
+    timings = timer.breakdown()
     
-    result = {
+    result: CheckResult = {
+        "check_id": uuid.uuid4().hex,
         "monitor_id": monitor_id,
         "url": url,
         "timestamp": start_time.isoformat(),
         "is_up": is_up,
         "status_code": status_code,
-        "latency_ms": latency_ms,
+        "latency_ms": int(timings["total_ms"]),
+        "timings": timings,
+        "probe_mode": probe_mode,
+        "bytes_read": bytes_read,
         "error": error
     }
     
-    # Push results to Kafka
-    if kafka_producer:
-        try:
-            kafka_producer.produce(
-                KAFKA_TOPIC, 
-                key=str(monitor_id), 
-                value=json.dumps(result)
-            )
-            # Poll(0) to serve existing delivery reports without blocking the next ping
-            kafka_producer.poll(0)
-        except Exception as e:
-            logger.error(f"Failed to publish result to Kafka for {monitor_id}: {e}")
+    # Push results to Kafka; waits (backpressure) rather than drop when the queue is full
+    await result_publisher.publish(str(monitor_id), json.dumps(result))
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from app.config import (
+    logger, get_kafka_producer, KAFKA_TOPIC, KAFKA_QUEUE_MAX_MESSAGES,
+    KAFKA_BACKPRESSURE_RATIO, KAFKA_PUBLISH_MAX_WAIT
+)
+
+class ResultPublisher:
+    """
+    Throughput-oriented Kafka stage for check results.
+
+    Results are handed to librdkafka's local queue, which batches and
+    compresses them. A background thread serves delivery reports so the event
+    loop never polls. When the local queue nears capacity the scheduler is told
+    to slow down, and a full queue makes the caller wait instead of dropping
+    the result.
+
+    The producer is only created by start(), in the process that runs checks.
+    """
+
+    def __init__(self, connect, topic: str, queue_max: int, backpressure_ratio: float, max_wait: float):
+        self._connect = connect  # () -> Producer, or None on failure
+        self._producer = None
+        self.topic = topic
+        self.queue_max = queue_max
+        self.backpressure_ratio = backpressure_ratio
+        self.max_wait = max_wait
+
+        self._poller = None
+        self._running = False
+        self._lock = threading.Lock()
+
+        # Delivery counters exposed through /health
+        self.produced = 0
+        self.delivered = 0
+        self.failed = 0
+        self.queue_full_waits = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._producer is not None
+
+    def start(self):
+        if self._producer is None:
+            self._producer = self._connect()
+        if self._producer is None or self._poller is not None:
+            return
+        self._running = True
+        self._poller = threading.Thread(target=self._poll_loop, name="kafka-delivery-poller", daemon=True)
+        self._poller.start()
+
+    def _poll_loop(self):
+        while self._running:
+            # Blocks up to 100ms waiting for delivery reports
+            self._producer.poll(0.1)
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the poller and flush whatever is still queued."""
+        if self._poller is None:
+            return
+        self._running = False
+        self._poller.join(timeout)
+        self._poller = None
+        remaining = self._producer.flush(timeout)
+        if remaining:
+            logger.warning(f"{remaining} results were still undelivered at shutdown.")
+
+    def _on_delivery(self, queued_at: float, err, msg):
+        latency = time.monotonic() - queued_at
+        with self._lock:
+            if err is not None:
+                self.failed += 1
+            else:
+                self.delivered += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+        if err is not None:
+            logger.error(f"Kafka delivery failed for monitor {msg.key()}: {err}")
+
+    def pressure(self) -> float:
+        """Fraction of the local producer queue currently in use."""
+        if self._producer is None:
+            return 0.0
+        return len(self._producer) / self.queue_max
+
+    def saturated(self) -> bool:
+        return self.pressure() >= self.backpressure_ratio
+
+    async def publish(self, key: str, value: str) -> bool:
+        """
+        Queue one result for delivery, waiting while the local queue is full.
+
+        Returns False only if the queue stayed full for `max_wait` seconds or
+        the producer rejected the message outright.
+        """
+        if self._producer is None:
+            return False
+
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            queued_at = time.monotonic()
+            try:
+                self._producer.produce(
+                    self.topic,
+                    key=key,
+                    value=value,
+                    on_delivery=lambda err, msg, t=queued_at: self._on_delivery(t, err, msg)
+                )
+                with self._lock:
+                    self.produced += 1
+                return True
+            except BufferError:
+                with self._lock:
+                    self.queue_full_waits += 1
+                if queued_at >= deadline:
+                    logger.error(f"Kafka queue stayed full for {self.max_wait}s; dropping result for {key}.")
+                    with self._lock:
+                        self.failed += 1
+                    return False
+                await asyncio.sleep(0.05)
+            except Exception as e:
+                logger.error(f"Failed to publish result to Kafka for {key}: {e}")
+                with self._lock:
+                    self.failed += 1
+                return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            mean_ms = self._latency_total / self.delivered * 1000 if self.delivered else 0.0
+            return {
+                "produced": self.produced,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "queue_full_waits": self.queue_full_waits,
+                "queue_depth": len(self._producer) if self._producer is not None else 0,
+                "queue_pressure": round(self.pressure(), 3),
+                "delivery_latency_ms": {"mean": round(mean_ms, 1), "max": round(self._latency_max * 1000, 1)}
+            }
+
+result_publisher = ResultPublisher(
+    get_kafka_producer,
+    KAFKA_TOPIC,
+    queue_max=KAFKA_QUEUE_MAX_MESSAGES,
+    backpressure_ratio=KAFKA_BACKPRESSURE_RATIO,
+    max_wait=KAFKA_PUBLISH_MAX_WAIT
+)
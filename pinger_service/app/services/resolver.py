@@ -0,0 +1,188 @@
+import asyncio
+import ipaddress
+import socket
+import time
+import httpcore
+from app.config import (
+    DNS_MIN_TTL, DNS_MAX_TTL, DNS_NEGATIVE_TTL, DNS_DEFAULT_TTL, DNS_CACHE_MAX_ENTRIES
+)
+from app.services.timing import current_timer
+
+try:
+    import aiodns
+except ImportError:  # TTL-aware lookups need c-ares; fall back to getaddrinfo
+    aiodns = None
+
+class Resolver:
+    """
+    Shared asynchronous DNS cache for the pinger's HTTP engine.
+
+    Answers are cached for their record TTL, clamped to [min_ttl, max_ttl].
+    Failed lookups are cached for `negative_ttl` so a dead hostname does not
+    hit the cluster resolver on every check, and concurrent lookups of the
+    same host share one query. Without aiodns, record TTLs are unknown and
+    `default_ttl` is used.
+    """
+
+    def __init__(self, min_ttl: float, max_ttl: float, negative_ttl: float,
+                 default_ttl: float, max_entries: int):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+
+        self._cache = {}  # { host: (expires_at, [addresses] or None) }
+        self._inflight = {}  # { host: Future }
+        self._dns = None
+
+        # Counters exposed through /health
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def resolve(self, host: str, port: int) -> list:
+        """Return the IP addresses for `host`, in preference order."""
+        entry = self._cache.get(host)
+        if entry is not None and entry[0] > time.monotonic():
+            if entry[1] is None:
+                self.negative_hits += 1
+                raise socket.gaierror(socket.EAI_NONAME, f"{host} did not resolve (cached)")
+            self.hits += 1
+            return entry[1]
+
+        pending = self._inflight.get(host)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[host] = future
+        try:
+            addresses, ttl = await self._lookup(host, port)
+            self._store(host, addresses, min(self.max_ttl, max(self.min_ttl, ttl)))
+            future.set_result(addresses)
+            return addresses
+        except (OSError, UnicodeError) as e:
+            # UnicodeError: a hostname that cannot be IDNA-encoded never resolves
+            self._store(host, None, self.negative_ttl)
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        except BaseException as e:
+            # Cancelled (e.g. timed out) or unexpected: release the waiters too
+            if not isinstance(e, Exception):
+                e = socket.gaierror(socket.EAI_AGAIN, f"lookup of {host} was abandoned")
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[host]
+
+    def _store(self, host: str, addresses, ttl: float):
+        if host not in self._cache and len(self._cache) >= self.max_entries:
+            # Evict the oldest insertion; dicts keep insertion order
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[host] = (time.monotonic() + ttl, addresses)
+
+    async def _lookup(self, host: str, port: int) -> tuple:
+        """Resolve `host`, returning (addresses, ttl_seconds)."""
+        if aiodns is not None:
+            if self._dns is None:
+                self._dns = aiodns.DNSResolver()
+            try:
+                answers = await asyncio.gather(
+                    self._dns.query(host, 'A'), self._dns.query(host, 'AAAA'),
+                    return_exceptions=True
+                )
+            except Exception:
+                answers = []  # c-ares unusable here; getaddrinfo below still works
+            addresses = []
+            ttls = []
+            for answer in answers:
+                if isinstance(answer, Exception):
+                    continue
+                for record in answer:
+                    addresses.append(record.host)
+                    ttls.append(record.ttl)
+            if addresses:
+                return addresses, min(ttls)
+
+        # Hosts file entries and platforms without c-ares
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = []
+        for _family, _type, _proto, _canon, sockaddr in infos:
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        return addresses, self.default_ttl
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+            "ttl_source": "dns" if aiodns is not None else "default"
+        }
+
+class ResolvingBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend that resolves hostnames itself before connecting.
+
+    Doing the lookup here makes DNS a separately timed phase of each check.
+    TLS still uses the original hostname for SNI and certificate checks,
+    because httpcore passes it to start_tls independently.
+    """
+
+    def __init__(self, inner: httpcore.AsyncNetworkBackend, resolver: Resolver):
+        self._inner = inner
+        self._resolver = resolver
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            ipaddress.ip_address(host)
+            addresses = [host]
+        except ValueError:
+            started = time.perf_counter()
+            try:
+                # The lookup counts against the connect timeout, as it did inside httpcore
+                addresses = await asyncio.wait_for(self._resolver.resolve(host, port), timeout)
+            except asyncio.TimeoutError as e:
+                raise httpcore.ConnectTimeout(f"DNS resolution timed out for {host}") from e
+            except (OSError, UnicodeError) as e:
+                raise httpcore.ConnectError(f"DNS resolution failed for {host}: {e}") from e
+            finally:
+                timer = current_timer.get()
+                if timer is not None:
+                    timer.add_dns(time.perf_counter() - started)
+
+        last_error = None
+        for address in addresses:
+            try:
+                return await self._inner.connect_tcp(
+                    address, port, timeout=timeout,
+                    local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        raise last_error or httpcore.ConnectError(f"No addresses found for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._inner.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._inner.sleep(seconds)
+
+dns_cache = Resolver(
+    min_ttl=DNS_MIN_TTL,
+    max_ttl=DNS_MAX_TTL,
+    negative_ttl=DNS_NEGATIVE_TTL,
+    default_ttl=DNS_DEFAULT_TTL,
+    max_entries=DNS_CACHE_MAX_ENTRIES
+)
@@ -1,58 +1,131 @@
+import time
 import httpx
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from app.config import logger, USER_SERVICE_URL, INTERNAL_API_KEY
+from app.config import (
+    logger, redis_client, USER_SERVICE_URL, INTERNAL_API_KEY,
+    SCHEDULER_TICK_SECONDS, MAX_IN_FLIGHT_CHECKS, FULL_SYNC_SECONDS,
+    PINGER_REPLICA_ID, SHARD_MEMBER_TTL, SHARD_VNODES,
+    PINGER_WORKERS, PINGER_WORKER_INDEX
+)
 from app.services.pinger import ping_url
+from app.services.check_scheduler import CheckScheduler
+from app.services.sharding import ShardMembership
+from app.services.publisher import result_publisher
 
-# Global scheduler for async tasks
+async def run_check(job):
+    """Adapter between the check scheduler and the ping routine."""
+    await ping_url(job.monitor_id, job.url, job.interval, job.probe_mode, job.max_body_bytes)
+
+# Housekeeping jobs (monitor sync, shard heartbeat) stay on APScheduler
 scheduler = AsyncIOScheduler()
-# Keep track of jobs to avoid duplicates and handle cleanup
-active_jobs = {} # { monitor_id: job_object }
+# Every monitor check owned by this replica lives in a single heap-based scheduler
+check_scheduler = CheckScheduler(
+    run_check,
+    tick_seconds=SCHEDULER_TICK_SECONDS,
+    max_in_flight=MAX_IN_FLIGHT_CHECKS,
+    throttle=result_publisher.saturated
+)
+shard = ShardMembership(
+    redis_client, PINGER_REPLICA_ID, SHARD_MEMBER_TTL, SHARD_VNODES,
+    worker_index=PINGER_WORKER_INDEX, worker_count=PINGER_WORKERS
+)
+# Every active monitor known to the cluster:
+# { monitor_id: (url, interval, probe_mode, max_body_bytes) }
+monitor_catalog = {}
+# Delta sync position in the User Service change feed
+sync_state = {"cursor": None, "last_full_sync": 0.0}
+
+def apply_shard(monitor_ids=None):
+    """
+    Reconcile the check scheduler with the monitors this replica owns.
+
+    Only `monitor_ids` are reconciled when given (delta sync); otherwise the
+    whole catalog is (full sync or rebalance). A monitor whose URL, interval
+    or probe settings changed is rescheduled. Returns the number of jobs (scheduled, removed).
+    """
+    if monitor_ids is None:
+        monitor_ids = monitor_catalog.keys() | check_scheduler.monitor_ids()
+
+    scheduled = 0
+    removed = 0
+    for m_id in monitor_ids:
+        definition = monitor_catalog.get(m_id)
+        if definition is not None and shard.owns(m_id):
+            m_url, m_interval, probe_mode, max_body_bytes = definition
+            if check_scheduler.upsert(m_id, m_url, m_interval, probe_mode, max_body_bytes):
+                logger.debug(f"Scheduled monitoring job: {m_url} (Interval: {m_interval}s)")
+                scheduled += 1
+        elif check_scheduler.remove(m_id):
+            # Deleted, deactivated or handed to another replica
+            logger.debug(f"Monitor {m_id} is no longer owned here. Deleting job.")
+            removed += 1
+    return scheduled, removed
+
+async def heartbeat_shards():
+    """
+    Keep this replica registered and rebalance when peers join or leave.
+    """
+    if await shard.heartbeat():
+        scheduled, removed = apply_shard()
+        logger.info(
+            f"Rebalanced shard for {shard.replica_id}: {len(check_scheduler)} jobs "
+            f"({scheduled} taken over, {removed} handed off) across {len(shard.members)} replicas."
+        )
 
 async def sync_monitors():
     """
-    Sync local scheduler with current monitors from the User Service.
+    Sync local scheduler with monitor changes from the User Service.
     
-    This picks up new monitors, stops removed ones, and uses a shared
-    internal key for security.
+    Uses the delta feed: only monitors changed since the last cursor are
+    transferred, deleted ones arrive as tombstones, and edits to a monitor's
+    URL or interval reschedule it. A full snapshot is requested on boot and
+    every FULL_SYNC_SECONDS. Only monitors in this replica's shard are
+    scheduled.
     """
-    logger.info("Syncing active monitors from core...")
+    if time.time() - sync_state["last_full_sync"] > FULL_SYNC_SECONDS:
+        sync_state["cursor"] = None
+
+    params = {"since": sync_state["cursor"]} if sync_state["cursor"] else {}
+    logger.debug(f"Syncing monitor changes from core (cursor={sync_state['cursor']})...")
     try:
         headers = {"X-Internal-API-Key": INTERNAL_API_KEY}
         async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{USER_SERVICE_URL}/all_monitors", headers=headers)
+            response = await client.get(
+                f"{USER_SERVICE_URL}/all_monitors/changes", params=params, headers=headers
+            )
             
             if response.status_code == 200:
-                monitors = response.json()
-                current_ids = set()
-                
-                for m in monitors:
-                    m_id = str(m['id'])
-                    m_url = m['url']
-                    m_interval = m.get('interval_seconds', 60)
-                    current_ids.add(m_id)
-                    
-                    # Add new jobs if they aren't already running
-                    if m_id not in active_jobs:
-                        logger.info(f"Adding new monitoring job: {m_url} (Interval: {m_interval}s)")
-                        job = scheduler.add_job(
-                            ping_url, 
-                            IntervalTrigger(seconds=m_interval),
-                            args=[m['id'], m_url, m_interval],
-                            id=m_id
+                feed = response.json()
+                if feed["full"]:
+                    monitor_catalog.clear()
+                    changed_ids = None
+                    sync_state["last_full_sync"] = time.time()
+                else:
+                    changed_ids = set(feed["deleted"])
+
+                for m in feed["monitors"]:
+                    if m.get("is_active", True):
+                        monitor_catalog[m['id']] = (
+                            m['url'],
+                            m.get('interval_seconds', 60),
+                            m.get('probe_mode') or 'GET',
+                            m.get('max_body_bytes')
                         )
-                        active_jobs[m_id] = job
-                
-                # Remove jobs for monitors that are no longer active
-                for old_id in list(active_jobs.keys()):
-                    if old_id not in current_ids:
-                        logger.info(f"Monitor {old_id} is no longer active. Deleting job.")
-                        try:
-                            scheduler.remove_job(old_id)
-                        except Exception:
-                            # Job might be gone already
-                            pass
-                        del active_jobs[old_id]
+                    else:
+                        monitor_catalog.pop(m['id'], None)
+                    if changed_ids is not None:
+                        changed_ids.add(m['id'])
+                for m_id in feed["deleted"]:
+                    monitor_catalog.pop(m_id, None)
+
+                scheduled, removed = apply_shard(changed_ids)
+                sync_state["cursor"] = feed["cursor"]
+                if feed["full"] or scheduled or removed:
+                    logger.info(
+                        f"{'Full' if feed['full'] else 'Delta'} sync complete: "
+                        f"{len(check_scheduler)}/{len(monitor_catalog)} jobs owned "
+                        f"({scheduled} scheduled, {removed} removed)."
+                    )
             else:
                 logger.error(f"Failed to sync monitors. Status: {response.status_code}")
                     
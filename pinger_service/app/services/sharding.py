@@ -0,0 +1,111 @@
+import bisect
+import hashlib
+import time
+from app.config import logger
+
+MEMBERS_KEY = "pinger:members"
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """
+    Consistent-hash ring mapping monitor ids to pinger replicas.
+
+    Each member is placed on the ring many times (virtual nodes) so shards stay
+    balanced, and a membership change only moves ~1/N of the monitors.
+    """
+
+    def __init__(self, members: list, vnodes: int = 128):
+        self.members = sorted(members)
+        points = []
+        for member in self.members:
+            for i in range(vnodes):
+                points.append((_hash(f"{member}#{i}"), member))
+        points.sort()
+        self._keys = [p[0] for p in points]
+        self._owners = [p[1] for p in points]
+
+    def owner(self, monitor_id) -> str:
+        if not self._keys:
+            return None
+        idx = bisect.bisect(self._keys, _hash(str(monitor_id))) % len(self._keys)
+        return self._owners[idx]
+
+class ShardMembership:
+    """
+    Tracks which pinger replicas are alive and which monitors this one owns.
+
+    Every replica heartbeats into a Redis sorted set scored by the last
+    heartbeat time; members that stop heartbeating age out after `member_ttl`.
+    When the live set changes, the ring is rebuilt and the caller rebalances.
+    Without Redis the replica owns every monitor, as before sharding.
+
+    In multi-process mode the replica's shard is further split between its
+    worker processes by a second, independent hash (`worker_index` of
+    `worker_count`).
+    """
+
+    def __init__(self, client, replica_id: str, member_ttl: float, vnodes: int = 128,
+                 worker_index: int = 0, worker_count: int = 1):
+        self._client = client
+        self.replica_id = replica_id
+        self.member_ttl = member_ttl
+        self.vnodes = vnodes
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.members = []
+        self._ring = None
+
+    async def heartbeat(self) -> bool:
+        """
+        Refresh this replica's membership and reload the live member list.
+
+        Returns True when the member set changed and shards must be rebalanced.
+        """
+        if self._client is None:
+            return False
+
+        now = time.time()
+        try:
+            async with self._client.pipeline(transaction=True) as pipe:
+                pipe.zadd(MEMBERS_KEY, {self.replica_id: now})
+                pipe.zremrangebyscore(MEMBERS_KEY, 0, now - self.member_ttl)
+                pipe.zrange(MEMBERS_KEY, 0, -1)
+                _, _, members = await pipe.execute()
+        except Exception as e:
+            # Keep the last known ring; the Redis lock still prevents double checks
+            logger.warning(f"Shard heartbeat failed for {self.replica_id}: {e}")
+            return False
+
+        members = sorted(members)
+        if members == self.members:
+            return False
+
+        logger.info(f"Pinger membership changed: {self.members} -> {members}")
+        self.members = members
+        self._ring = HashRing(members, self.vnodes)
+        return True
+
+    async def leave(self):
+        """Deregister on shutdown so peers take over this shard immediately."""
+        if self._client is None:
+            return
+        try:
+            await self._client.zrem(MEMBERS_KEY, self.replica_id)
+        except Exception as e:
+            logger.warning(f"Failed to leave pinger ring: {e}")
+
+    def owns(self, monitor_id) -> bool:
+        if self.worker_count > 1 and _hash(f"worker:{monitor_id}") % self.worker_count != self.worker_index:
+            return False
+        if self._ring is None:
+            return True
+        return self._ring.owner(monitor_id) == self.replica_id
+
+    def stats(self) -> dict:
+        return {
+            "replica_id": self.replica_id,
+            "members": len(self.members) or 1,
+            "worker": f"{self.worker_index + 1}/{self.worker_count}"
+        }
@@ -0,0 +1,75 @@
+import contextvars
+import time
+
+# Timer of the check currently running in this task (read by the DNS resolver)
+current_timer = contextvars.ContextVar("current_timer", default=None)
+
+class CheckTimer:
+    """
+    Monotonic-clock breakdown of a single check.
+
+    Phases are fed by httpcore trace events plus the resolver, and summed
+    across redirect hops:
+    - dns: hostname resolution
+    - connect: TCP connect, excluding DNS
+    - tls: TLS handshake
+    - ttfb: request sent until response headers arrived (server wait)
+    - total: whole check, including reading the body
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self._marks = {}
+
+    def add_dns(self, seconds: float):
+        self.dns += seconds
+
+    async def trace(self, event_name: str, info: dict):
+        """httpcore `trace` extension callback."""
+        now = time.perf_counter()
+        # e.g. "connection.connect_tcp.started" or "http11.receive_response_headers.complete"
+        _, _, name = event_name.partition(".")
+        step, _, edge = name.rpartition(".")
+
+        if edge == "started":
+            self._marks[step] = now
+            if step == "connect_tcp":
+                self._marks["dns_before_connect"] = self.dns
+            return
+
+        started = self._marks.pop(step, None)
+        if started is None:
+            return
+        if step == "connect_tcp":
+            # DNS runs inside connect_tcp; keep the phases separate
+            dns_during = self.dns - self._marks.pop("dns_before_connect", 0.0)
+            self.connect += max(0.0, now - started - dns_during)
+        elif step == "start_tls":
+            self.tls += now - started
+        elif step == "send_request_headers":
+            self._marks["request_sent"] = now
+        elif step == "receive_response_headers":
+            self.ttfb += now - self._marks.pop("request_sent", started)
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    def breakdown(self) -> dict:
+        """Phase durations in milliseconds, as published in check results."""
+        return {
+            "dns_ms": round(self.dns * 1000, 1),
+            "connect_ms": round(self.connect * 1000, 1),
+            "tls_ms": round(self.tls * 1000, 1),
+            "ttfb_ms": round(self.ttfb * 1000, 1),
+            "total_ms": round(self.total * 1000, 1)
+        }
@@ -0,0 +1,171 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from app.config import logger, WORKER_REPORT_SECONDS
+
+def run_worker(index: int, count: int, reports):
+    """
+    Entry point of one pinger worker process.
+
+    Each worker runs the full check engine on its own event loop (uvloop when
+    installed) and owns a disjoint slice of this replica's monitors. Stats are
+    pushed to the supervisor every WORKER_REPORT_SECONDS.
+    """
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
+    asyncio.run(_serve_worker(index, count, reports))
+
+async def _serve_worker(index: int, count: int, reports):
+    # Imported inside the worker so the engine is built on this process's loop
+    from app.services.engine import start_engine, stop_engine, engine_stats
+    from app.services.scheduler import shard
+
+    # app.config was already imported when this process unpickled its target
+    shard.worker_index = index
+    shard.worker_count = count
+
+    stop = asyncio.Event()
+    startup = asyncio.ensure_future(start_engine())
+
+    def on_signal():
+        stop.set()
+        startup.cancel()  # No-op once the engine is up
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, on_signal)
+
+    try:
+        await startup
+    except asyncio.CancelledError:
+        return  # Stopped before the engine came up; nothing to drain
+
+    last_completed = 0
+    last_report = time.monotonic()
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=WORKER_REPORT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+            stats = engine_stats()
+            now = time.monotonic()
+            completed = stats["scheduler"]["completed"]
+            stats["checks_per_second"] = round((completed - last_completed) / (now - last_report), 2)
+            last_completed, last_report = completed, now
+            try:
+                reports.put_nowait({"worker": index, "pid": os.getpid(), "reported_at": time.time(), **stats})
+            except queue.Full:
+                pass
+    finally:
+        # The supervisor leaves the ring for the whole replica
+        await stop_engine(leave_ring=False)
+
+class WorkerSupervisor:
+    """
+    Runs N pinger worker processes inside one container.
+
+    One event loop can only use one core, so JSON encoding, TLS and scheduling
+    are spread over processes instead. The supervisor collects worker reports
+    for /health and restarts workers that die unexpectedly.
+    """
+
+    def __init__(self, count: int):
+        self.count = count
+        self._ctx = multiprocessing.get_context("spawn")
+        self._reports = self._ctx.Queue(maxsize=count * 10)
+        self._processes = {}  # { index: Process }
+        self._latest = {}  # { index: last report }
+        self._restarts = 0
+        self._running = False
+        self._collector = None
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(index, self.count, self._reports),
+            name=f"pinger-worker-{index}"
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info(f"Started pinger worker {index} (pid {process.pid}).")
+
+    def start(self):
+        self._running = True
+        for index in range(self.count):
+            self._spawn(index)
+        self._collector = threading.Thread(target=self._collect, name="worker-supervisor", daemon=True)
+        self._collector.start()
+
+    def _collect(self):
+        while self._running:
+            try:
+                report = self._reports.get(timeout=1.0)
+                self._latest[report["worker"]] = report
+            except queue.Empty:
+                pass
+
+            for index, process in list(self._processes.items()):
+                if self._running and not process.is_alive():
+                    logger.error(f"Pinger worker {index} exited with code {process.exitcode}. Restarting...")
+                    self._latest.pop(index, None)
+                    self._restarts += 1
+                    self._spawn(index)
+
+    def stop(self, timeout: float = 15.0):
+        """Ask every worker to shut down gracefully, then force the stragglers."""
+        self._running = False
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM -> graceful engine stop
+        deadline = time.monotonic() + timeout
+        for index, process in self._processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Pinger worker {index} did not stop in time; killing it.")
+                process.kill()
+                process.join()
+
+    def stats(self) -> dict:
+        """Job counts and throughput aggregated across worker reports."""
+        reports = [self._latest[i] for i in sorted(self._latest)]
+        return {
+            "mode": "supervisor",
+            "workers_alive": sum(1 for p in self._processes.values() if p.is_alive()),
+            "workers_configured": self.count,
+            "worker_restarts": self._restarts,
+            # Healthy only if every reporting worker is connected
+            "infrastructure": {
+                "kafka": bool(reports) and all(r["infrastructure"]["kafka"] for r in reports),
+                "redis": bool(reports) and all(r["infrastructure"]["redis"] for r in reports)
+            },
+            "jobs_active": sum(r["jobs_active"] for r in reports),
+            "throughput": {
+                "checks_per_second": round(sum(r["checks_per_second"] for r in reports), 2),
+                "dispatched": sum(r["scheduler"]["dispatched"] for r in reports),
+                "completed": sum(r["scheduler"]["completed"] for r in reports),
+                "in_flight": sum(r["scheduler"]["in_flight"] for r in reports)
+            },
+            "workers": [
+                {
+                    "worker": r["worker"],
+                    "pid": r["pid"],
+                    "jobs_active": r["jobs_active"],
+                    "checks_per_second": r["checks_per_second"],
+                    "report_age_s": round(time.time() - r["reported_at"], 1),
+                    "http_pool": r["http_pool"],
+                    "dns_cache": r["dns_cache"],
+                    "kafka_producer": r["kafka_producer"]
+                }
+                for r in reports
+            ]
+        }
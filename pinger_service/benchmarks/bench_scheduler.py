@@ -0,0 +1,78 @@
+"""
+Scheduling overhead benchmark for the heap-based CheckScheduler.
+
+Run from the pinger_service directory:
+
+    python -m benchmarks.bench_scheduler [sizes...]
+
+For each monitor count it reports the time and memory needed to schedule
+every monitor, then simulates a window of virtual time and measures how long
+each scheduler tick takes to pop, re-queue and launch the due checks (the
+checks themselves are no-ops, so this is pure scheduling cost).
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+from app.services.check_scheduler import CheckScheduler
+
+INTERVALS = (10, 30, 60, 300)
+TICK_SECONDS = 0.2
+SIMULATED_SECONDS = 20
+
+async def noop_check(job):
+    return None
+
+def build(size: int) -> CheckScheduler:
+    sched = CheckScheduler(noop_check, tick_seconds=TICK_SECONDS, max_in_flight=10 ** 9)
+    for monitor_id in range(size):
+        sched.upsert(monitor_id, f"https://example-{monitor_id % 5000}.com", INTERVALS[monitor_id % len(INTERVALS)], now=0.0)
+    return sched
+
+async def run_ticks(sched: CheckScheduler) -> list:
+    durations = []
+    ticks = int(SIMULATED_SECONDS / TICK_SECONDS)
+    for i in range(1, ticks + 1):
+        started = time.perf_counter()
+        sched._dispatch_due(i * TICK_SECONDS)
+        # Let the launched no-op checks run to completion
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+async def bench(size: int) -> dict:
+    started = time.perf_counter()
+    sched = build(size)
+    build_seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    traced = build(size)
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    durations = await run_ticks(sched)
+    durations.sort()
+    tick_total = sum(durations)
+    return {
+        "monitors": size,
+        "build_s": build_seconds,
+        "bytes_per_monitor": memory_bytes / size,
+        "checks": sched.dispatched,
+        "tick_mean_ms": tick_total / len(durations) * 1000,
+        "tick_p99_ms": durations[int(len(durations) * 0.99) - 1] * 1000,
+        "us_per_check": tick_total / max(1, sched.dispatched) * 1_000_000
+    }
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'monitors':>10} {'build s':>9} {'B/monitor':>10} {'checks':>9} "
+          f"{'tick ms':>9} {'p99 ms':>9} {'us/check':>9}")
+    for size in sizes:
+        r = asyncio.run(bench(size))
+        print(f"{r['monitors']:>10} {r['build_s']:>9.2f} {r['bytes_per_monitor']:>10.0f} {r['checks']:>9} "
+              f"{r['tick_mean_ms']:>9.2f} {r['tick_p99_ms']:>9.2f} {r['us_per_check']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,56 @@ logger = logging.getLogger("ProcessorService")
 KAFKA_BROKER = os.environ.get("KAFKA_BROKER", "kafka:9092")
 KAFKA_RESULTS_TOPIC = "monitoring-results"
 KAFKA_ALERTS_TOPIC = "monitoring-alerts" 
+KAFKA_CONSUMER_GROUP = "processor-group-v1.6"
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
 REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
 USER_SERVICE_URL = os.environ.get("USER_SERVICE_URL", "http://user_service:5000")
 INTERNAL_API_KEY = os.environ.get("INTERNAL_API_KEY")
 
+# Internal API client (processor -> user_service)
+API_TIMEOUT = float(os.environ.get("API_TIMEOUT", 3))
+API_POOL_SIZE = int(os.environ.get("API_POOL_SIZE", 10))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", 15))
+RETRY_QUEUE_MAX = int(os.environ.get("RETRY_QUEUE_MAX", 10000))
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", 10))
+RETRY_BACKOFF_BASE = float(os.environ.get("RETRY_BACKOFF_BASE", 0.5))
+RETRY_BACKOFF_MAX = float(os.environ.get("RETRY_BACKOFF_MAX", 30))
+
+# Writer for uptime counts and incidents: "http" (User Service internal API)
+# or "postgres" (direct, set-based statements over a small connection pool)
+PROCESSOR_WRITER = os.environ.get("PROCESSOR_WRITER", "http")
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_USER = os.environ.get("POSTGRES_USER", "uptime_user")
+DB_PASS = os.environ.get("POSTGRES_PASSWORD", "uptime_password")
+DB_NAME = os.environ.get("POSTGRES_DB", "uptime_db")
+DATABASE_URL = os.environ.get("DATABASE_URL", f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}")
+PG_POOL_SIZE = int(os.environ.get("PG_POOL_SIZE", 4))
+
+# Batch consumption: take up to N results, or whatever arrived within the wait
+PROCESSOR_BATCH_SIZE = int(os.environ.get("PROCESSOR_BATCH_SIZE", 500))
+PROCESSOR_BATCH_WAIT_MS = int(os.environ.get("PROCESSOR_BATCH_WAIT_MS", 100))
+HISTORY_LENGTH = int(os.environ.get("HISTORY_LENGTH", 20))
+# Records kept in each monitor's packed history ring (24h of 1-minute checks)
+HISTORY_RING_SIZE = int(os.environ.get("HISTORY_RING_SIZE", 1440))
+# Retention of the 1-minute, 1-hour and 1-day rollup buckets, in seconds
+ROLLUP_RETENTION_MINUTE = int(os.environ.get("ROLLUP_RETENTION_MINUTE", 2 * 86400))
+ROLLUP_RETENTION_HOUR = int(os.environ.get("ROLLUP_RETENTION_HOUR", 35 * 86400))
+ROLLUP_RETENTION_DAY = int(os.environ.get("ROLLUP_RETENTION_DAY", 400 * 86400))
+METRICS_LOG_SECONDS = int(os.environ.get("METRICS_LOG_SECONDS", 30))
+# Parallel mode: worker threads keyed by monitor_id (1 = process inline)
+PROCESSOR_WORKERS = int(os.environ.get("PROCESSOR_WORKERS", 1))
+WORKER_QUEUE_SIZE = int(os.environ.get("WORKER_QUEUE_SIZE", 16))
+# Local cache of monitor UP/DOWN state in front of Redis
+STATE_CACHE_MAX_ENTRIES = int(os.environ.get("STATE_CACHE_MAX_ENTRIES", 100000))
+STATE_CACHE_TTL = float(os.environ.get("STATE_CACHE_TTL", 300))
+# Uptime counts are summed in memory and flushed in bulk this often; offsets
+# are committed right after each successful flush
+STATS_FLUSH_SECONDS = float(os.environ.get("STATS_FLUSH_SECONDS", 5))
+# Partitions whose stats checkpoints cannot be loaded stay paused; retry backoff
+CHECKPOINT_RETRY_SECONDS = float(os.environ.get("CHECKPOINT_RETRY_SECONDS", 1))
+CHECKPOINT_RETRY_MAX_SECONDS = float(os.environ.get("CHECKPOINT_RETRY_MAX_SECONDS", 30))
+
 def get_redis_client():
     """Initializes and returns a Redis client."""
     try:
@@ -1,81 +1,253 @@
-from confluent_kafka import Consumer, KafkaError
+from confluent_kafka import Consumer, KafkaError, TopicPartition
 import json
 import time
 from app.config import (
-    logger, KAFKA_BROKER, KAFKA_RESULTS_TOPIC, redis_client
+    logger, KAFKA_BROKER, KAFKA_RESULTS_TOPIC, KAFKA_CONSUMER_GROUP, redis_client,
+    PROCESSOR_BATCH_SIZE, PROCESSOR_BATCH_WAIT_MS, METRICS_LOG_SECONDS, STATS_FLUSH_SECONDS,
+    PROCESSOR_WORKERS, WORKER_QUEUE_SIZE
 )
-from app.services.processor_logic import update_uptime_stats, handle_state_transition
+from app.services.processor_logic import (
+    handle_state_transition, record_transitions, cache_result, check_epoch, state_store, pg_writer
+)
+from app.services.metrics import BatchMetrics
+from app.services.stats_aggregator import StatsAggregator
+from app.services.api import internal_api
+from app.services.offsets import OffsetTracker, AppliedWatermarks
+from app.services.workers import WorkerPool
+
+# Uptime counts are summed per batch window and flushed to the User Service in bulk
+stats_aggregator = StatsAggregator(KAFKA_CONSUMER_GROUP, STATS_FLUSH_SECONDS, pg_writer)
+# Offsets are committed only once every earlier offset of the partition is processed
+offset_tracker = OffsetTracker()
+commit_positions = {}  # { partition: next offset to commit }
+# Released offsets whose side effects must not be re-applied on replay
+applied_offsets = AppliedWatermarks(redis_client, f"processor:applied:{KAFKA_CONSUMER_GROUP}")
+
+metrics = BatchMetrics(METRICS_LOG_SECONDS, sources={
+    "stats": stats_aggregator.stats,
+    "api": internal_api.stats,
+    **({"writer": pg_writer.stats} if pg_writer else {}),
+    "state": state_store.cache.stats,
+    "offsets": lambda: {
+        "in_flight": offset_tracker.pending(),
+        "staged": len(commit_positions),
+        "replayed": applied_offsets.replayed
+    }
+})
+
+def process_messages(messages: list):
+    """
+    Handle a run of results pulled from Kafka, in consume order.
+
+    State transitions are claimed per result, and their incidents are stored
+    in one write for the run before any of its offsets is marked done; every
+    dashboard cache write of the run goes out in one Redis pipeline. Each
+    message is then marked done with its (monitor_id, is_up), which the
+    consume loop counts towards the uptime stats once its offset is released.
+    Replayed messages whose side effects were already applied are only
+    counted.
+    """
+    started = time.perf_counter()
+    pipe = redis_client.pipeline(transaction=False) if redis_client else None
+    processed = 0
+    errors = 0
+    oldest_check = None
+    results = []
+    transitions = []
+
+    for msg in messages:
+        data = {}
+        result = None
+        try:
+            # Decode JSON result from the pinger
+            raw_val = msg.value().decode('utf-8')
+            data = json.loads(raw_val)
+            monitor_id = data.get('monitor_id')
+            is_up = data.get('is_up')
+
+            if monitor_id is not None and applied_offsets.covers(msg.partition(), msg.offset()):
+                result = (monitor_id, is_up)
+            elif monitor_id is not None:
+                # 1. Claim state transitions; recorded and alerted after the run
+                handle_state_transition(monitor_id, is_up, data, transitions)
+
+                # 2. Cache real-time status, history and the per-minute
+                #    DNS/connect/TLS/TTFB breakdown for the dashboard
+                if pipe is not None:
+                    cache_result(pipe, monitor_id, raw_val, data)
+
+                # 3. Counted towards the long-term aggregate stats on release
+                result = (monitor_id, is_up)
+                processed += 1
+                checked_at = check_epoch(data)
+                if oldest_check is None or checked_at < oldest_check:
+                    oldest_check = checked_at
+
+        except Exception as e:
+            errors += 1
+            logger.error(f"Failed to process message for monitor {data.get('monitor_id')}: {e}")
+        results.append((msg.partition(), msg.offset(), result))
+
+    try:
+        record_transitions(transitions)
+    except Exception as e:
+        errors += 1
+        logger.error(f"Failed to record {len(transitions)} state transitions: {e}")
+
+    redis_seconds = 0.0
+    if pipe is not None and len(pipe):
+        redis_started = time.perf_counter()
+        try:
+            pipe.execute()
+        except Exception as e:
+            errors += 1
+            logger.error(f"Failed to write cache pipeline for {processed} results: {e}")
+        redis_seconds = time.perf_counter() - redis_started
+
+    for partition, offset, result in results:
+        offset_tracker.done(partition, offset, result)
+
+    result_age = time.time() - oldest_check if oldest_check is not None else 0.0
+    metrics.record(processed, errors, time.perf_counter() - started, redis_seconds, result_age)
+
+# Parallel mode: results routed by monitor_id to fixed worker threads
+worker_pool = WorkerPool(PROCESSOR_WORKERS, process_messages, WORKER_QUEUE_SIZE) if PROCESSOR_WORKERS > 1 else None
+
+def dispatch(messages: list):
+    """Track offsets in consume order, then process inline or on the pool."""
+    valid = []
+    for msg in messages:
+        if msg.error():
+            if msg.error().code() != KafkaError._PARTITION_EOF:
+                logger.error(f"Kafka stream error: {msg.error()}")
+            continue
+        offset_tracker.track(msg.partition(), msg.offset())
+        valid.append(msg)
+
+    if not valid:
+        return
+    if worker_pool:
+        worker_pool.submit(valid)
+    else:
+        process_messages(valid)
+
+def release_offsets():
+    """Count released results towards the stats and stage their offsets for commit."""
+    positions, released = offset_tracker.release()
+    for partition, offset, result in released:
+        if result is not None:
+            stats_aggregator.add(partition, offset, *result)
+    applied_offsets.save(positions)
+    commit_positions.update(positions)
+
+def flush_and_commit(consumer, partitions=None, asynchronous=True):
+    """
+    Flush the uptime counts, then commit the offsets they cover.
+
+    Committing only after a successful flush keeps the counters exact: a
+    crash before the flush replays the results, and the User Service's
+    checkpoints drop whatever was already counted.
+    """
+    release_offsets()
+    if stats_aggregator.flush(partitions):
+        commit_offsets(consumer, partitions, asynchronous)
+
+def commit_offsets(consumer, partitions=None, asynchronous=True):
+    """Commit staged positions (optionally only for `partitions`) in one request."""
+    selected = {p: o for p, o in commit_positions.items() if partitions is None or p in partitions}
+    if not selected:
+        return
+    try:
+        consumer.commit(
+            offsets=[TopicPartition(KAFKA_RESULTS_TOPIC, p, o) for p, o in selected.items()],
+            asynchronous=asynchronous
+        )
+        for p in selected:
+            commit_positions.pop(p, None)
+    except Exception as e:
+        logger.warning(f"Offset commit failed: {e}")
+
+def on_assign(consumer, partitions):
+    """Rebalance: another processor may have moved states we had cached."""
+    state_store.cache.clear()
+    stats_aggregator.on_assign(consumer, partitions)
+    applied_offsets.load([tp.partition for tp in partitions])
+
+def on_revoke(consumer, partitions):
+    """Rebalance: finish and commit everything of the partitions we hand over."""
+    revoked = {tp.partition for tp in partitions}
+    if worker_pool:
+        worker_pool.drain()
+    flush_and_commit(consumer, revoked, asynchronous=False)
+    stats_aggregator.on_revoke(consumer, partitions)
+    offset_tracker.forget(revoked)
+    applied_offsets.forget(revoked)
+    for p in revoked:
+        commit_positions.pop(p, None)
+    state_store.cache.clear()
 
 def consume_results():
     """
     Main ingestion loop for monitoring results.
-    
-    Kafka processes health checks asynchronously, decoupling 
-    pinger output from database writes.
+
+    Kafka processes health checks asynchronously, decoupling
+    pinger output from database writes. Offsets are committed manually,
+    in batches, once the messages up to them are fully processed and their
+    uptime counts are flushed.
     """
     conf = {
         'bootstrap.servers': KAFKA_BROKER,
-        'group.id': 'processor-group-v1.6', 
+        'group.id': KAFKA_CONSUMER_GROUP,
         'auto.offset.reset': 'earliest',
-        'enable.auto.commit': True
+        'enable.auto.commit': False
     }
-    
+
     consumer = None
     # Retry Kafka connection to handle broker startup
     for i in range(20):
         try:
             consumer = Consumer(conf)
-            consumer.subscribe([KAFKA_RESULTS_TOPIC])
+            consumer.subscribe(
+                [KAFKA_RESULTS_TOPIC],
+                on_assign=on_assign,
+                on_revoke=on_revoke
+            )
             logger.info(f"Subscribed to topic: {KAFKA_RESULTS_TOPIC}")
             break
         except Exception as e:
             logger.warning(f"Kafka unavailable ({i+1}): {e}. Retrying in 5s...")
             time.sleep(5)
-    
+
     if not consumer:
         logger.error("Could not connect to Kafka. Shutting down.")
         return
 
+    if worker_pool:
+        worker_pool.start()
     try:
         while True:
-            msg = consumer.poll(1.0)
-            if msg is None:
-                continue
-            if msg.error():
-                if msg.error().code() == KafkaError._PARTITION_EOF:
-                    continue
-                logger.error(f"Kafka stream error: {msg.error()}")
-                continue
-
-            try:
-                # Decode JSON result from the pinger
-                data = json.loads(msg.value().decode('utf-8'))
-                monitor_id = data.get('monitor_id')
-                is_up = data.get('is_up')
-                
-                if monitor_id is None:
-                    continue
-
-                # 1. Update long-term aggregate stats in the DB
-                update_uptime_stats(monitor_id, is_up)
-                
-                # 2. Check for state transitions and trigger alerts
-                handle_state_transition(monitor_id, is_up, data)
-
-                # 3. Cache real-time status and history for the dashboard
-                if redis_client:
-                    raw_val = msg.value().decode('utf-8')
-                    redis_client.set(f"monitor:{monitor_id}:status", raw_val)
-                    redis_client.lpush(f"monitor:{monitor_id}:history", raw_val)
-                    # Keep only the last 20 results for sparkline charts
-                    redis_client.ltrim(f"monitor:{monitor_id}:history", 0, 19)
-
-            except Exception as e:
-                logger.error(f"Failed to process message for monitor {data.get('monitor_id')}: {e}")
+            # Up to PROCESSOR_BATCH_SIZE results, or whatever arrived within the wait
+            messages = consumer.consume(
+                num_messages=PROCESSOR_BATCH_SIZE,
+                timeout=PROCESSOR_BATCH_WAIT_MS / 1000
+            )
+            if messages:
+                dispatch(messages)
+
+            release_offsets()
+            stats_aggregator.retry_checkpoints(consumer)
+            if stats_aggregator.due():
+                flush_and_commit(consumer)
+            metrics.maybe_log()
 
     finally:
-        # Ensure offsets are committed on shutdown
+        # Finish in-flight work, flush pending counts, then commit what they cover
+        if worker_pool:
+            worker_pool.stop()
+        flush_and_commit(consumer, asynchronous=False)
         consumer.close()
+        if pg_writer:
+            pg_writer.close()
 
 if __name__ == "__main__":
     # Delay to allow infrastructure (Kafka/Redis) to settle in dev environments
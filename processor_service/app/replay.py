@@ -0,0 +1,226 @@
+"""
+Replay mode: rebuild Redis caches and uptime aggregates from Kafka.
+
+Rewinds the results topic to a point in time (or an offset) and reprocesses
+everything up to the end of each partition as of start-up:
+
+    python -m app.replay --since 2026-01-31T00:00:00
+    python -m app.replay --from-offset 0 --partitions 0,2 --counters
+
+Redis status, history, packed history and monitor states are rebuilt in one
+pipeline per batch. A result older than what is already cached for its
+monitor is not written over it, so the live Processor may keep running. No
+incidents are recorded and no alerts are emitted, and the live Processor's
+committed offsets are left untouched.
+
+Anything that only ever adds up is opt-in, since replaying it over data
+that is still there counts it twice:
+
+--counters  Timing buckets and rollups; for a Redis that lost them.
+--stats     Uptime counts, for results the live Processor committed without
+            counting (e.g. after the stats tables were restored from a
+            backup). Ranges at or below its stats checkpoints are refused,
+            and results from its committed offset on are left to it. Counts
+            are flushed under their own checkpoints, so an interrupted
+            replay can simply be restarted.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from confluent_kafka import Consumer, TopicPartition
+from app.config import (
+    logger, KAFKA_BROKER, KAFKA_RESULTS_TOPIC, KAFKA_CONSUMER_GROUP, redis_client, STATS_FLUSH_SECONDS
+)
+from app.services.processor_logic import cache_result, check_epoch, state_store, pg_writer
+from app.services.stats_aggregator import StatsAggregator
+
+REPLAY_BATCH_SIZE = 5000
+REPLAY_GROUP = f"{KAFKA_CONSUMER_GROUP}-replay"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild Redis caches and uptime stats from Kafka.")
+    start = parser.add_mutually_exclusive_group(required=True)
+    start.add_argument("--since", help="ISO timestamp (UTC) to rewind to, e.g. 2026-01-31T00:00:00")
+    start.add_argument("--from-offset", type=int, help="Offset to rewind every selected partition to")
+    parser.add_argument("--partitions", help="Comma-separated partitions (default: all)")
+    parser.add_argument("--stats", action="store_true",
+                        help="Add results the live processor committed but never counted to the uptime stats")
+    parser.add_argument("--counters", action="store_true", help="Also replay timing buckets and rollups")
+    parser.add_argument("--batch-size", type=int, default=REPLAY_BATCH_SIZE)
+    return parser.parse_args(argv)
+
+def start_positions(consumer, args) -> dict:
+    """{partition: (first offset, end offset)} for the selected partitions."""
+    metadata = consumer.list_topics(KAFKA_RESULTS_TOPIC, timeout=10)
+    partitions = sorted(metadata.topics[KAFKA_RESULTS_TOPIC].partitions)
+    if args.partitions:
+        selected = {int(p) for p in args.partitions.split(",")}
+        partitions = [p for p in partitions if p in selected]
+
+    if args.since:
+        since = datetime.fromisoformat(args.since)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        wanted = [TopicPartition(KAFKA_RESULTS_TOPIC, p, int(since.timestamp() * 1000)) for p in partitions]
+        starts = {tp.partition: tp.offset for tp in consumer.offsets_for_times(wanted, timeout=10)}
+    else:
+        starts = {p: args.from_offset for p in partitions}
+
+    positions = {}
+    for p in partitions:
+        low, high = consumer.get_watermark_offsets(TopicPartition(KAFKA_RESULTS_TOPIC, p), timeout=10)
+        # offsets_for_times gives -1 when nothing is that recent
+        first = high if starts[p] < 0 else min(max(starts[p], low), high)
+        if first < high:
+            positions[p] = (first, high)
+    return positions
+
+def stats_ranges(positions: dict):
+    """
+    {partition: end of the range to count} for --stats, or None to refuse.
+
+    Only results the live processor has committed (so will not read again)
+    but not counted (above its stats checkpoints) may be counted here.
+    """
+    live = StatsAggregator(KAFKA_CONSUMER_GROUP, STATS_FLUSH_SECONDS, pg_writer)
+    if not live.load_checkpoints():
+        logger.error("Could not load the live processor's stats checkpoints.")
+        return None
+    refused = [p for p, (first, _) in positions.items() if first <= live.checkpoint(p)]
+    for p in refused:
+        logger.error(
+            f"Partition {p}: offsets up to {live.checkpoint(p)} are already counted by the live "
+            f"processor; start stats replay at {live.checkpoint(p) + 1} or later."
+        )
+    if refused:
+        return None
+
+    probe = Consumer({'bootstrap.servers': KAFKA_BROKER, 'group.id': KAFKA_CONSUMER_GROUP})
+    try:
+        committed = probe.committed([TopicPartition(KAFKA_RESULTS_TOPIC, p) for p in positions], timeout=10)
+    finally:
+        probe.close()
+    return {tp.partition: min(positions[tp.partition][1], max(tp.offset, 0)) for tp in committed}
+
+def cached_epochs(monitor_ids) -> dict:
+    """{monitor_id: check time of its cached status} for monitors that have one."""
+    monitor_ids = list(monitor_ids)
+    statuses = redis_client.mget([f"monitor:{m}:status" for m in monitor_ids])
+    epochs = {}
+    for monitor_id, raw in zip(monitor_ids, statuses):
+        if raw:
+            try:
+                epochs[monitor_id] = check_epoch(json.loads(raw))
+            except ValueError:
+                pass
+    return epochs
+
+def replay_batch(messages: list, ends: dict, aggregator, counters: bool, stats_ends: dict = None) -> int:
+    """Rebuild the caches for one batch in a single pipeline; returns results replayed."""
+    results = []
+    for msg in messages:
+        if msg.error() or msg.offset() >= ends.get(msg.partition(), 0):
+            continue
+        try:
+            raw_val = msg.value().decode('utf-8')
+            data = json.loads(raw_val)
+        except Exception as e:
+            logger.error(f"Skipping unreadable result at {msg.partition()}:{msg.offset()}: {e}")
+            continue
+        if data.get('monitor_id') is not None:
+            results.append((msg.partition(), msg.offset(), raw_val, data))
+
+    # Never put an older result over what the live processor cached since
+    newest = cached_epochs({data['monitor_id'] for _, _, _, data in results}) if results else {}
+    pipe = redis_client.pipeline(transaction=False)
+    latest = {}  # { monitor_id: (is_up, checked_at) }, last result per monitor
+    replayed = 0
+    for partition, offset, raw_val, data in results:
+        monitor_id = data['monitor_id']
+        checked_at = check_epoch(data)
+        try:
+            is_newer = checked_at > newest.get(monitor_id, float("-inf"))
+            cache_result(pipe, monitor_id, raw_val, data, counters=counters, latest=is_newer)
+            if is_newer:
+                newest[monitor_id] = checked_at
+                latest[monitor_id] = (data.get('is_up'), checked_at)
+            if aggregator and offset < stats_ends.get(partition, 0):
+                aggregator.add(partition, offset, monitor_id, data.get('is_up'))
+            replayed += 1
+        except Exception as e:
+            logger.error(f"Failed to replay result at {partition}:{offset}: {e}")
+
+    for monitor_id, (is_up, checked_at) in latest.items():
+        state_store.restore(pipe, monitor_id, "UP" if is_up else "DOWN", checked_at)
+    if len(pipe):
+        pipe.execute()
+    return replayed
+
+def replay(args) -> int:
+    if not redis_client:
+        logger.error("Redis unavailable; nothing to rebuild into.")
+        return 1
+
+    consumer = Consumer({
+        'bootstrap.servers': KAFKA_BROKER,
+        'group.id': REPLAY_GROUP,
+        'enable.auto.commit': False
+    })
+    aggregator = None
+    stats_ends = None
+    try:
+        positions = start_positions(consumer, args)
+        if not positions:
+            logger.info("Nothing to replay.")
+            return 0
+        if args.stats:
+            stats_ends = stats_ranges(positions)
+            if stats_ends is None:
+                logger.error("Refusing to replay stats that could be counted twice.")
+                return 1
+            aggregator = StatsAggregator(REPLAY_GROUP, STATS_FLUSH_SECONDS, pg_writer)
+            if not aggregator.load_checkpoints():
+                logger.error("Could not load replay checkpoints; refusing to risk double counting.")
+                return 1
+            logger.info(f"Counting uptime stats for offsets below {stats_ends}.")
+        ends = {p: end for p, (_, end) in positions.items()}
+        consumer.assign([TopicPartition(KAFKA_RESULTS_TOPIC, p, first) for p, (first, _) in positions.items()])
+        next_offsets = {p: first for p, (first, _) in positions.items()}
+        total = sum(end - first for first, end in positions.values())
+        logger.info(f"Replaying {total} results from {len(positions)} partition(s).")
+
+        started = last_report = time.monotonic()
+        replayed = since_report = 0
+        while any(next_offsets[p] < ends[p] for p in ends):
+            messages = consumer.consume(num_messages=args.batch_size, timeout=1.0)
+            # Positions also move past gaps (compaction, transaction markers)
+            for tp in consumer.position([TopicPartition(KAFKA_RESULTS_TOPIC, p) for p in ends]):
+                if tp.offset >= 0:
+                    next_offsets[tp.partition] = tp.offset
+            if not messages:
+                continue
+
+            count = replay_batch(messages, ends, aggregator, args.counters, stats_ends)
+            replayed += count
+            since_report += count
+            if aggregator and aggregator.due():
+                aggregator.flush()
+
+            now = time.monotonic()
+            if now - last_report >= 5:
+                lag = sum(max(0, ends[p] - next_offsets[p]) for p in ends)
+                logger.info(f"Replay: {since_report / (now - last_report):.0f} msg/s, {lag} remaining.")
+                last_report, since_report = now, 0
+
+        if aggregator and not aggregator.flush():
+            logger.error("Final stats flush failed; re-run the same replay to finish counting.")
+            return 1
+        elapsed = time.monotonic() - started
+        logger.info(f"Replay finished: {replayed} results in {elapsed:.1f}s ({replayed / max(elapsed, 1e-9):.0f} msg/s).")
+        return 0
+    finally:
+        consumer.close()
+
+if __name__ == "__main__":
+    raise SystemExit(replay(parse_args()))
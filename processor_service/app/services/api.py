@@ -1,26 +1,239 @@
-import requests
+import random
+import threading
 import time
-from app.config import logger, INTERNAL_API_KEY
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import (
+    logger, INTERNAL_API_KEY, API_TIMEOUT, API_POOL_SIZE,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS,
+    RETRY_QUEUE_MAX, RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX
+)
 
-def api_call_internal(method: str, url: str, json_data: dict) -> bool:
+class CircuitBreaker:
     """
-    Execute an authenticated internal API request to the User Service.
-    
-    Includes a basic retry loop to handle temporary network issues within 
-    the cluster.
+    Stops calls to the User Service while it is failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    calls fail fast. Once `reset_seconds` have passed, a single trial call
+    is let through (half-open): success closes the breaker, failure opens it
+    again.
     """
-    headers = {"X-Internal-API-Key": INTERNAL_API_KEY}
-    for i in range(3):
-        try:
-            # Short timeout to avoid blocking the processing pipeline
-            res = requests.request(method, url, json=json_data, headers=headers, timeout=5)
-            if res.status_code < 300:
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
                 return True
-            else:
-                logger.warning(f"Internal API error {res.status_code} for {url}: {res.text}")
-        except Exception as e:
-            logger.warning(f"API attempt {i+1} failed for {url}: {e}")
-            time.sleep(1)
-    
-    logger.error(f"Internal API call failed after 3 attempts: {url}")
-    return False
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("User Service recovered; circuit breaker closed.")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state == "closed":
+                    self.trips += 1
+                    logger.error(f"User Service unhealthy after {self.failures} failures; circuit breaker open.")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial call is allowed (0 when not open)."""
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+class InternalApiClient:
+    """
+    Keep-alive client for the User Service's internal routes.
+
+    Calls made from the consume loop never sleep: a call either completes
+    with one attempt or, when allowed, is deferred to an in-memory FIFO
+    retry queue. A background thread drains that queue in order, with
+    exponential backoff and jitter, and only while the circuit breaker
+    lets calls through.
+    """
+
+    def __init__(self, timeout: float, pool_size: int, breaker: CircuitBreaker,
+                 queue_max: int, max_attempts: int, backoff_base: float, backoff_max: float):
+        self.timeout = timeout
+        self.breaker = breaker
+        self.queue_max = queue_max
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.session.headers["X-Internal-API-Key"] = INTERNAL_API_KEY or ""
+        # Reconnect once on a stale keep-alive connection; everything else is ours to retry
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=1, connect=1, read=0, status=0, backoff_factor=0)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._queue = deque()  # [ {"method", "url", "json", "attempts"} ]
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+        # Counters exposed through the throughput log
+        self.deferred = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def _send(self, method: str, url: str, json_data=None, params=None):
+        """
+        One attempt through the breaker. Returns (ok, body, retryable, sent).
+        """
+        if not self.breaker.allow():
+            return False, None, True, False
+        try:
+            res = self.session.request(method, url, json=json_data, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            logger.warning(f"Internal API call to {url} failed: {e}")
+            return False, None, True, True
+
+        if res.status_code < 300:
+            self.breaker.record_success()
+            return True, (res.json() if res.content else {}), False, True
+        if res.status_code >= 500 or res.status_code == 429:
+            self.breaker.record_failure()
+            logger.warning(f"Internal API error {res.status_code} for {url}: {res.text}")
+            return False, None, True, True
+
+        # 4xx: the service is healthy, the request is not; retrying will not help
+        self.breaker.record_success()
+        logger.error(f"Internal API rejected {method} {url} with {res.status_code}: {res.text}")
+        return False, None, False, True
+
+    def request(self, method: str, url: str, json_data: dict = None, params: dict = None):
+        """
+        Single attempt returning the decoded JSON body ({} when empty), or None.
+        """
+        ok, body, _, _ = self._send(method, url, json_data, params)
+        return body if ok else None
+
+    def call(self, method: str, url: str, json_data: dict, defer: bool = True) -> bool:
+        """
+        Send now, or defer to the retry queue if the User Service is unavailable.
+
+        Returns True when the call succeeded or was queued, False when it was
+        rejected or the queue is full.
+        """
+        ok, _, retryable, _ = self._send(method, url, json_data)
+        if ok:
+            return True
+        if not (defer and retryable):
+            return False
+        return self.defer(method, url, json_data)
+
+    def defer(self, method: str, url: str, json_data: dict) -> bool:
+        with self._wakeup:
+            if len(self._queue) >= self.queue_max:
+                self.dropped += 1
+                logger.error(f"Retry queue full ({self.queue_max}); dropping {method} {url}.")
+                return False
+            self._queue.append({"method": method, "url": url, "json": json_data, "attempts": 0})
+            self.deferred += 1
+            self._wakeup.notify()
+        self._ensure_drainer()
+        return True
+
+    def _ensure_drainer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._drain, name="api-retry", daemon=True)
+            self._thread.start()
+
+    def _backoff(self, attempts: int) -> float:
+        # Full jitter keeps several processors from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempts))
+
+    def _drain(self):
+        """Replay deferred calls in order; head-of-line failures back off the whole queue."""
+        while True:
+            with self._wakeup:
+                while not self._queue:
+                    self._wakeup.wait()
+                job = self._queue[0]
+
+            # Attempts only count while the User Service is actually being called
+            wait = self.breaker.retry_in()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+
+            ok, _, retryable, sent = self._send(job["method"], job["url"], job["json"])
+            if not sent:
+                time.sleep(self._backoff(0))
+                continue
+            self.retried += 1
+            if ok or not retryable or job["attempts"] + 1 >= self.max_attempts:
+                if not ok:
+                    self.dropped += 1
+                    logger.error(f"Giving up on {job['method']} {job['url']} after {job['attempts'] + 1} attempts.")
+                with self._wakeup:
+                    self._queue.popleft()
+                continue
+
+            job["attempts"] += 1
+            time.sleep(self._backoff(job["attempts"]))
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "retry_queue": len(self._queue),
+            "deferred": self.deferred,
+            "retried": self.retried,
+            "dropped": self.dropped
+        }
+
+# Shared by the consume loop and the retry thread for the process lifetime
+internal_api = InternalApiClient(
+    timeout=API_TIMEOUT,
+    pool_size=API_POOL_SIZE,
+    breaker=CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS),
+    queue_max=RETRY_QUEUE_MAX,
+    max_attempts=RETRY_MAX_ATTEMPTS,
+    backoff_base=RETRY_BACKOFF_BASE,
+    backoff_max=RETRY_BACKOFF_MAX
+)
+
+def api_request_internal(method: str, url: str, json_data: dict = None, params: dict = None):
+    """
+    Execute an authenticated internal API request to the User Service.
+
+    One attempt, no sleeping; returns the decoded JSON body ({} when empty),
+    or None on failure so the caller can decide how to retry.
+    """
+    return internal_api.request(method, url, json_data, params)
+
+def api_call_internal(method: str, url: str, json_data: dict, defer: bool = True) -> bool:
+    """
+    Fire-and-forget internal call. Failed calls are retried in the background
+    unless `defer` is False; returns False only when the call was lost.
+    """
+    return internal_api.call(method, url, json_data, defer=defer)
@@ -0,0 +1,106 @@
+import struct
+
+# One packed record per check: epoch seconds (uint32), latency in ms
+# (uint16, capped), HTTP status (uint16, 0 = none) and flags (bit 0 = up).
+RECORD = struct.Struct(">IHHB")
+# The buffer starts with the big-endian index of the next slot to write and
+# the ring's capacity (in records)
+HEADER = struct.Struct(">II")
+FLAG_UP = 0x01
+
+# Write ARGV[1] (one record) into the next slot of KEYS[1], a ring of ARGV[2]
+# slots, and advance the header. A ring written with another capacity (or
+# without one in its header) is started over: its slots would be read back
+# in the wrong order. SETRANGE extends a missing or short buffer with zero
+# bytes, which decode as empty slots.
+RING_APPEND_LUA = """
+local function u32(s, i)
+    local a, b, c, d = string.byte(s, i, i + 3)
+    return ((a * 256 + b) * 256 + c) * 256 + d
+end
+local function pack32(n)
+    return string.char(math.floor(n / 16777216) % 256, math.floor(n / 65536) % 256,
+        math.floor(n / 256) % 256, n % 256)
+end
+local capacity = tonumber(ARGV[2])
+local header = redis.call('GETRANGE', KEYS[1], 0, 7)
+local slot = 0
+if #header == 8 and u32(header, 5) == capacity then
+    slot = u32(header, 1) % capacity
+elseif #header > 0 then
+    redis.call('DEL', KEYS[1])
+end
+redis.call('SETRANGE', KEYS[1], 8 + slot * #ARGV[1], ARGV[1])
+local nxt = (slot + 1) % capacity
+redis.call('SETRANGE', KEYS[1], 0, pack32(nxt) .. pack32(capacity))
+return nxt
+"""
+
+def pack_record(data: dict, checked_at: float) -> bytes:
+    latency = (data.get('timings') or {}).get('total_ms', data.get('latency_ms')) or 0
+    return RECORD.pack(
+        int(checked_at),
+        min(int(round(latency)), 0xFFFF),
+        data.get('status_code') or 0,
+        FLAG_UP if data.get('is_up') else 0
+    )
+
+def decode_history(blob: bytes) -> list:
+    """
+    Decode a ring buffer into check records, oldest first.
+
+    Returns [{"timestamp", "latency_ms", "status_code", "is_up"}]; slots that
+    were never written are skipped.
+    """
+    if not blob or len(blob) < HEADER.size:
+        return []
+    head, capacity = HEADER.unpack_from(blob)
+    written = (len(blob) - HEADER.size) // RECORD.size
+    # Until the ring wraps, the next slot is always the first unwritten one
+    if not (written == capacity or (written < capacity and head == written)):
+        # Not a ring in this layout; its order cannot be trusted
+        return []
+    records = []
+    for i in range(written):
+        slot = (head + i) % written
+        timestamp, latency, status, flags = RECORD.unpack_from(blob, HEADER.size + slot * RECORD.size)
+        if timestamp == 0:
+            continue
+        records.append({
+            "timestamp": timestamp,
+            "latency_ms": latency,
+            "status_code": status or None,
+            "is_up": bool(flags & FLAG_UP)
+        })
+    return records
+
+class HistoryRing:
+    """
+    Per-monitor check history as a fixed-size packed binary ring buffer.
+
+    A record is 9 bytes, against a few hundred for the JSON result kept in
+    the history list, so a day of per-minute checks fits in about 13 KB.
+    Appends rewrite one slot in place with a Lua script; the buffer never
+    grows past `capacity` records. The capacity is kept in the header, so a
+    ring written with a different HISTORY_RING_SIZE is started over rather
+    than read back in the wrong order.
+    """
+
+    def __init__(self, client, capacity: int):
+        self._client = client
+        self.capacity = capacity
+        self._append = client.register_script(RING_APPEND_LUA) if client else None
+
+    @staticmethod
+    def key(monitor_id) -> str:
+        return f"monitor:{monitor_id}:ring"
+
+    def append(self, pipe, monitor_id, data: dict, checked_at: float):
+        """Queue one result on `pipe`."""
+        if self._append is None or self.capacity <= 0:
+            return
+        self._append(
+            keys=[self.key(monitor_id)],
+            args=[pack_record(data, checked_at), self.capacity],
+            client=pipe
+        )
@@ -0,0 +1,67 @@
+import threading
+import time
+from app.config import logger
+
+class BatchMetrics:
+    """
+    Rolling throughput and latency figures for the consume loop.
+
+    Counters are reset every `log_every` seconds, after a summary line is
+    logged. Use it to tune the batch size and wait time against consumer lag.
+    - batch_ms: wall time to process one batch, Redis pipeline included
+    - redis_ms: time spent flushing the batch's Redis pipeline
+    - result_age_s: check timestamp to processing time (end-to-end lag)
+    """
+
+    def __init__(self, log_every: float, sources: dict = None):
+        self.log_every = log_every
+        # Extra { name: stats() callable } included in the summary line
+        self.sources = sources or {}
+        self._lock = threading.Lock()  # record() is called from worker threads
+        self._reset(time.monotonic())
+
+    def _reset(self, now: float):
+        self.window_started = now
+        self.batches = 0
+        self.messages = 0
+        self.errors = 0
+        self.batch_seconds = 0.0
+        self.batch_seconds_max = 0.0
+        self.redis_seconds = 0.0
+        self.result_age_max = 0.0
+
+    def record(self, messages: int, errors: int, seconds: float, redis_seconds: float, result_age: float):
+        with self._lock:
+            self.batches += 1
+            self.messages += messages
+            self.errors += errors
+            self.batch_seconds += seconds
+            self.batch_seconds_max = max(self.batch_seconds_max, seconds)
+            self.redis_seconds += redis_seconds
+            self.result_age_max = max(self.result_age_max, result_age)
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.window_started, 1e-9)
+        batches = self.batches or 1
+        return {
+            "messages_per_second": round(self.messages / elapsed, 1),
+            "batches": self.batches,
+            "avg_batch_size": round(self.messages / batches, 1),
+            "avg_batch_ms": round(self.batch_seconds / batches * 1000, 1),
+            "max_batch_ms": round(self.batch_seconds_max * 1000, 1),
+            "avg_redis_ms": round(self.redis_seconds / batches * 1000, 1),
+            "max_result_age_s": round(self.result_age_max, 1),
+            "errors": self.errors
+        }
+
+    def maybe_log(self):
+        now = time.monotonic()
+        if now - self.window_started < self.log_every:
+            return
+        with self._lock:
+            stats = self.snapshot() if self.batches else None
+            self._reset(now)
+        if stats:
+            for name, source in self.sources.items():
+                stats.update({f"{name}.{k}": v for k, v in source().items()})
+            logger.info("Processor throughput: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+from app.config import logger
+
+class OffsetTracker:
+    """
+    Tracks which consumed offsets are finished, per partition.
+
+    Messages may finish out of order when they are processed in parallel.
+    An offset is only released once it and every offset before it in the
+    same partition are finished, so a commit never skips unprocessed work.
+    Released offsets come back in offset order along with the result each
+    message was marked done with.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # { partition: deque of offsets, in consume order }
+        self._done = {}  # { partition: { offset: result } }
+
+    def track(self, partition: int, offset: int):
+        """Register an offset as dispatched, in consume order."""
+        with self._lock:
+            self._inflight.setdefault(partition, deque()).append(offset)
+
+    def done(self, partition: int, offset: int, result=None):
+        with self._lock:
+            self._done.setdefault(partition, {})[offset] = result
+
+    def release(self) -> tuple:
+        """
+        Pop every offset that is contiguously finished.
+
+        Returns ({partition: next offset to commit}, [(partition, offset, result)]).
+        """
+        positions = {}
+        released = []
+        with self._lock:
+            for partition, inflight in self._inflight.items():
+                done = self._done.get(partition)
+                while inflight and done and inflight[0] in done:
+                    offset = inflight.popleft()
+                    released.append((partition, offset, done.pop(offset)))
+                    positions[partition] = offset + 1
+        return positions, released
+
+    def forget(self, partitions):
+        """Drop state for partitions this consumer no longer owns."""
+        with self._lock:
+            for partition in partitions:
+                self._inflight.pop(partition, None)
+                self._done.pop(partition, None)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._inflight.values())
+
+class AppliedWatermarks:
+    """
+    Per-partition offset up to which side effects are known to be applied.
+
+    Offsets are only committed after the uptime counts that cover them are
+    flushed, so after a crash Kafka replays results whose cache writes and
+    transitions already happened. The released (contiguous) position of each
+    partition is saved in a Redis hash, and on assignment messages at or
+    below it are only counted, not re-applied.
+    """
+
+    def __init__(self, client, key: str):
+        self._client = client
+        self.key = key
+        self._applied = {}  # { partition: highest applied offset }
+        self.replayed = 0
+
+    def load(self, partitions):
+        if self._client is None or not partitions:
+            return
+        try:
+            values = self._client.hmget(self.key, [str(p) for p in partitions])
+        except Exception as e:
+            logger.warning(f"Could not load applied offsets; replays will be re-applied: {e}")
+            return
+        for partition, value in zip(partitions, values):
+            if value is not None:
+                self._applied[partition] = int(value)
+
+    def covers(self, partition: int, offset: int) -> bool:
+        if offset <= self._applied.get(partition, -1):
+            self.replayed += 1
+            return True
+        return False
+
+    def save(self, positions: dict):
+        """Record released positions ({partition: next offset})."""
+        if self._client is None or not positions:
+            return
+        mapping = {str(p): position - 1 for p, position in positions.items()}
+        try:
+            self._client.hset(self.key, mapping=mapping)
+        except Exception as e:
+            logger.warning(f"Could not save applied offsets: {e}")
+
+    def forget(self, partitions):
+        for partition in partitions:
+            self._applied.pop(partition, None)
@@ -0,0 +1,180 @@
+import threading
+from contextlib import contextmanager
+import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from app.config import logger
+
+# Same tables and semantics as the User Service's bulk endpoint
+# (user_service/app/models/monitor.py, app/services/stats.py). The joins drop
+# monitors deleted since the checks ran instead of failing the whole batch.
+SELECT_CHECKPOINTS_SQL = """
+SELECT partition, committed_offset FROM stats_checkpoints
+WHERE consumer = %s AND partition = ANY(%s)
+FOR UPDATE
+"""
+
+UPSERT_UPTIME_SQL = """
+INSERT INTO monitor_uptime_stats (monitor_id, total_checks, up_checks, last_updated)
+SELECT deltas.monitor_id, deltas.total, deltas.up, timezone('utc', now())
+FROM (VALUES %s) AS deltas (monitor_id, total, up)
+JOIN monitors ON monitors.id = deltas.monitor_id
+ON CONFLICT (monitor_id) DO UPDATE SET
+    total_checks = COALESCE(monitor_uptime_stats.total_checks, 0) + excluded.total_checks,
+    up_checks = COALESCE(monitor_uptime_stats.up_checks, 0) + excluded.up_checks,
+    last_updated = excluded.last_updated
+"""
+
+UPSERT_CHECKPOINTS_SQL = """
+INSERT INTO stats_checkpoints (consumer, partition, committed_offset, updated_at)
+VALUES %s
+ON CONFLICT (consumer, partition) DO UPDATE SET
+    committed_offset = excluded.committed_offset,
+    updated_at = excluded.updated_at
+"""
+
+INSERT_INCIDENTS_SQL = """
+INSERT INTO incidents (monitor_id, event_type, details, timestamp)
+SELECT new.monitor_id, new.event_type, new.details, timezone('utc', now())
+FROM (VALUES %s) AS new (monitor_id, event_type, details)
+JOIN monitors ON monitors.id = new.monitor_id
+"""
+
+class PostgresWriter:
+    """
+    Writes uptime counts and incidents straight to Postgres.
+
+    An alternative to the User Service's internal endpoints for the
+    Processor's hot write path: no HTTP request, JSON round trip or ORM
+    session per write, just set-based statements over a small pool of
+    connections. Results have the same shape as the endpoints' responses
+    and failures return None/False like the API wrappers, so callers treat
+    both paths alike.
+    """
+
+    def __init__(self, dsn: str, pool_size: int):
+        # No connection is opened until the first write
+        self._pool = ThreadedConnectionPool(0, pool_size, dsn)
+        self._lock = threading.Lock()
+        # Counters exposed through the throughput log
+        self.statements = 0
+        self.errors = 0
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._pool.getconn()
+        broken = False
+        try:
+            with conn, conn.cursor() as cur:
+                yield cur
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            self._pool.putconn(conn, close=broken)
+
+    def _count(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.statements += 1
+            else:
+                self.errors += 1
+
+    def load_checkpoints(self, consumer: str):
+        """{partition: last counted offset}, or None on failure."""
+        try:
+            with self._transaction() as cur:
+                cur.execute(
+                    "SELECT partition, committed_offset FROM stats_checkpoints WHERE consumer = %s",
+                    (consumer,)
+                )
+                return {partition: offset for partition, offset in cur.fetchall()}
+        except Exception as e:
+            self._count(False)
+            logger.warning(f"Could not load stats checkpoints from Postgres: {e}")
+            return None
+
+    def apply_stats(self, payload: dict):
+        """
+        Apply a bulk stats payload in one transaction.
+
+        Mirrors POST /monitors/stats/bulk: segments are taken in offset
+        order per partition; those already covered by the checkpoint are
+        duplicates, partial overlaps are conflicts, and the rest is added
+        with one multi-row upsert while the checkpoints advance in the same
+        commit. Returns the endpoint's response body, or None on failure.
+        """
+        consumer = payload["consumer"]
+        segments = sorted(payload["partitions"], key=lambda p: (p["partition"], p["from_offset"]))
+        try:
+            with self._transaction() as cur:
+                # Row locks serialize concurrent flushes for the same partitions
+                cur.execute(SELECT_CHECKPOINTS_SQL, (consumer, list({s["partition"] for s in segments})))
+                checkpoints = dict(cur.fetchall())
+
+                deltas = {}
+                advanced = {}
+                applied, duplicates, conflicts = [], [], []
+                for segment in segments:
+                    partition = segment["partition"]
+                    checkpoint = checkpoints.get(partition)
+                    if checkpoint is not None and segment["to_offset"] <= checkpoint:
+                        duplicates.append(partition)
+                        continue
+                    if checkpoint is not None and segment["from_offset"] <= checkpoint:
+                        conflicts.append(partition)
+                        continue
+                    for row in segment["stats"]:
+                        total, up = deltas.get(row["monitor_id"], (0, 0))
+                        deltas[row["monitor_id"]] = (total + row["total"], up + row["up"])
+                    checkpoints[partition] = advanced[partition] = segment["to_offset"]
+                    applied.append(partition)
+
+                if deltas:
+                    execute_values(
+                        cur, UPSERT_UPTIME_SQL,
+                        [(m, total, up) for m, (total, up) in deltas.items()],
+                        page_size=1000
+                    )
+                if advanced:
+                    execute_values(
+                        cur, UPSERT_CHECKPOINTS_SQL,
+                        [(consumer, partition, offset) for partition, offset in advanced.items()],
+                        template="(%s, %s, %s, timezone('utc', now()))"
+                    )
+        except Exception as e:
+            self._count(False)
+            logger.error(f"Postgres stats write failed: {e}")
+            return None
+
+        self._count(True)
+        return {
+            "applied": applied,
+            "duplicates": duplicates,
+            "conflicts": conflicts,
+            "checkpoints": {str(p): offset for p, offset in checkpoints.items()},
+            "monitors_updated": len(deltas)
+        }
+
+    def log_incidents(self, incidents: list) -> bool:
+        """Insert [(monitor_id, event_type, details)] in one statement."""
+        if not incidents:
+            return True
+        try:
+            with self._transaction() as cur:
+                execute_values(cur, INSERT_INCIDENTS_SQL, incidents)
+        except Exception as e:
+            self._count(False)
+            logger.error(f"Postgres incident write failed for {len(incidents)} incident(s): {e}")
+            return False
+        self._count(True)
+        return True
+
+    def log_incident(self, monitor_id: int, event_type: str, details: str) -> bool:
+        return self.log_incidents([(monitor_id, event_type, details)])
+
+    def close(self):
+        self._pool.closeall()
+
+    def stats(self) -> dict:
+        return {"statements": self.statements, "errors": self.errors}
@@ -1,65 +1,186 @@
 import json
+import time
+from datetime import datetime, timezone
 from app.config import (
     logger, redis_client, alert_producer, 
-    USER_SERVICE_URL, KAFKA_ALERTS_TOPIC
+    USER_SERVICE_URL, KAFKA_ALERTS_TOPIC, HISTORY_LENGTH, HISTORY_RING_SIZE,
+    STATE_CACHE_MAX_ENTRIES, STATE_CACHE_TTL,
+    PROCESSOR_WRITER, DATABASE_URL, PG_POOL_SIZE, PROCESSOR_WORKERS
 )
 from app.services.api import api_call_internal
+from app.services.state import StateCache, StateStore
+from app.services.rollups import Rollups
+from app.services.history import HistoryRing
 
-def update_uptime_stats(monitor_id: int, is_up: bool):
-    """
-    Sync the latest check result with the centralized database.
-    
-    Stats calculation is delegated to the User Service to maintain a 
-    single source of truth.
-    """
-    url = f"{USER_SERVICE_URL}/monitors/{monitor_id}/stats"
-    api_call_internal("POST", url, {"is_up": is_up})
+# Phases published by the pinger in each result's "timings" object
+TIMING_PHASES = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "total_ms")
+# Per-minute timing buckets are kept for one day
+TIMING_BUCKET_TTL = 86400
+
+# Last known UP/DOWN state per monitor; Redis stays the source of truth
+state_store = StateStore(redis_client, StateCache(STATE_CACHE_MAX_ENTRIES, STATE_CACHE_TTL))
+# Compact per-check history, far longer than the JSON history list
+history_ring = HistoryRing(redis_client, HISTORY_RING_SIZE)
+# Long-window uptime and latency percentiles for the dashboard
+rollups = Rollups(redis_client)
 
-def handle_state_transition(monitor_id: int, is_up: bool, data: dict):
+# Direct-to-Postgres writes instead of the User Service's internal API
+if PROCESSOR_WRITER == "postgres":
+    from app.services.pg_writer import PostgresWriter
+    pg_writer = PostgresWriter(DATABASE_URL, max(PG_POOL_SIZE, PROCESSOR_WORKERS + 1))
+else:
+    pg_writer = None
+
+def handle_state_transition(monitor_id: int, is_up: bool, data: dict, transitions: list = None):
     """
     Evaluate results and detect state changes (UP <-> DOWN).
     
-    Stored state in Redis ensures that incidents and alerts are only 
-    triggered once per transition.
+    The last known state is read from a local cache, so the common "no
+    change" case costs no round trip. A transition is claimed with an atomic
+    compare-and-set in Redis, which ensures that incidents and alerts are
+    only triggered once per transition, even across processors.
+
+    With `transitions`, a claimed transition is appended there instead of
+    being recorded right away; the caller then records the whole batch with
+    one record_transitions() call.
     """
     event_type = "UP" if is_up else "DOWN"
-    state_key = f"monitor:{monitor_id}:state"
     
     if not redis_client:
         logger.error(f"Redis unavailable; cannot process transition for {monitor_id}.")
         return
 
-    last_state = redis_client.get(state_key)
+    last_state = state_store.get(monitor_id)
     
     # Act only if state has changed to prevent duplicate alerts
     if last_state != event_type:
-        # 1. Log transition to Postgres for the audit trail
-        url = f"{USER_SERVICE_URL}/monitors/{monitor_id}/incidents"
-        details = data.get('error', 'N/A')
+        # 1. Claim the transition in Redis; losing the race means it was handled,
+        #    and a replayed result older than the last transition is ignored
+        checked_at = check_epoch(data)
+        swapped, current = state_store.compare_and_set(monitor_id, last_state, event_type, checked_at)
+        if not swapped and current != last_state and current != event_type:
+            # Our view was stale (e.g. Redis flushed); retry against the real state
+            last_state = current
+            swapped, _ = state_store.compare_and_set(monitor_id, last_state, event_type, checked_at)
+        if not swapped:
+            return
+
+        transition = (monitor_id, last_state, event_type, data)
+        if transitions is not None:
+            transitions.append(transition)
+        else:
+            record_transitions([transition])
+
+def record_transitions(transitions: list) -> bool:
+    """
+    Make claimed transitions final: store their incidents, then alert.
+
+    [(monitor_id, last_state, event_type, data)] in claim order. The
+    incidents go out in one write (one statement with the Postgres writer).
+    Transitions whose incident was not stored have their claims released,
+    newest first, so the next result of each monitor retries them; only the
+    stored ones are alerted. Returns True if every incident was stored.
+    """
+    if not transitions:
+        return True
+
+    # 2. Log transitions to Postgres for the audit trail; only once stored is
+    #    a transition final (and its offset safe to commit)
+    stored = record_incidents([
+        (monitor_id, event_type, data.get('error', 'N/A'))
+        for monitor_id, _, event_type, data in transitions
+    ])
+    for monitor_id, last_state, event_type, _ in reversed(transitions[stored:]):
+        state_store.compare_and_set(monitor_id, event_type, last_state)
+
+    for monitor_id, last_state, event_type, data in transitions[:stored]:
+        logger.info(f"Transition for monitor {monitor_id}: {last_state} -> {event_type}")
+
+        # 3. Emit alert event to Kafka for downstream notifications
+        alert_payload = {
+            "monitor_id": monitor_id,
+            "url": data['url'],
+            "event_type": event_type,
+            "status_code": data.get('status_code'),
+            "latency_ms": data.get('latency_ms'),
+            "error": data.get('error', 'N/A'),
+            "timestamp": data.get('timestamp'),
+            "check_id": data.get('check_id')
+        }
         
-        if api_call_internal("POST", url, {"event_type": event_type, "details": details}):
-            # 2. Update state in Redis
-            redis_client.set(state_key, event_type)
-            logger.info(f"Transition for monitor {monitor_id}: {last_state} -> {event_type}")
-
-            # 3. Emit alert event to Kafka for downstream notifications
-            alert_payload = {
-                "monitor_id": monitor_id,
-                "url": data['url'],
-                "event_type": event_type,
-                "status_code": data.get('status_code'),
-                "latency_ms": data.get('latency_ms'),
-                "error": details,
-                "timestamp": data.get('timestamp')
-            }
-            
-            if alert_producer:
-                try:
-                    alert_producer.produce(
-                        KAFKA_ALERTS_TOPIC, 
-                        key=str(monitor_id), 
-                        value=json.dumps(alert_payload)
-                    )
-                    alert_producer.poll(0)
-                except Exception as e:
-                    logger.error(f"Failed to publish alert to Kafka for {monitor_id}: {e}")
+        if alert_producer:
+            try:
+                alert_producer.produce(
+                    KAFKA_ALERTS_TOPIC, 
+                    key=str(monitor_id), 
+                    value=json.dumps(alert_payload)
+                )
+                alert_producer.poll(0)
+            except Exception as e:
+                logger.error(f"Failed to publish alert to Kafka for {monitor_id}: {e}")
+    return stored == len(transitions)
+
+def record_incidents(incidents: list) -> int:
+    """
+    Persist [(monitor_id, event_type, details)] to the incidents audit trail.
+
+    Returns how many leading incidents were stored: all or none with the
+    Postgres writer (one statement), up to the first failure over HTTP
+    (one call each, in order). Never deferred to the in-memory retry queue:
+    a queued call would let the offset be committed while the incident only
+    exists in this process.
+    """
+    if pg_writer:
+        return len(incidents) if pg_writer.log_incidents(incidents) else 0
+    for stored, (monitor_id, event_type, details) in enumerate(incidents):
+        url = f"{USER_SERVICE_URL}/monitors/{monitor_id}/incidents"
+        if not api_call_internal("POST", url, {"event_type": event_type, "details": details}, defer=False):
+            return stored
+    return len(incidents)
+
+def check_epoch(data: dict) -> float:
+    """Unix time of the check (pinger timestamps are naive UTC), falling back to now."""
+    try:
+        return datetime.fromisoformat(data['timestamp']).replace(tzinfo=timezone.utc).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+def cache_result(pipe, monitor_id: int, raw: str, data: dict, counters: bool = True, latest: bool = True):
+    """
+    Queue the dashboard cache writes for one result on a Redis pipeline.
+
+    The caller executes the pipeline once per batch, so a batch costs one
+    round trip instead of several per result. Without `counters`, the
+    timing buckets and rollups (which only ever add up) are left alone;
+    without `latest`, the status and histories (which assume results
+    arrive newest last) are.
+    """
+    if latest:
+        pipe.set(f"monitor:{monitor_id}:status", raw)
+        pipe.lpush(f"monitor:{monitor_id}:history", raw)
+        # Keep only the most recent results for sparkline charts
+        pipe.ltrim(f"monitor:{monitor_id}:history", 0, HISTORY_LENGTH - 1)
+        history_ring.append(pipe, monitor_id, data, check_epoch(data))
+    if counters:
+        record_phase_timings(pipe, monitor_id, data)
+        rollups.record(pipe, monitor_id, data, check_epoch(data))
+
+def record_phase_timings(pipe, monitor_id: int, data: dict):
+    """
+    Aggregate the per-phase latency breakdown into per-minute buckets.
+
+    Each bucket holds phase sums plus a sample count, so the average of every
+    phase over any minute can be derived and a slowdown traced to DNS,
+    connect, TLS or server time. Writes are queued on `pipe`.
+    """
+    timings = data.get('timings')
+    if not timings:
+        return
+
+    minute = int(check_epoch(data) // 60) * 60
+    key = f"monitor:{monitor_id}:timings:{minute}"
+    pipe.hincrby(key, "samples", 1)
+    for phase in TIMING_PHASES:
+        if timings.get(phase) is not None:
+            pipe.hincrbyfloat(key, phase, timings[phase])
+    pipe.expire(key, TIMING_BUCKET_TTL)
@@ -0,0 +1,98 @@
+import math
+from app.config import ROLLUP_RETENTION_MINUTE, ROLLUP_RETENTION_HOUR, ROLLUP_RETENTION_DAY
+
+# (name, bucket width in seconds, buckets per hash, retention in seconds).
+# Buckets are stored as fields of a shared hash (minutes of an hour, hours of
+# six hours) so a monitor has a few hundred small keys instead of thousands.
+# Hashes are sized to stay listpack-encoded under the Redis setting
+# hash-max-listpack-entries 1024 (see docker-compose.yml).
+# Mirrored in ui_service/server/rollups.js.
+RESOLUTIONS = (
+    ("1m", 60, 60, ROLLUP_RETENTION_MINUTE),
+    ("1h", 3600, 6, ROLLUP_RETENTION_HOUR),
+    ("1d", 86400, 1, ROLLUP_RETENTION_DAY),
+)
+
+# Log-bucketed latency sketch (as in DDSketch): bucket i holds latencies in
+# (GAMMA^(i-1), GAMMA^i] ms, so any quantile read back is within 1% of the
+# true value. Buckets of equal index add up, which makes sketches mergeable
+# across time buckets. The UI gateway decodes them with the same constant.
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(SKETCH_GAMMA)
+
+# Add one result to a bucket in each of KEYS (one hash per resolution).
+# ARGV[1] = '1' if up, ARGV[2] = latency in ms ('' if unknown), ARGV[3] = its
+# sketch field; then per key, the bucket's field prefix and the hash's TTL.
+# The TTL is only set when the hash is created.
+ROLLUP_RECORD_LUA = """
+for i, key in ipairs(KEYS) do
+    local prefix = ARGV[2 + 2 * i]
+    local created = redis.call('EXISTS', key) == 0
+    redis.call('HINCRBY', key, prefix .. 'n', 1)
+    if ARGV[1] == '1' then
+        redis.call('HINCRBY', key, prefix .. 'up', 1)
+    end
+    if ARGV[2] ~= '' then
+        redis.call('HINCRBY', key, prefix .. 'sum', ARGV[2])
+        redis.call('HINCRBY', key, prefix .. ARGV[3], 1)
+    end
+    if created then
+        redis.call('EXPIRE', key, ARGV[3 + 2 * i])
+    end
+end
+return 1
+"""
+
+def sketch_bucket(latency_ms: float) -> int:
+    """Sketch bucket index of a latency; everything under 1 ms lands in bucket 0."""
+    if latency_ms <= 1:
+        return 0
+    return math.ceil(math.log(latency_ms) / _LOG_GAMMA)
+
+def rollup_key(monitor_id, resolution: str, hash_start: int) -> str:
+    return f"monitor:{monitor_id}:rollup:{resolution}:{hash_start}"
+
+def bucket_location(monitor_id, resolution: tuple, checked_at: float) -> tuple:
+    """(hash key, field prefix) of the bucket a check time falls in."""
+    name, width, slots, _ = resolution
+    bucket_start = int(checked_at // width) * width
+    hash_start = bucket_start // (width * slots) * (width * slots)
+    prefix = f"{(bucket_start - hash_start) // width}:" if slots > 1 else ""
+    return rollup_key(monitor_id, name, hash_start), prefix
+
+class Rollups:
+    """
+    Per-monitor uptime and latency buckets at 1-minute, 1-hour and 1-day
+    resolution.
+
+    Each bucket is a set of fields in a Redis hash: n (checks), up
+    (successful checks), sum (total latency in ms) and b<i> counts for the
+    latency sketch, prefixed with the bucket's slot in the hash. Only
+    HINCRBYs are used, so writes from any processor merge naturally. One
+    Lua call per result updates all three resolutions, and a hash expires a
+    retention period (plus its own span) after it was created.
+    """
+
+    def __init__(self, client):
+        self._record = client.register_script(ROLLUP_RECORD_LUA) if client else None
+
+    def record(self, pipe, monitor_id: int, data: dict, checked_at: float):
+        """Queue one result on `pipe`."""
+        if self._record is None:
+            return
+        timings = data.get('timings') or {}
+        latency = timings.get('total_ms', data.get('latency_ms'))
+
+        keys = []
+        args = [
+            1 if data.get('is_up') else 0,
+            '' if latency is None else int(round(latency)),
+            '' if latency is None else f"b{sketch_bucket(latency)}"
+        ]
+        for resolution in RESOLUTIONS:
+            key, prefix = bucket_location(monitor_id, resolution, checked_at)
+            _, width, slots, retention = resolution
+            keys.append(key)
+            args += [prefix, retention + width * slots]
+        self._record(keys=keys, args=args, client=pipe)
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from app.config import logger
+
+# Set KEYS[1] to ARGV[2] only if it currently holds ARGV[1] ('' = missing;
+# setting '' deletes). When a check time is given in ARGV[3], results older
+# than the last applied transition (KEYS[2]) are refused, so a replayed
+# result cannot repeat a transition. Returns {1, new} on success or
+# {0, current} otherwise.
+COMPARE_AND_SET_LUA = """
+local current = redis.call('GET', KEYS[1]) or ''
+if current ~= ARGV[1] then
+    return {0, current}
+end
+if ARGV[3] ~= '' then
+    local applied_at = tonumber(redis.call('GET', KEYS[2]) or '0')
+    if tonumber(ARGV[3]) <= applied_at then
+        return {0, current}
+    end
+    redis.call('SET', KEYS[2], ARGV[3])
+end
+if ARGV[2] == '' then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+return {1, ARGV[2]}
+"""
+
+# Replay/rebuild: set KEYS[1] to ARGV[1] as of check time ARGV[2], unless a
+# transition at or after that time was already applied (KEYS[2]).
+RESTORE_STATE_LUA = """
+local applied_at = tonumber(redis.call('GET', KEYS[2]) or '0')
+if tonumber(ARGV[2]) <= applied_at then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('SET', KEYS[2], ARGV[2])
+return 1
+"""
+
+class StateCache:
+    """
+    Bounded, in-process cache of each monitor's last known UP/DOWN state.
+
+    Results are keyed by monitor_id in Kafka, so one consumer sees all the
+    results of a monitor and its cached state stays accurate. Entries still
+    expire after `ttl` seconds, and the cache is cleared on every rebalance,
+    to bound staleness. Least recently used entries are evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # { monitor_id: (state, expires_at) }
+        self._lock = threading.Lock()  # Shared by the processing threads
+
+        # Counters exposed through the throughput log
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, monitor_id):
+        with self._lock:
+            entry = self._entries.get(monitor_id)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(monitor_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, monitor_id, state: str):
+        with self._lock:
+            self._entries[monitor_id] = (state, time.monotonic() + self.ttl)
+            self._entries.move_to_end(monitor_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, monitor_id):
+        with self._lock:
+            self._entries.pop(monitor_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+class StateStore:
+    """
+    Monitor state with Redis as the source of truth and a local cache in front.
+
+    Reads are served from the cache when possible. Writes are atomic
+    compare-and-set operations, so two processors can never both claim the
+    same transition.
+    """
+
+    def __init__(self, client, cache: StateCache):
+        self._client = client
+        self.cache = cache
+        self._cas = client.register_script(COMPARE_AND_SET_LUA) if client else None
+        self._restore = client.register_script(RESTORE_STATE_LUA) if client else None
+
+    @staticmethod
+    def key(monitor_id) -> str:
+        return f"monitor:{monitor_id}:state"
+
+    def get(self, monitor_id):
+        """Last known state, from the cache or (on a miss) from Redis."""
+        state = self.cache.get(monitor_id)
+        if state is None:
+            state = self._client.get(self.key(monitor_id))
+            if state is not None:
+                self.cache.set(monitor_id, state)
+        return state
+
+    def compare_and_set(self, monitor_id, expected, new, checked_at: float = None) -> tuple:
+        """
+        Move the state from `expected` to `new` atomically (None = unset).
+
+        With `checked_at`, the move is refused for a result no newer than the
+        last applied transition. Returns (swapped, current). The cache is
+        updated with whatever Redis holds afterwards.
+        """
+        swapped, current = self._cas(
+            keys=[self.key(monitor_id), f"{self.key(monitor_id)}_at"],
+            args=[expected or '', new or '', '' if checked_at is None else repr(checked_at)]
+        )
+        current = current or None
+        if current is None:
+            self.cache.forget(monitor_id)
+        else:
+            self.cache.set(monitor_id, current)
+        if not swapped:
+            logger.info(f"State of monitor {monitor_id} changed concurrently (now {current}).")
+        return bool(swapped), current
+
+    def restore(self, pipe, monitor_id, state: str, checked_at: float):
+        """
+        Queue a rebuilt state on `pipe`, as observed at `checked_at`.
+
+        Skipped in Redis if a live processor applied a transition since, so
+        a replay never rolls a monitor's state back. No alert is involved.
+        """
+        self._restore(
+            keys=[self.key(monitor_id), f"{self.key(monitor_id)}_at"],
+            args=[state, repr(checked_at)],
+            client=pipe
+        )
+        self.cache.forget(monitor_id)
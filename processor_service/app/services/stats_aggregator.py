@@ -0,0 +1,179 @@
+import time
+from app.config import logger, USER_SERVICE_URL, CHECKPOINT_RETRY_SECONDS, CHECKPOINT_RETRY_MAX_SECONDS
+from app.services.api import api_request_internal
+
+class StatsAggregator:
+    """
+    Sums uptime counts per monitor in memory and flushes them in bulk.
+
+    Counts are kept per Kafka partition together with the offset range they
+    cover. The User Service stores the last counted offset of each partition
+    in the same transaction as the counts, so a flush that is retried or
+    replayed after a restart is not counted twice. Messages at or below a
+    known checkpoint are skipped on the way in, so partitions are only
+    counted once their checkpoints are loaded.
+
+    Counts of a failed flush are kept as their own segment and resent
+    before newer ones; the server skips segments it already counted (the
+    response may have been lost) without holding back the rest.
+
+    With a `writer` (PostgresWriter), counts and checkpoints go straight to
+    Postgres with the same semantics instead of through the User Service.
+    """
+
+    def __init__(self, consumer: str, flush_seconds: float, writer=None):
+        self.consumer = consumer
+        self.flush_seconds = flush_seconds
+        self.writer = writer
+        self.bulk_url = f"{USER_SERVICE_URL}/monitors/stats/bulk"
+        self.checkpoints_url = f"{USER_SERVICE_URL}/monitors/stats/checkpoints"
+
+        self._pending = {}  # { partition: {"from": offset, "to": offset, "stats": {monitor_id: [total, up]}} }
+        self._unsent = {}  # { partition: [segments of failed flushes, oldest first] }
+        self._checkpoints = {}  # { partition: last counted offset }
+        self._paused = []  # Partitions held back until their checkpoints load
+        self._retry_at = 0.0
+        self._retry_delay = CHECKPOINT_RETRY_SECONDS
+        self._last_flush = time.monotonic()
+
+        # Counters exposed through the throughput log
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.skipped = 0
+
+    def load_checkpoints(self) -> bool:
+        """Fetch the counted offsets so replayed messages are skipped."""
+        if self.writer:
+            checkpoints = self.writer.load_checkpoints(self.consumer)
+        else:
+            checkpoints = api_request_internal("GET", self.checkpoints_url, params={"consumer": self.consumer})
+        if checkpoints is None:
+            return False
+        self._checkpoints = {int(p): offset for p, offset in checkpoints.items()}
+        return True
+
+    def checkpoint(self, partition: int) -> int:
+        """Last counted offset of a partition, or -1."""
+        return self._checkpoints.get(partition, -1)
+
+    def add(self, partition: int, offset: int, monitor_id: int, is_up: bool):
+        if offset <= self._checkpoints.get(partition, -1):
+            self.skipped += 1
+            return
+
+        pending = self._pending.get(partition)
+        if pending is None:
+            pending = {"from": offset, "to": offset, "stats": {}}
+            self._pending[partition] = pending
+        pending["to"] = max(pending["to"], offset)
+
+        counts = pending["stats"].setdefault(monitor_id, [0, 0])
+        counts[0] += 1
+        if is_up:
+            counts[1] += 1
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_flush >= self.flush_seconds
+
+    def flush(self, partitions=None) -> bool:
+        """
+        Send pending counts (optionally only for `partitions`) in one request
+        (or one transaction, with a writer).
+
+        On failure the segments are kept and go out with the next flush.
+        """
+        self._last_flush = time.monotonic()
+        selected = {p for p in list(self._pending) + list(self._unsent) if partitions is None or p in partitions}
+        if not selected:
+            return True
+
+        batch = {p: self._unsent.pop(p, []) for p in selected}
+        for p in selected:
+            if p in self._pending:
+                batch[p].append(self._pending.pop(p))
+        payload = {
+            "consumer": self.consumer,
+            "partitions": [
+                {
+                    "partition": p,
+                    "from_offset": segment["from"],
+                    "to_offset": segment["to"],
+                    "stats": [
+                        {"monitor_id": m, "total": total, "up": up}
+                        for m, (total, up) in segment["stats"].items()
+                    ]
+                }
+                for p, segments in batch.items() for segment in segments
+            ]
+        }
+
+        if self.writer:
+            result = self.writer.apply_stats(payload)
+        else:
+            result = api_request_internal("POST", self.bulk_url, payload)
+        if result is None:
+            self.failed_flushes += 1
+            for p, segments in batch.items():
+                self._unsent[p] = segments
+            logger.warning(f"Stats flush failed; {len(batch)} partition(s) kept for the next attempt.")
+            return False
+
+        self.flushes += 1
+        for p, offset in result.get('checkpoints', {}).items():
+            self._checkpoints[int(p)] = max(self._checkpoints.get(int(p), -1), offset)
+        for p in result.get('conflicts', []):
+            # Another consumer counted into this range; it recounts the rest from its commit
+            logger.error(f"Stats segment of partition {p} overlaps an existing checkpoint and was dropped.")
+        return True
+
+    def on_assign(self, consumer, partitions):
+        """
+        Rebalance callback: pick up checkpoints for newly owned partitions.
+
+        Counting without them would count replayed results twice, so if they
+        cannot be loaded the partitions are assigned paused; the consume loop
+        retries through retry_checkpoints() and resumes them once loaded.
+        """
+        if self.load_checkpoints():
+            return
+        consumer.assign(partitions)
+        consumer.pause(partitions)
+        self._paused = list(partitions)
+        self._retry_delay = CHECKPOINT_RETRY_SECONDS
+        self._retry_at = time.monotonic() + self._retry_delay
+        logger.warning(f"Stats checkpoints unavailable; {len(partitions)} partition(s) paused until they load.")
+
+    def retry_checkpoints(self, consumer):
+        """Called from the consume loop: resume paused partitions once checkpoints load."""
+        if not self._paused or time.monotonic() < self._retry_at:
+            return
+        if not self.load_checkpoints():
+            self._retry_delay = min(self._retry_delay * 2, CHECKPOINT_RETRY_MAX_SECONDS)
+            self._retry_at = time.monotonic() + self._retry_delay
+            return
+        consumer.resume(self._paused)
+        logger.info(f"Stats checkpoints loaded; resumed {len(self._paused)} partition(s).")
+        self._paused = []
+
+    def on_revoke(self, consumer, partitions):
+        """
+        Rebalance callback: forget checkpoints of partitions handed over.
+
+        Their counts were flushed just before. Counts that failed to flush are
+        kept; the server rejects them if the new owner has counted past them
+        in the meantime.
+        """
+        revoked = {tp.partition for tp in partitions}
+        for p in revoked:
+            self._checkpoints.pop(p, None)
+        self._paused = [tp for tp in self._paused if tp.partition not in revoked]
+
+    def stats(self) -> dict:
+        return {
+            "pending_monitors": sum(len(p["stats"]) for p in self._pending.values()),
+            "unsent_segments": sum(len(segments) for segments in self._unsent.values()),
+            "paused_partitions": len(self._paused),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "skipped_replays": self.skipped
+        }
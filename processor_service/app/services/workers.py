@@ -0,0 +1,69 @@
+import queue
+import threading
+import zlib
+from app.config import logger
+
+class WorkerPool:
+    """
+    Fixed pool of processing threads with key affinity.
+
+    Every message is routed by its Kafka key (the monitor_id) to the same
+    worker, so results of one monitor are always handled in order while
+    different monitors are processed concurrently. Queues are bounded; a
+    full queue blocks the consume loop, which is the backpressure.
+    """
+
+    def __init__(self, size: int, handler, queue_size: int):
+        self.size = size
+        self._handler = handler  # handler(messages: list)
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(size)]
+        self._threads = []
+
+    def start(self):
+        for index, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(q,), name=f"processor-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Processing with {self.size} worker threads.")
+
+    def _run(self, q: queue.Queue):
+        while True:
+            messages = q.get()
+            try:
+                if messages is None:
+                    return
+                self._handler(messages)
+            except Exception as e:
+                logger.error(f"Worker failed on a batch of {len(messages)} messages: {e}")
+            finally:
+                q.task_done()
+
+    def route(self, msg) -> int:
+        key = msg.key()
+        if key is None:
+            return msg.partition() % self.size
+        return zlib.crc32(key) % self.size
+
+    def submit(self, messages: list):
+        """Split a consumed batch by worker, keeping consume order within each."""
+        chunks = [[] for _ in range(self.size)]
+        for msg in messages:
+            chunks[self.route(msg)].append(msg)
+        for q, chunk in zip(self._queues, chunks):
+            if chunk:
+                q.put(chunk)
+
+    def drain(self):
+        """Block until every submitted message has been handled."""
+        for q in self._queues:
+            q.join()
+
+    def stop(self):
+        self.drain()
+        for q in self._queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self) -> dict:
+        return {"queued_chunks": sum(q.qsize() for q in self._queues)}
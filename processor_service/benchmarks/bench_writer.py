@@ -0,0 +1,112 @@
+"""
+Write-path benchmark: User Service internal API vs direct Postgres writer.
+
+Needs the running stack (Postgres, User Service with INTERNAL_API_KEY) and
+some existing monitors. Run from the processor_service directory with the
+same environment as the Processor:
+
+    python -m benchmarks.bench_writer [--monitors 1000] [--flushes 50] [--incidents 200]
+
+Each stats flush covers --monitors monitors in one partition, like a
+Processor flush. Deltas are zero, so the counters are rewritten but not
+changed. Incidents are inserted with a marker and deleted afterwards, as
+are the benchmark's stats checkpoints.
+"""
+import argparse
+import os
+import time
+from app.config import DATABASE_URL, USER_SERVICE_URL
+from app.services.api import api_request_internal, api_call_internal
+from app.services.pg_writer import PostgresWriter
+
+MARKER = "writer-bench"
+
+def summarize(durations: list, rows_per_op: int) -> dict:
+    durations = sorted(durations)
+    total = sum(durations)
+    return {
+        "ops": len(durations),
+        "mean_ms": total / len(durations) * 1000,
+        "p50_ms": durations[len(durations) // 2] * 1000,
+        "p95_ms": durations[max(0, int(len(durations) * 0.95) - 1)] * 1000,
+        "rows_per_s": len(durations) * rows_per_op / total if total else 0.0
+    }
+
+def stats_payload(consumer: str, monitor_ids: list, flush: int) -> dict:
+    return {
+        "consumer": consumer,
+        "partitions": [{
+            "partition": 0,
+            "from_offset": flush * len(monitor_ids),
+            "to_offset": (flush + 1) * len(monitor_ids) - 1,
+            "stats": [{"monitor_id": m, "total": 0, "up": 0} for m in monitor_ids]
+        }]
+    }
+
+def bench_stats(send, consumer: str, monitor_ids: list, flushes: int) -> list:
+    durations = []
+    for flush in range(flushes):
+        payload = stats_payload(consumer, monitor_ids, flush)
+        started = time.perf_counter()
+        if send(payload) is None:
+            raise RuntimeError(f"Stats flush failed for {consumer}")
+        durations.append(time.perf_counter() - started)
+    return durations
+
+def bench_incidents(log, monitor_ids: list, count: int) -> list:
+    durations = []
+    for i in range(count):
+        started = time.perf_counter()
+        if not log(monitor_ids[i % len(monitor_ids)], "DOWN" if i % 2 else "UP", MARKER):
+            raise RuntimeError("Incident write failed")
+        durations.append(time.perf_counter() - started)
+    return durations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--monitors", type=int, default=1000)
+    parser.add_argument("--flushes", type=int, default=50)
+    parser.add_argument("--incidents", type=int, default=200)
+    args = parser.parse_args()
+
+    writer = PostgresWriter(DATABASE_URL, 2)
+    with writer._transaction() as cur:
+        cur.execute("SELECT id FROM monitors ORDER BY id LIMIT %s", (args.monitors,))
+        monitor_ids = [row[0] for row in cur.fetchall()]
+    if not monitor_ids:
+        raise SystemExit("No monitors found; create some before benchmarking.")
+
+    consumer = f"{MARKER}-{os.getpid()}"
+    http_incident = lambda m, event_type, details: api_call_internal(
+        "POST", f"{USER_SERVICE_URL}/monitors/{m}/incidents",
+        {"event_type": event_type, "details": details}, defer=False
+    )
+    results = []
+    try:
+        results.append(("stats flush", "http", len(monitor_ids), bench_stats(
+            lambda payload: api_request_internal("POST", f"{USER_SERVICE_URL}/monitors/stats/bulk", payload),
+            f"{consumer}-http", monitor_ids, args.flushes)))
+        results.append(("stats flush", "postgres", len(monitor_ids), bench_stats(
+            writer.apply_stats, f"{consumer}-pg", monitor_ids, args.flushes)))
+        if args.incidents:
+            results.append(("incident", "http", 1, bench_incidents(http_incident, monitor_ids, args.incidents)))
+            results.append(("incident", "postgres", 1, bench_incidents(writer.log_incident, monitor_ids, args.incidents)))
+            batch = [(monitor_ids[i % len(monitor_ids)], "DOWN", MARKER) for i in range(args.incidents)]
+            started = time.perf_counter()
+            writer.log_incidents(batch)
+            results.append(("incidents x%d" % len(batch), "postgres", len(batch), [time.perf_counter() - started]))
+    finally:
+        with writer._transaction() as cur:
+            cur.execute("DELETE FROM incidents WHERE details = %s", (MARKER,))
+            cur.execute("DELETE FROM stats_checkpoints WHERE consumer LIKE %s", (f"{consumer}-%",))
+        writer.close()
+
+    print(f"{len(monitor_ids)} monitors per flush")
+    print(f"{'operation':>16} {'path':>9} {'ops':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'rows/s':>10}")
+    for operation, path, rows, durations in results:
+        r = summarize(durations, rows)
+        print(f"{operation:>16} {path:>9} {r['ops']:>6} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['rows_per_s']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import fakeredis
+import pytest
+
+@pytest.fixture
+def redis():
+    """A private in-memory Redis (with Lua scripting) per test."""
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+@pytest.fixture
+def fake_binary_redis():
+    """Like `redis`, but replies are bytes (for packed binary values)."""
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
@@ -0,0 +1,16 @@
+"""Runs the UI gateway's decoders (ui_service/server) under node, for parity tests."""
+import json
+import os
+import shutil
+import subprocess
+import pytest
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "ui_service", "server"))
+
+needs_node = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+def run_js(module: str, expression: str):
+    """Evaluate `expression` with the gateway module `module` bound to `m`; returns it decoded from JSON."""
+    path = json.dumps(os.path.join(SERVER_DIR, module))
+    script = f"const m = require({path}); console.log(JSON.stringify({expression}));"
+    return json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True).stdout)
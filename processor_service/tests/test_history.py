@@ -0,0 +1,69 @@
+import struct
+from app.services.history import HEADER, RECORD, HistoryRing, decode_history, pack_record
+from tests.gateway import needs_node, run_js
+
+def check(n, is_up=True):
+    return {"is_up": is_up, "latency_ms": 100 + n, "status_code": 200 if is_up else None}
+
+def append_all(ring, redis, checks):
+    pipe = redis.pipeline(transaction=False)
+    for n in checks:
+        ring.append(pipe, 1, check(n, n % 2 == 0), 1760000000 + n * 60)
+    pipe.execute()
+    return redis.get(ring.key(1))
+
+def test_record_round_trip():
+    """Test that a packed record decodes back, with latency capped to 16 bits."""
+    records = [
+        pack_record({"is_up": True, "latency_ms": 123.6, "status_code": 204}, 1760000000.9),
+        pack_record({"is_up": False, "timings": {"total_ms": 99999}, "latency_ms": 5}, 1760000060),
+    ]
+    blob = HEADER.pack(2, 2) + b"".join(records)
+
+    assert RECORD.size == 9
+    assert decode_history(blob) == [
+        {"timestamp": 1760000000, "latency_ms": 124, "status_code": 204, "is_up": True},
+        {"timestamp": 1760000060, "latency_ms": 0xFFFF, "status_code": None, "is_up": False},
+    ]
+
+def test_ring_before_wrapping(fake_binary_redis):
+    ring = HistoryRing(fake_binary_redis, 4)
+    blob = append_all(ring, fake_binary_redis, range(3))
+
+    assert len(blob) == HEADER.size + 3 * RECORD.size
+    assert [r["latency_ms"] for r in decode_history(blob)] == [100, 101, 102]
+
+def test_ring_wraps_at_capacity(fake_binary_redis):
+    """Test that the oldest records are overwritten and the rest stay in order."""
+    ring = HistoryRing(fake_binary_redis, 3)
+    blob = append_all(ring, fake_binary_redis, range(7))
+
+    assert len(blob) == HEADER.size + 3 * RECORD.size
+    assert HEADER.unpack_from(blob) == (1, 3)
+    assert [r["latency_ms"] for r in decode_history(blob)] == [104, 105, 106]
+    assert [r["is_up"] for r in decode_history(blob)] == [True, False, True]
+
+def test_ring_is_reset_when_its_capacity_changes(fake_binary_redis):
+    """Test that a ring written with another capacity is started over, not misread."""
+    append_all(HistoryRing(fake_binary_redis, 3), fake_binary_redis, range(5))
+
+    blob = append_all(HistoryRing(fake_binary_redis, 5), fake_binary_redis, [5, 6])
+    assert HEADER.unpack_from(blob) == (2, 5)
+    assert [r["latency_ms"] for r in decode_history(blob)] == [105, 106]
+
+def test_ring_in_the_old_layout_is_reset(fake_binary_redis):
+    """Test that a ring with a 4-byte header (no capacity) is ignored, then replaced."""
+    ring = HistoryRing(fake_binary_redis, 4)
+    old = struct.pack(">I", 1) + b"".join(pack_record(check(n), 1760000000 + n) for n in range(4))
+    fake_binary_redis.set(ring.key(1), old)
+    assert decode_history(old) == []
+
+    blob = append_all(ring, fake_binary_redis, [9])
+    assert [r["latency_ms"] for r in decode_history(blob)] == [109]
+
+@needs_node
+def test_gateway_decodes_rings_like_the_processor(fake_binary_redis):
+    ring = HistoryRing(fake_binary_redis, 3)
+    for blob in (append_all(ring, fake_binary_redis, range(2)), append_all(ring, fake_binary_redis, range(2, 7))):
+        decoded = run_js("history.js", f"m.decodeHistoryRing(Buffer.from('{blob.hex()}', 'hex'))")
+        assert decoded == decode_history(blob)
@@ -0,0 +1,94 @@
+import threading
+from app.services.offsets import OffsetTracker
+from app.services.workers import WorkerPool
+
+class FakeMessage:
+    def __init__(self, key, partition=0, offset=0):
+        self._key = key
+        self._partition = partition
+        self._offset = offset
+
+    def key(self):
+        return self._key
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+def test_commit_holds_at_lowest_unfinished_offset():
+    """Test that out-of-order completion only releases the contiguous prefix."""
+    tracker = OffsetTracker()
+    for offset in (10, 11, 12, 13):
+        tracker.track(0, offset)
+
+    tracker.done(0, 12, "c")
+    tracker.done(0, 11, "b")
+    assert tracker.release() == ({}, [])
+    assert tracker.pending() == 4
+
+    tracker.done(0, 10, "a")
+    positions, released = tracker.release()
+    assert positions == {0: 13}
+    assert released == [(0, 10, "a"), (0, 11, "b"), (0, 12, "c")]
+    assert tracker.pending() == 1
+
+def test_partitions_are_released_independently():
+    """Test that a slow partition does not hold back another one."""
+    tracker = OffsetTracker()
+    tracker.track(0, 5)
+    tracker.track(1, 7)
+    tracker.done(1, 7)
+
+    positions, _ = tracker.release()
+    assert positions == {1: 8}
+
+def test_forget_drops_revoked_partitions():
+    """Test that a revoked partition's offsets are neither pending nor released."""
+    tracker = OffsetTracker()
+    tracker.track(0, 1)
+    tracker.track(0, 2)
+    tracker.track(1, 1)
+    tracker.done(0, 2)
+
+    tracker.forget([0])
+    assert tracker.pending() == 1
+    tracker.done(1, 1)
+    positions, released = tracker.release()
+    assert positions == {1: 2}
+    assert released == [(1, 1, None)]
+
+def test_worker_pool_keeps_each_monitor_on_one_worker_in_order():
+    """Test that results of one monitor are handled by one thread, in consume order."""
+    seen = {}  # { key: [(thread name, sequence)] }
+    lock = threading.Lock()
+
+    def handler(messages):
+        for msg in messages:
+            with lock:
+                seen.setdefault(msg.key(), []).append((threading.current_thread().name, msg.offset()))
+
+    pool = WorkerPool(4, handler, queue_size=10)
+    pool.start()
+    try:
+        for batch in range(20):
+            pool.submit([FakeMessage(str(m).encode(), offset=batch * 100 + m) for m in range(50)])
+        pool.drain()
+    finally:
+        pool.stop()
+
+    assert len(seen) == 50
+    workers = set()
+    for key, handled in seen.items():
+        threads = {name for name, _ in handled}
+        assert len(threads) == 1
+        workers |= threads
+        offsets = [offset for _, offset in handled]
+        assert offsets == sorted(offsets) and len(offsets) == 20
+    assert len(workers) > 1
+
+def test_unkeyed_messages_are_routed_by_partition():
+    pool = WorkerPool(3, lambda messages: None, queue_size=1)
+    assert pool.route(FakeMessage(None, partition=4)) == 1
+    assert pool.route(FakeMessage(b"42")) == pool.route(FakeMessage(b"42", partition=2))
@@ -0,0 +1,63 @@
+import json
+import random
+from app.services import rollups
+from app.services.rollups import RESOLUTIONS, Rollups, bucket_location, sketch_bucket
+from tests.gateway import needs_node, run_js
+
+def test_minute_buckets_are_fields_of_an_hourly_hash(redis):
+    store = Rollups(redis)
+    pipe = redis.pipeline(transaction=False)
+    hour = 1760011200  # A multiple of 6 hours
+    store.record(pipe, 9, {"is_up": True, "latency_ms": 120}, hour + 125)
+    store.record(pipe, 9, {"is_up": False, "latency_ms": None}, hour + 130)
+    pipe.execute()
+
+    minutes = redis.hgetall(f"monitor:9:rollup:1m:{hour}")
+    assert minutes == {"2:n": "2", "2:up": "1", "2:sum": "120", f"2:b{sketch_bucket(120)}": "1"}
+    assert redis.hgetall(f"monitor:9:rollup:1h:{hour}")["0:n"] == "2"
+    assert redis.hgetall(f"monitor:9:rollup:1d:{hour // 86400 * 86400}")["n"] == "2"
+    assert len(redis.keys("monitor:9:rollup:*")) == 3
+
+def test_expiry_is_only_set_when_a_hash_is_created(redis):
+    store = Rollups(redis)
+    key, _ = bucket_location(9, RESOLUTIONS[0], 1760000400)
+    store.record(redis, 9, {"is_up": True, "latency_ms": 50}, 1760000400)
+    assert redis.ttl(key) == RESOLUTIONS[0][3] + 3600
+
+    redis.expire(key, 100)
+    store.record(redis, 9, {"is_up": True, "latency_ms": 50}, 1760000460)
+    assert redis.ttl(key) == 100
+
+@needs_node
+def test_ui_gateway_mirrors_the_rollup_layout():
+    """Test that the gateway's copies of the constants match, and it finds the same buckets."""
+    js = run_js("rollups.js", "{gamma: m.SKETCH_GAMMA, accuracy: m.SKETCH_RELATIVE_ACCURACY, resolutions: m.ROLLUP_RESOLUTIONS}")
+    assert js["accuracy"] == rollups.SKETCH_RELATIVE_ACCURACY
+    assert js["gamma"] == rollups.SKETCH_GAMMA
+    assert sorted(map(tuple, js["resolutions"])) == sorted(RESOLUTIONS)
+
+    for resolution in RESOLUTIONS:
+        name, width = resolution[:2]
+        for t in (1760000400, 1760003999, 1760086399 + width):
+            start = t // width * width
+            key, prefix = bucket_location(7, resolution, t)
+            js_resolution = json.dumps(list(resolution))
+            assert run_js("rollups.js", f"m.bucketLocation(7, {js_resolution}, {start})") == {"key": key, "prefix": prefix}
+
+@needs_node
+def test_quantiles_decoded_by_the_gateway_are_within_accuracy():
+    """Test sketch_bucket against the gateway's quantile math on a skewed sample."""
+    rng = random.Random(7)
+    latencies = [rng.lognormvariate(4.5, 0.8) for _ in range(5000)] + [0.4, 1.0, 15000.0]
+    sketch = {}
+    for latency in latencies:
+        sketch[sketch_bucket(latency)] = sketch.get(sketch_bucket(latency), 0) + 1
+
+    quantiles = (0.01, 0.5, 0.9, 0.95, 0.99, 1.0)
+    entries = json.dumps(sorted(sketch.items()))
+    decoded = run_js("rollups.js", f"{json.dumps(quantiles)}.map((q) => m.sketchQuantile(new Map({entries}), q))")
+
+    ordered = sorted(latencies)
+    for q, value in zip(quantiles, decoded):
+        exact = max(1.0, ordered[int(q * (len(ordered) - 1))])
+        assert abs(value - exact) <= exact * rollups.SKETCH_RELATIVE_ACCURACY + 0.05, q
@@ -0,0 +1,129 @@
+import time
+import pytest
+from app.services import api, processor_logic
+from app.services.state import StateCache, StateStore
+
+@pytest.fixture
+def store(redis):
+    return StateStore(redis, StateCache(max_entries=100, ttl=300))
+
+@pytest.fixture
+def transitions(redis, store, monkeypatch):
+    """handle_state_transition wired to a fake Redis; returns recorded incidents."""
+    incidents = []
+    monkeypatch.setattr(processor_logic, "redis_client", redis)
+    monkeypatch.setattr(processor_logic, "state_store", store)
+    monkeypatch.setattr(processor_logic, "alert_producer", None)
+    monkeypatch.setattr(processor_logic, "record_incidents", lambda batch: store_incidents(incidents, batch))
+    return incidents
+
+def store_incidents(incidents, batch):
+    incidents.extend((monitor_id, event_type) for monitor_id, event_type, _ in batch)
+    return len(batch)
+
+def result(is_up, at):
+    return {"url": "https://example.com", "is_up": is_up, "timestamp": at}
+
+def test_compare_and_set_claims_a_transition_once(store):
+    """Test that only the first of two identical claims wins."""
+    assert store.compare_and_set(1, None, "DOWN", 100.0) == (True, "DOWN")
+    assert store.compare_and_set(1, None, "DOWN", 101.0) == (False, "DOWN")
+    assert store.get(1) == "DOWN"
+
+def test_older_result_cannot_repeat_a_transition(store):
+    """Test the _at guard: a result no newer than the last transition is refused."""
+    assert store.compare_and_set(1, None, "DOWN", 100.0)[0]
+    assert store.compare_and_set(1, "DOWN", "UP", 200.0)[0]
+    # A replayed DOWN from before the recovery must not flip the state back
+    assert store.compare_and_set(1, "UP", "DOWN", 150.0) == (False, "UP")
+    assert store.compare_and_set(1, "UP", "DOWN", 200.0) == (False, "UP")
+    assert store.compare_and_set(1, "UP", "DOWN", 250.0) == (True, "DOWN")
+
+def test_stale_cache_is_retried_against_redis(redis, store, transitions):
+    """Test that a transition still fires when the cached state no longer matches Redis."""
+    processor_logic.handle_state_transition(1, False, result(False, "2026-10-17T10:00:00"))
+    assert transitions == [(1, "DOWN")]
+
+    # Redis lost the state (flush/failover) while the cache still says DOWN
+    redis.delete(store.key(1))
+    processor_logic.handle_state_transition(1, True, result(True, "2026-10-17T10:01:00"))
+
+    assert transitions == [(1, "DOWN"), (1, "UP")]
+    assert redis.get(store.key(1)) == "UP"
+    assert store.cache.get(1) == "UP"
+
+def test_claim_is_released_when_the_incident_is_not_stored(redis, store, transitions, monkeypatch):
+    """Test that a failed incident write undoes the claim so the next result retries."""
+    processor_logic.handle_state_transition(1, True, result(True, "2026-10-17T10:00:00"))
+    monkeypatch.setattr(processor_logic, "record_incidents", lambda batch: 0)
+
+    processor_logic.handle_state_transition(1, False, result(False, "2026-10-17T10:01:00"))
+    assert redis.get(store.key(1)) == "UP"
+
+    monkeypatch.setattr(processor_logic, "record_incidents", lambda batch: store_incidents(transitions, batch))
+    processor_logic.handle_state_transition(1, False, result(False, "2026-10-17T10:02:00"))
+    assert redis.get(store.key(1)) == "DOWN"
+    assert transitions == [(1, "UP"), (1, "DOWN")]
+
+def test_incidents_are_never_deferred_in_memory(monkeypatch):
+    """Test that an incident the User Service did not store is reported as not stored."""
+    calls = []
+    monkeypatch.setattr(processor_logic, "pg_writer", None)
+    monkeypatch.setattr(api.internal_api, "_send", lambda *args: calls.append(args) or (False, None, True, True))
+
+    assert processor_logic.record_incidents([(1, "DOWN", "timeout"), (2, "DOWN", "timeout")]) == 0
+    assert len(calls) == 1
+    assert api.internal_api.stats()["retry_queue"] == 0
+
+def test_batch_is_recorded_in_one_write(redis, store, transitions, monkeypatch):
+    """Test that buffered transitions are stored with one call, then made final."""
+    writes = []
+    monkeypatch.setattr(processor_logic, "record_incidents",
+                        lambda batch: writes.append(batch) or store_incidents(transitions, batch))
+    batch = []
+    processor_logic.handle_state_transition(1, False, result(False, "2026-10-17T10:00:00"), batch)
+    processor_logic.handle_state_transition(2, False, result(False, "2026-10-17T10:00:00"), batch)
+    processor_logic.handle_state_transition(1, True, result(True, "2026-10-17T10:00:30"), batch)
+    assert transitions == []
+
+    assert processor_logic.record_transitions(batch)
+    assert len(writes) == 1
+    assert transitions == [(1, "DOWN"), (2, "DOWN"), (1, "UP")]
+
+def test_unstored_tail_of_a_batch_is_released(redis, store, transitions, monkeypatch):
+    """Test that only transitions whose incident was not stored give up their claims."""
+    processor_logic.handle_state_transition(1, True, result(True, "2026-10-17T10:00:00"))
+    processor_logic.handle_state_transition(2, True, result(True, "2026-10-17T10:00:00"))
+    monkeypatch.setattr(processor_logic, "record_incidents", lambda batch: 1)
+
+    batch = []
+    processor_logic.handle_state_transition(1, False, result(False, "2026-10-17T10:01:00"), batch)
+    processor_logic.handle_state_transition(2, False, result(False, "2026-10-17T10:01:00"), batch)
+    processor_logic.handle_state_transition(2, True, result(True, "2026-10-17T10:01:30"), batch)
+    processor_logic.handle_state_transition(1, True, result(True, "2026-10-17T10:01:30"), batch)
+
+    assert not processor_logic.record_transitions(batch)
+    # Monitor 1 went DOWN for good; its recovery and all of monitor 2 roll back
+    assert redis.get(store.key(1)) == "DOWN"
+    assert redis.get(store.key(2)) == "UP"
+
+def test_cache_evicts_least_recently_used():
+    """Test LRU eviction beyond max_entries."""
+    cache = StateCache(max_entries=2, ttl=300)
+    cache.set(1, "UP")
+    cache.set(2, "UP")
+    assert cache.get(1) == "UP"  # 2 is now the least recently used
+    cache.set(3, "DOWN")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "UP"
+    assert cache.get(3) == "DOWN"
+
+def test_cache_entries_expire(monkeypatch):
+    """Test that entries older than the TTL are treated as misses."""
+    cache = StateCache(max_entries=10, ttl=5)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.set(1, "UP")
+    monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+    assert cache.get(1) is None
@@ -0,0 +1,184 @@
+import threading
+import time
+from contextlib import contextmanager
+import pytest
+from app.services import pg_writer
+from app.services.offsets import AppliedWatermarks
+from app.services.pg_writer import PostgresWriter
+from app.services.stats_aggregator import StatsAggregator
+
+class FakeDatabase:
+    """The two tables apply_stats touches, behind a cursor-shaped interface."""
+
+    def __init__(self):
+        self.checkpoints = {}  # { (consumer, partition): offset }
+        self.uptime = {}  # { monitor_id: [total, up] }
+        self.available = True
+
+    def execute(self, sql, params):
+        if not self.available:
+            raise pg_writer.psycopg2.OperationalError("connection refused")
+        consumer = params[0]
+        partitions = params[1] if len(params) > 1 else None
+        self.rows = [
+            (p, offset) for (c, p), offset in self.checkpoints.items()
+            if c == consumer and (partitions is None or p in partitions)
+        ]
+
+    def fetchall(self):
+        return self.rows
+
+    def execute_values(self, cur, sql, rows, **kwargs):
+        if sql is pg_writer.UPSERT_UPTIME_SQL:
+            for monitor_id, total, up in rows:
+                counts = self.uptime.setdefault(monitor_id, [0, 0])
+                counts[0] += total
+                counts[1] += up
+        elif sql is pg_writer.UPSERT_CHECKPOINTS_SQL:
+            for consumer, partition, offset in rows:
+                self.checkpoints[(consumer, partition)] = offset
+
+class FakeWriter(PostgresWriter):
+    """PostgresWriter over a FakeDatabase; `lose_responses` drops replies after the commit."""
+
+    def __init__(self, db):
+        self._lock = threading.Lock()
+        self.statements = 0
+        self.errors = 0
+        self.db = db
+        self.payloads = []
+        self.lose_responses = 0
+
+    @contextmanager
+    def _transaction(self):
+        yield self.db
+
+    def apply_stats(self, payload):
+        self.payloads.append(payload)
+        result = super().apply_stats(payload)
+        if result is not None and self.lose_responses:
+            self.lose_responses -= 1
+            return None
+        return result
+
+class FakeConsumer:
+    def __init__(self):
+        self.assigned, self.paused, self.resumed = [], [], []
+
+    def assign(self, partitions):
+        self.assigned.extend(partitions)
+
+    def pause(self, partitions):
+        self.paused.extend(partitions)
+
+    def resume(self, partitions):
+        self.resumed.extend(partitions)
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(pg_writer, "execute_values", db.execute_values)
+    return db
+
+@pytest.fixture
+def writer(db):
+    return FakeWriter(db)
+
+@pytest.fixture
+def aggregator(writer):
+    aggregator = StatsAggregator("processor", flush_seconds=5, writer=writer)
+    assert aggregator.load_checkpoints()
+    return aggregator
+
+def segments(payload):
+    return [(s["partition"], s["from_offset"], s["to_offset"]) for s in payload["partitions"]]
+
+def test_unsent_segments_are_resent_first_in_offset_order(aggregator, writer, db):
+    """Test that a failed flush is kept as its own segment and goes out before newer counts."""
+    for offset in range(0, 5):
+        aggregator.add(0, offset, 1, True)
+    db.available = False
+    assert not aggregator.flush()
+
+    for offset in range(5, 8):
+        aggregator.add(0, offset, 1, offset != 7)
+    db.available = True
+    assert aggregator.flush()
+
+    assert segments(writer.payloads[-1]) == [(0, 0, 4), (0, 5, 7)]
+    assert db.uptime == {1: [8, 7]}
+    assert db.checkpoints == {("processor", 0): 7}
+    assert aggregator.stats()["unsent_segments"] == 0
+
+def test_lost_response_then_retry_counts_once(aggregator, writer, db):
+    """Test that a flush applied but not acknowledged is skipped as a duplicate on retry."""
+    for offset in range(10):
+        aggregator.add(0, offset, 1, True)
+    writer.lose_responses = 1
+    assert not aggregator.flush()
+    assert db.uptime == {1: [10, 10]}
+
+    aggregator.add(0, 10, 1, False)
+    assert aggregator.flush()
+    assert db.uptime == {1: [11, 10]}
+    assert aggregator.checkpoint(0) == 10
+
+def test_replayed_messages_below_checkpoint_are_skipped(aggregator):
+    aggregator.add(0, 3, 1, True)
+    assert aggregator.flush()
+
+    aggregator.add(0, 3, 1, True)
+    assert aggregator.skipped == 1
+    assert aggregator.stats()["pending_monitors"] == 0
+
+def test_straddling_segment_is_rejected(aggregator, db):
+    """Test that a segment overlapping another consumer's checkpoint is not counted."""
+    for offset in range(5, 13):
+        aggregator.add(0, offset, 1, True)
+    # Meanwhile the partition's new owner counted up to offset 8
+    db.checkpoints[("processor", 0)] = 8
+
+    assert aggregator.flush()
+    assert db.uptime == {}
+    assert aggregator.checkpoint(0) == 8
+
+def test_partitions_are_paused_until_checkpoints_load(writer, db, monkeypatch):
+    """Test that an assignment without checkpoints is paused, then resumed once they load."""
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    aggregator = StatsAggregator("processor", flush_seconds=5, writer=writer)
+    consumer = FakeConsumer()
+
+    db.available = False
+    aggregator.on_assign(consumer, ["tp0", "tp1"])
+    assert consumer.assigned == consumer.paused == ["tp0", "tp1"]
+    assert aggregator.stats()["paused_partitions"] == 2
+
+    db.available = True
+    aggregator.retry_checkpoints(consumer)
+    assert consumer.resumed == []  # Not due yet
+
+    clock[0] += 60
+    aggregator.retry_checkpoints(consumer)
+    assert consumer.resumed == ["tp0", "tp1"]
+    assert aggregator.stats()["paused_partitions"] == 0
+
+def test_assignment_with_checkpoints_is_left_to_the_consumer(aggregator):
+    consumer = FakeConsumer()
+    aggregator.on_assign(consumer, ["tp0"])
+    assert consumer.assigned == consumer.paused == []
+
+def test_applied_watermarks_cover_offsets_up_to_the_saved_position(redis):
+    """Test that a restarted processor recognises results it already applied."""
+    AppliedWatermarks(redis, "processor:applied").save({0: 10, 1: 3})
+
+    applied = AppliedWatermarks(redis, "processor:applied")
+    applied.load([0, 1, 2])
+    assert applied.covers(0, 9)
+    assert not applied.covers(0, 10)
+    assert applied.covers(1, 2)
+    assert not applied.covers(2, 0)
+    assert applied.replayed == 2
+
+    applied.forget([0])
+    assert not applied.covers(0, 9)
@@ -0,0 +1,37 @@
+// Decoding of the packed check history written by the Processor.
+//
+// Source of truth: processor_service/app/services/history.py (HEADER, RECORD
+// and decode_history); processor_service/tests/test_history.py checks this
+// decoder against it.
+
+// Header: next slot to write and capacity (uint32 each, big-endian)
+const RING_HEADER_SIZE = 8;
+// Record: epoch seconds (uint32), latency ms (uint16), status (uint16), flags (uint8)
+const RING_RECORD_SIZE = 9;
+
+/**
+ * Decode a history ring buffer into check records, oldest first.
+ */
+const decodeHistoryRing = (blob) => {
+    if (!blob || blob.length < RING_HEADER_SIZE) return [];
+    const head = blob.readUInt32BE(0);
+    const capacity = blob.readUInt32BE(4);
+    const written = Math.floor((blob.length - RING_HEADER_SIZE) / RING_RECORD_SIZE);
+    // Until the ring wraps, the next slot is always the first unwritten one
+    if (!(written === capacity || (written < capacity && head === written))) return [];
+    const records = [];
+    for (let i = 0; i < written; i++) {
+        const offset = RING_HEADER_SIZE + ((head + i) % written) * RING_RECORD_SIZE;
+        const timestamp = blob.readUInt32BE(offset);
+        if (timestamp === 0) continue;
+        records.push({
+            timestamp,
+            latency_ms: blob.readUInt16BE(offset + 4),
+            status_code: blob.readUInt16BE(offset + 6) || null,
+            is_up: (blob.readUInt8(offset + 8) & 1) === 1
+        });
+    }
+    return records;
+};
+
+module.exports = { decodeHistoryRing };
@@ -3,6 +3,8 @@ const redis = require('redis');
 const axios = require('axios');
 const cors = require('cors');
 const path = require('path');
+const { decodeHistoryRing } = require('./history');
+const { ROLLUP_RESOLUTIONS, bucketLocation, bucketFields, mergeRollups, summarize } = require('./rollups');
 
 const app = express();
 const port = process.env.PORT || 3000;
@@ -20,6 +22,8 @@ app.use(express.json());
 const client = redis.createClient({ url: REDIS_URL });
 client.on('error', (err) => console.log('Redis Client Error', err));
 client.connect();
+// Same connection, but replies come back as Buffers (for packed binary values)
+const binaryClient = client.withTypeMapping({ [redis.RESP_TYPES.BLOB_STRING]: Buffer });
 
 app.get('/health', (req, res) => {
     res.json({ status: 'healthy', service: 'ui_gateway' });
@@ -73,6 +77,7 @@ app.delete('/api/monitors/:id', async (req, res) => {
         await Promise.all([
             client.del(`monitor:${id}:status`),
             client.del(`monitor:${id}:history`),
+            client.del(`monitor:${id}:ring`),
             client.del(`monitor:${id}:last_logged_state`)
         ]);
 
@@ -105,6 +110,78 @@ app.get('/api/history/:id', async (req, res) => {
     }
 });
 
+// --- Packed check history (written by the Processor) ---
+
+/**
+ * Per-check history (up to a day), optionally limited to ?since=<epoch seconds>.
+ */
+app.get('/api/checks/:id', async (req, res) => {
+    const since = Number(req.query.since) || 0;
+    try {
+        const blob = await binaryClient.get(`monitor:${req.params.id}:ring`);
+        res.json(decodeHistoryRing(blob).filter((record) => record.timestamp >= since));
+    } catch (error) {
+        console.error('Error fetching check history from Redis:', error.message);
+        res.status(500).json({ error: 'Failed to fetch check history' });
+    }
+});
+
+// --- Long-window rollups (written by the Processor) ---
+
+const MAX_ROLLUP_BUCKETS = 400;
+
+const parseWindow = (value) => {
+    const match = /^(\d+)([mhd])$/.exec(value || '24h');
+    if (!match) return null;
+    return Number(match[1]) * { m: 60, h: 3600, d: 86400 }[match[2]];
+};
+
+/**
+ * Uptime and latency percentiles over a window such as 1h, 24h, 7d or 90d.
+ * The finest resolution that keeps the window within MAX_ROLLUP_BUCKETS is
+ * used, so even a year is a few hundred small hash reads.
+ */
+app.get('/api/rollups/:id', async (req, res) => {
+    const windowSeconds = parseWindow(req.query.window);
+    if (!windowSeconds) {
+        return res.status(400).json({ error: 'Invalid window. Use e.g. 60m, 24h or 30d.' });
+    }
+
+    const fitting = ROLLUP_RESOLUTIONS.filter(([, width, , retention]) =>
+        windowSeconds / width <= MAX_ROLLUP_BUCKETS && windowSeconds <= retention);
+    const resolution = fitting.length ? fitting[fitting.length - 1] : ROLLUP_RESOLUTIONS[0];
+    const width = resolution[1];
+
+    const now = Math.floor(Date.now() / 1000);
+    const first = Math.floor((now - windowSeconds) / width) * width;
+    const starts = [];
+    for (let t = first; t <= now; t += width) starts.push(t);
+
+    // Buckets share hashes (e.g. the minutes of an hour): read each hash once
+    const locations = starts.map((t) => bucketLocation(req.params.id, resolution, t));
+    const keys = [...new Set(locations.map(({ key }) => key))];
+
+    try {
+        const pipeline = client.multi();
+        keys.forEach((key) => pipeline.hGetAll(key));
+        const replies = await pipeline.execAsPipeline();
+        const hashes = new Map(keys.map((key, i) => [key, replies[i]]));
+        const buckets = locations.map(({ key, prefix }) => bucketFields(hashes.get(key), prefix));
+
+        res.json({
+            resolution: resolution[0],
+            window_seconds: windowSeconds,
+            ...summarize(mergeRollups(buckets)),
+            series: starts
+                .map((t, i) => ({ t, ...summarize(mergeRollups([buckets[i]])) }))
+                .filter((bucket) => bucket.checks > 0)
+        });
+    } catch (error) {
+        console.error('Error fetching rollups from Redis:', error.message);
+        res.status(500).json({ error: 'Failed to fetch rollups' });
+    }
+});
+
 // Serve static frontend assets
 app.use(express.static(path.join(__dirname, '../client/dist')));
 
@@ -0,0 +1,96 @@
+// Decoding of the long-window rollups written by the Processor.
+//
+// Source of truth: processor_service/app/services/rollups.py. The constants
+// below are copies of RESOLUTIONS and SKETCH_RELATIVE_ACCURACY there, and
+// processor_service/tests/test_rollups.py checks them (and the quantile
+// math) against it.
+
+const SKETCH_RELATIVE_ACCURACY = 0.01;
+const SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY);
+// Coarsest-first: [name, bucket seconds, buckets per hash, retention seconds]
+const ROLLUP_RESOLUTIONS = [
+    ['1d', 86400, 1, 400 * 86400],
+    ['1h', 3600, 6, 35 * 86400],
+    ['1m', 60, 60, 2 * 86400]
+];
+
+/**
+ * Hash key and field prefix of the bucket starting at `start`.
+ */
+const bucketLocation = (id, [name, width, slots], start) => {
+    const span = width * slots;
+    const hashStart = Math.floor(start / span) * span;
+    return {
+        key: `monitor:${id}:rollup:${name}:${hashStart}`,
+        prefix: slots > 1 ? `${(start - hashStart) / width}:` : ''
+    };
+};
+
+/**
+ * The fields of one bucket out of its hash, without the prefix.
+ */
+const bucketFields = (hash, prefix) => {
+    const fields = {};
+    for (const [field, value] of Object.entries(hash || {})) {
+        if (!prefix) {
+            fields[field] = value;
+        } else if (field.startsWith(prefix)) {
+            fields[field.slice(prefix.length)] = value;
+        }
+    }
+    return fields;
+};
+
+/**
+ * Merge buckets into totals plus a combined latency sketch.
+ */
+const mergeRollups = (buckets) => {
+    const merged = { n: 0, up: 0, sum: 0, sketch: new Map() };
+    for (const bucket of buckets) {
+        for (const [field, raw] of Object.entries(bucket || {})) {
+            const value = Number(raw);
+            if (field.startsWith('b')) {
+                const index = Number(field.slice(1));
+                merged.sketch.set(index, (merged.sketch.get(index) || 0) + value);
+            } else if (field in merged) {
+                merged[field] += value;
+            }
+        }
+    }
+    return merged;
+};
+
+const sketchQuantile = (sketch, q) => {
+    const indices = [...sketch.keys()].sort((a, b) => a - b);
+    const total = indices.reduce((acc, i) => acc + sketch.get(i), 0);
+    if (!total) return null;
+    const rank = q * (total - 1);
+    let seen = 0;
+    for (const i of indices) {
+        seen += sketch.get(i);
+        if (seen > rank) {
+            return Math.round((2 * Math.pow(SKETCH_GAMMA, i)) / (SKETCH_GAMMA + 1) * 10) / 10;
+        }
+    }
+    return null;
+};
+
+const summarize = (merged) => ({
+    checks: merged.n,
+    uptime_percent: merged.n ? Math.round((merged.up / merged.n) * 10000) / 100 : null,
+    avg_ms: merged.n ? Math.round((merged.sum / merged.n) * 10) / 10 : null,
+    p50_ms: sketchQuantile(merged.sketch, 0.5),
+    p95_ms: sketchQuantile(merged.sketch, 0.95),
+    p99_ms: sketchQuantile(merged.sketch, 0.99)
+});
+
+module.exports = {
+    SKETCH_RELATIVE_ACCURACY,
+    SKETCH_GAMMA,
+    ROLLUP_RESOLUTIONS,
+    bucketLocation,
+    bucketFields,
+    mergeRollups,
+    sketchQuantile,
+    summarize
+};
@@ -33,3 +33,7 @@ if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
         'pool_size': 10,
         'max_overflow': 20
     }
+
+# Delta sync of monitor definitions (consumed by the Pinger)
+SYNC_OVERLAP_SECONDS = int(os.environ.get('SYNC_OVERLAP_SECONDS', 5))
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', 7))
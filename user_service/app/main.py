@@ -6,15 +6,22 @@ import validators
 import time
 import os
 
-from app.models import db
+from sqlalchemy import text
+from app.models import db, SCHEMA_UPGRADES
 from app.models.user import User
-from app.models.monitor import Monitor, Incident, MonitorUptime
+from app.models.monitor import (
+    Monitor, Incident, MonitorUptime, MonitorTombstone, StatsCheckpoint,
+    PROBE_MODES, DEFAULT_MAX_BODY_BYTES
+)
 from app.services.auth import token_required, internal_only
+from app.services.stats import apply_uptime_deltas
 from app.config import (
     SQLALCHEMY_DATABASE_URI, 
     SQLALCHEMY_TRACK_MODIFICATIONS, 
     SQLALCHEMY_ENGINE_OPTIONS,
-    SECRET_KEY
+    SECRET_KEY,
+    SYNC_OVERLAP_SECONDS,
+    TOMBSTONE_RETENTION_DAYS
 )
 
 def create_app():
@@ -49,6 +56,7 @@ def init_db_with_retry():
         try:
             with app.app_context():
                 db.create_all()
+                apply_schema_upgrades()
                 app.logger.info("Database tables verified.")
                 return
         except Exception as e:
@@ -56,6 +64,20 @@ def init_db_with_retry():
             time.sleep(5)
     app.logger.error("FATAL: Could not establish database connection.")
 
+def apply_schema_upgrades():
+    """
+    Add columns introduced after a database was first created.
+
+    Statements are idempotent, so they are safe to run on every boot. They
+    use Postgres syntax; other databases (sqlite in development) are
+    created fresh by db.create_all() and need no upgrade.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for statement in SCHEMA_UPGRADES:
+        db.session.execute(text(statement))
+    db.session.commit()
+
 # --- API Endpoints ---
 
 @app.route('/health', methods=['GET'])
@@ -180,12 +202,24 @@ def create_monitor(current_user):
     interval = data.get('interval_seconds', 60)
     if not isinstance(interval, int) or not (10 <= interval <= 86400):
         return jsonify({'error': 'Interval must be between 10s and 24h.'}), 400
+
+    probe_mode = data.get('probe_mode', 'GET')
+    if probe_mode not in PROBE_MODES:
+        return jsonify({'error': f"Probe mode must be one of {', '.join(PROBE_MODES)}."}), 400
+
+    max_body_bytes = None
+    if probe_mode == 'GET_CAPPED':
+        max_body_bytes = data.get('max_body_bytes', DEFAULT_MAX_BODY_BYTES)
+        if not isinstance(max_body_bytes, int) or not (1 <= max_body_bytes <= 10 * 1024 * 1024):
+            return jsonify({'error': 'Body cap must be between 1 byte and 10MB.'}), 400
         
     try:
         new_monitor = Monitor(
             user_id=current_user.id,
             url=url,
-            interval_seconds=interval
+            interval_seconds=interval,
+            probe_mode=probe_mode,
+            max_body_bytes=max_body_bytes
         )
         db.session.add(new_monitor)
         db.session.flush() 
@@ -216,6 +250,8 @@ def list_monitors(current_user):
             "id": m.id, 
             "url": m.url, 
             "interval_seconds": m.interval_seconds, 
+            "probe_mode": m.probe_mode,
+            "max_body_bytes": m.max_body_bytes,
             "is_active": m.is_active,
             "uptime_percent": round(uptime, 2)
         })
@@ -249,15 +285,202 @@ def internal_update_stats(monitor_id):
         db.session.rollback()
         return jsonify({'error': f'Aggregation failure: {e}'}), 500
 
+@app.post('/monitors/stats/bulk')
+@internal_only
+def internal_bulk_update_stats():
+    """
+    Apply aggregated uptime counts from the Processor in one transaction.
+
+    Counts come in segments, each covering an offset range of one Kafka
+    partition; a partition may have several (e.g. a retried flush next to
+    newer counts). Segments are taken in offset order: one already covered
+    by the partition's checkpoint is a replay and is skipped, one that only
+    partly overlaps it was counted by another consumer and is rejected as a
+    conflict, and the rest are added with a single upsert while the
+    checkpoints advance in the same commit. The resulting checkpoints are
+    returned so the caller can skip what is already counted.
+    """
+    data = request.get_json()
+    if not data or not data.get('consumer') or not isinstance(data.get('partitions'), list):
+        return jsonify({'error': 'Consumer and partitions required.'}), 400
+
+    consumer = data['consumer']
+    try:
+        segments = sorted(
+            (
+                (int(p['partition']), int(p['from_offset']), int(p['to_offset']), p.get('stats', []))
+                for p in data['partitions']
+            ),
+            key=lambda segment: segment[:2]
+        )
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid partition payload.'}), 400
+
+    try:
+        # Row locks serialize concurrent flushes for the same partitions
+        checkpoints = {
+            c.partition: c for c in StatsCheckpoint.query.filter(
+                StatsCheckpoint.consumer == consumer,
+                StatsCheckpoint.partition.in_({segment[0] for segment in segments})
+            ).with_for_update().all()
+        }
+
+        deltas = {}
+        applied, duplicates, conflicts = [], [], []
+        for partition, from_offset, to_offset, stats in segments:
+            checkpoint = checkpoints.get(partition)
+            if checkpoint is not None and to_offset <= checkpoint.committed_offset:
+                duplicates.append(partition)
+                continue
+            if checkpoint is not None and from_offset <= checkpoint.committed_offset:
+                conflicts.append(partition)
+                continue
+
+            for row in stats:
+                total, up = deltas.get(row['monitor_id'], (0, 0))
+                deltas[row['monitor_id']] = (total + int(row['total']), up + int(row['up']))
+
+            if checkpoint is None:
+                checkpoint = StatsCheckpoint(consumer=consumer, partition=partition, committed_offset=to_offset)
+                db.session.add(checkpoint)
+                checkpoints[partition] = checkpoint
+            else:
+                checkpoint.committed_offset = to_offset
+            applied.append(partition)
+
+        monitors = apply_uptime_deltas(deltas)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Aggregation failure: {e}'}), 500
+
+    return jsonify({
+        'applied': applied,
+        'duplicates': duplicates,
+        'conflicts': conflicts,
+        'checkpoints': {str(p): c.committed_offset for p, c in checkpoints.items()},
+        'monitors_updated': monitors
+    }), 200
+
+@app.get('/monitors/stats/checkpoints')
+@internal_only
+def internal_get_stats_checkpoints():
+    """Last counted offset per partition, so a restarted Processor skips them."""
+    consumer = request.args.get('consumer')
+    if not consumer:
+        return jsonify({'error': 'Consumer required.'}), 400
+    checkpoints = StatsCheckpoint.query.filter_by(consumer=consumer).all()
+    return jsonify({str(c.partition): c.committed_offset for c in checkpoints}), 200
+
 @app.get('/all_monitors')
 @internal_only
 def internal_get_monitors():
     """Return all active monitors for the Pinger's scheduler."""
     monitors = Monitor.query.filter_by(is_active=True).all()
-    return jsonify([
-        {"id": m.id, "url": m.url, "interval_seconds": m.interval_seconds} 
-        for m in monitors
-    ]), 200
+    return jsonify([m.sync_payload() for m in monitors]), 200
+
+@app.get('/all_monitors/changes')
+@internal_only
+def internal_get_monitor_changes():
+    """
+    Delta feed of monitor definitions for the Pinger's incremental sync.
+
+    Without a cursor (or with one older than the tombstone retention) a full
+    snapshot of active monitors is returned. Otherwise only monitors updated
+    since the cursor are sent, plus tombstones for deleted ones. The window is
+    widened by a small overlap so rows committed late are not missed; consumers
+    apply changes idempotently.
+    """
+    since_raw = request.args.get('since')
+    since = None
+    if since_raw:
+        try:
+            since = dt.fromisoformat(since_raw)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor.'}), 400
+
+    retention_start = dt.utcnow() - datetime.timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    if since is None or since < retention_start:
+        monitors = Monitor.query.filter_by(is_active=True).all()
+        cursor = max((m.updated_at for m in monitors if m.updated_at), default=dt.utcnow())
+        return jsonify({
+            "full": True,
+            "cursor": cursor.isoformat(),
+            "monitors": [m.sync_payload() for m in monitors],
+            "deleted": []
+        }), 200
+
+    window_start = since - datetime.timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    changed = Monitor.query.filter(Monitor.updated_at > window_start).all()
+    tombstones = MonitorTombstone.query.filter(MonitorTombstone.deleted_at > window_start).all()
+
+    cursor = max(
+        [m.updated_at for m in changed if m.updated_at] + [t.deleted_at for t in tombstones] + [since]
+    )
+    return jsonify({
+        "full": False,
+        "cursor": cursor.isoformat(),
+        "monitors": [m.sync_payload() for m in changed],
+        "deleted": [t.monitor_id for t in tombstones]
+    }), 200
+
+@app.get('/notification_routes')
+@internal_only
+def internal_get_notification_routes():
+    """
+    Monitor -> owner -> channels feed for the Alert service's route cache.
+
+    Works like the monitor delta feed: without a cursor (or with an expired
+    one) every user with monitors and every monitor's owner is returned;
+    otherwise only users whose profile changed and monitors created or
+    updated since the cursor, plus tombstones for deleted monitors.
+    """
+    since_raw = request.args.get('since')
+    since = None
+    if since_raw:
+        try:
+            since = dt.fromisoformat(since_raw)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor.'}), 400
+
+    retention_start = dt.utcnow() - datetime.timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    if since is None or since < retention_start:
+        monitors = Monitor.query.with_entities(Monitor.id, Monitor.user_id, Monitor.updated_at).all()
+        users = User.query.filter(User.id.in_({m.user_id for m in monitors})).all()
+        cursor = max(
+            [m.updated_at for m in monitors if m.updated_at] + [u.updated_at for u in users if u.updated_at],
+            default=dt.utcnow()
+        )
+        return jsonify({
+            "full": True,
+            "cursor": cursor.isoformat(),
+            "users": [u.notification_route() for u in users],
+            "monitors": [{"id": m.id, "user_id": m.user_id} for m in monitors],
+            "deleted": []
+        }), 200
+
+    window_start = since - datetime.timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    users = User.query.filter(User.updated_at > window_start).all()
+    monitors = Monitor.query.with_entities(Monitor.id, Monitor.user_id, Monitor.updated_at).filter(
+        Monitor.updated_at > window_start
+    ).all()
+    tombstones = MonitorTombstone.query.filter(MonitorTombstone.deleted_at > window_start).all()
+
+    cursor = max(
+        [u.updated_at for u in users if u.updated_at] + [m.updated_at for m in monitors if m.updated_at]
+        + [t.deleted_at for t in tombstones] + [since]
+    )
+    # Owners of new monitors may predate the cursor
+    owner_ids = {m.user_id for m in monitors} - {u.id for u in users}
+    if owner_ids:
+        users += User.query.filter(User.id.in_(owner_ids)).all()
+    return jsonify({
+        "full": False,
+        "cursor": cursor.isoformat(),
+        "users": [u.notification_route() for u in users],
+        "monitors": [{"id": m.id, "user_id": m.user_id} for m in monitors],
+        "deleted": [t.monitor_id for t in tombstones]
+    }), 200
 
 @app.route('/monitors/<int:monitor_id>/incidents', methods=['POST'])
 @internal_only
@@ -292,6 +515,10 @@ def delete_monitor(current_user, monitor_id):
             return jsonify({'error': 'Monitor not found.'}), 404
             
         db.session.delete(monitor)
+        # Tombstone lets delta syncs drop the monitor; prune expired ones on the way
+        db.session.add(MonitorTombstone(monitor_id=monitor_id))
+        retention_start = dt.utcnow() - datetime.timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        MonitorTombstone.query.filter(MonitorTombstone.deleted_at < retention_start).delete()
         db.session.commit()
         return jsonify({'message': 'Monitor and history purged.'}), 200
     except Exception:
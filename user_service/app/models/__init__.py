@@ -3,3 +3,16 @@ from flask_sqlalchemy import SQLAlchemy
 # Global database object. 
 # Initialize without an app to avoid circular imports.
 db = SQLAlchemy()
+
+# Additive changes for databases created before a column existed.
+# db.create_all() only creates missing tables, never missing columns.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE monitors ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP",
+    "UPDATE monitors SET updated_at = created_at WHERE updated_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_monitors_updated_at ON monitors (updated_at)",
+    "ALTER TABLE monitors ADD COLUMN IF NOT EXISTS probe_mode VARCHAR(16) NOT NULL DEFAULT 'GET'",
+    "ALTER TABLE monitors ADD COLUMN IF NOT EXISTS max_body_bytes INTEGER",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP",
+    "UPDATE users SET updated_at = created_at WHERE updated_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_users_updated_at ON users (updated_at)",
+]
@@ -1,6 +1,14 @@
 from datetime import datetime as dt
 from app.models import db
 
+# How the Pinger probes a target:
+# - GET: full GET, whole body downloaded (default)
+# - HEAD: HEAD request, no body
+# - GET_HEADERS: GET, connection closed as soon as headers arrive
+# - GET_CAPPED: GET, body read up to max_body_bytes
+PROBE_MODES = ('GET', 'HEAD', 'GET_HEADERS', 'GET_CAPPED')
+DEFAULT_MAX_BODY_BYTES = 65536
+
 class Monitor(db.Model):
     """
     Represents a web target being monitored.
@@ -15,11 +23,39 @@ class Monitor(db.Model):
     interval_seconds = db.Column(db.Integer, default=60, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=dt.utcnow)
+    # Probe strategy and body cap (GET_CAPPED only), see PROBE_MODES
+    probe_mode = db.Column(db.String(16), default='GET', nullable=False)
+    max_body_bytes = db.Column(db.Integer)
+    # Change tracking for the Pinger's delta sync (indexed cursor column)
+    updated_at = db.Column(db.DateTime, default=dt.utcnow, onupdate=dt.utcnow, index=True)
     
     # Relationships with cascading delete to ensure no orphaned data remains
     incidents = db.relationship('Incident', backref='monitor', lazy=True, cascade="all, delete-orphan")
     uptime_stats = db.relationship('MonitorUptime', backref='monitor', uselist=False, cascade="all, delete-orphan")
 
+    def sync_payload(self) -> dict:
+        """Definition sent to the Pinger's scheduler."""
+        return {
+            "id": self.id,
+            "url": self.url,
+            "interval_seconds": self.interval_seconds,
+            "is_active": bool(self.is_active),
+            "probe_mode": self.probe_mode or 'GET',
+            "max_body_bytes": self.max_body_bytes
+        }
+
+class MonitorTombstone(db.Model):
+    """
+    Marks a deleted monitor so delta syncs can tell consumers to drop it.
+
+    The monitor row itself is gone, so no foreign key is kept. Tombstones are
+    pruned after a retention window; older cursors fall back to a full sync.
+    """
+    __tablename__ = 'monitor_tombstones'
+    id = db.Column(db.Integer, primary_key=True)
+    monitor_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=dt.utcnow, index=True)
+
 class Incident(db.Model):
     """
     Logs state change events (UP/DOWN).
@@ -47,3 +83,16 @@ class MonitorUptime(db.Model):
     total_checks = db.Column(db.Integer, default=0)
     up_checks = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.DateTime, default=dt.utcnow)
+
+class StatsCheckpoint(db.Model):
+    """
+    Highest Kafka offset per partition already counted in the uptime stats.
+
+    Bulk flushes from the Processor carry the offset range they cover, so a
+    flush replayed after a crash or retry is recognised and not counted twice.
+    """
+    __tablename__ = 'stats_checkpoints'
+    consumer = db.Column(db.String(100), primary_key=True)
+    partition = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    committed_offset = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(db.DateTime, default=dt.utcnow, onupdate=dt.utcnow)
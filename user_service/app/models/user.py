@@ -20,6 +20,8 @@ class User(db.Model):
     slack_webhook_url = db.Column(db.String(512))
     
     created_at = db.Column(db.DateTime, default=dt.utcnow)
+    # Change tracking for the Alert service's route cache (indexed cursor column)
+    updated_at = db.Column(db.DateTime, default=dt.utcnow, onupdate=dt.utcnow, index=True)
     monitors = db.relationship('Monitor', backref='owner', lazy=True)
 
     def set_password(self, password: str):
@@ -38,3 +40,11 @@ class User(db.Model):
         Using bcrypt's checkpw avoids timing attacks by using constant-time comparison.
         """
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+
+    def notification_route(self) -> dict:
+        """Channels the Alert service delivers this user's alerts to."""
+        return {
+            "user_id": self.id,
+            "slack_webhook_url": self.slack_webhook_url or None,
+            "email": self.notification_email or self.email
+        }
@@ -0,0 +1,39 @@
+from datetime import datetime as dt
+from sqlalchemy import text
+from app.models import db
+
+# Portable across Postgres and SQLite (tests). The join drops monitors deleted
+# since the checks ran; SQLite needs the WHERE to parse an upsert after a join.
+UPSERT_UPTIME_SQL = """
+WITH deltas (monitor_id, total, up) AS (VALUES {rows})
+INSERT INTO monitor_uptime_stats (monitor_id, total_checks, up_checks, last_updated)
+SELECT deltas.monitor_id, deltas.total, deltas.up, :now
+FROM deltas JOIN monitors ON monitors.id = deltas.monitor_id
+WHERE true
+ON CONFLICT (monitor_id) DO UPDATE SET
+    total_checks = COALESCE(monitor_uptime_stats.total_checks, 0) + excluded.total_checks,
+    up_checks = COALESCE(monitor_uptime_stats.up_checks, 0) + excluded.up_checks,
+    last_updated = excluded.last_updated
+"""
+
+def apply_uptime_deltas(deltas: dict) -> int:
+    """
+    Add check counts to the uptime counters in a single set-based upsert.
+
+    `deltas` maps monitor_id -> (total, up). Counters are incremented inside
+    the database, so concurrent writers cannot lose updates. Returns the
+    number of monitors in the statement; the caller commits.
+    """
+    if not deltas:
+        return 0
+
+    rows = []
+    params = {"now": dt.utcnow()}
+    for i, (monitor_id, (total, up)) in enumerate(deltas.items()):
+        rows.append(f"(:m{i}, :t{i}, :u{i})")
+        params[f"m{i}"] = int(monitor_id)
+        params[f"t{i}"] = int(total)
+        params[f"u{i}"] = int(up)
+
+    db.session.execute(text(UPSERT_UPTIME_SQL.format(rows=", ".join(rows))), params)
+    return len(deltas)
@@ -68,3 +68,107 @@ def test_internal_endpoint_authorized(client):
     headers = {'X-Internal-API-Key': 'test-internal-key-123'}
     response = client.get('/all_monitors', headers=headers)
     assert response.status_code == 200
+
+def auth_headers(client, username="syncuser"):
+    """Register and log in a user, returning bearer auth headers."""
+    client.post('/register', json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "securepassword123"
+    })
+    token = client.post('/login', json={"username": username, "password": "securepassword123"}).json['token']
+    return {'Authorization': f'Bearer {token}'}
+
+def test_monitor_changes_full_then_delta(client):
+    """Test the delta sync feed: full snapshot, then only changes and tombstones."""
+    internal = {'X-Internal-API-Key': 'test-internal-key-123'}
+    headers = auth_headers(client)
+    first_id = client.post('/monitors', json={"url": "https://example.com"}, headers=headers).json['id']
+
+    snapshot = client.get('/all_monitors/changes', headers=internal).json
+    assert snapshot['full'] is True
+    assert [m['id'] for m in snapshot['monitors']] == [first_id]
+
+    second_id = client.post('/monitors', json={"url": "https://example.org"}, headers=headers).json['id']
+    client.delete(f'/monitors/{first_id}', headers=headers)
+
+    delta = client.get('/all_monitors/changes', query_string={'since': snapshot['cursor']}, headers=internal).json
+    assert delta['full'] is False
+    assert second_id in [m['id'] for m in delta['monitors']]
+    assert delta['deleted'] == [first_id]
+    assert delta['cursor'] >= snapshot['cursor']
+
+def test_monitor_changes_invalid_cursor(client):
+    """Test that a malformed cursor is rejected."""
+    internal = {'X-Internal-API-Key': 'test-internal-key-123'}
+    response = client.get('/all_monitors/changes', query_string={'since': 'yesterday'}, headers=internal)
+    assert response.status_code == 400
+
+def test_monitor_probe_modes(client):
+    """Test probe mode validation and that the mode reaches the Pinger's feed."""
+    internal = {'X-Internal-API-Key': 'test-internal-key-123'}
+    headers = auth_headers(client, "probeuser")
+
+    bad = client.post('/monitors', json={"url": "https://example.com", "probe_mode": "OPTIONS"}, headers=headers)
+    assert bad.status_code == 400
+
+    capped = client.post('/monitors', json={
+        "url": "https://example.com", "probe_mode": "GET_CAPPED", "max_body_bytes": 1024
+    }, headers=headers)
+    assert capped.status_code == 201
+
+    feed = client.get('/all_monitors', headers=internal).json
+    assert feed[0]['probe_mode'] == 'GET_CAPPED'
+    assert feed[0]['max_body_bytes'] == 1024
+
+def test_bulk_stats_replay_is_not_double_counted(client):
+    """Test bulk stat flushes: applied once, replays skipped, overlaps rejected, segments in order."""
+    internal = {'X-Internal-API-Key': 'test-internal-key-123'}
+    headers = auth_headers(client, "statsuser")
+    monitor_id = client.post('/monitors', json={"url": "https://example.com"}, headers=headers).json['id']
+
+    flush = {"consumer": "processor", "partitions": [
+        {"partition": 0, "from_offset": 0, "to_offset": 9, "stats": [{"monitor_id": monitor_id, "total": 10, "up": 7}]}
+    ]}
+    first = client.post('/monitors/stats/bulk', json=flush, headers=internal)
+    assert first.json['applied'] == [0]
+
+    replay = client.post('/monitors/stats/bulk', json=flush, headers=internal)
+    assert replay.json['duplicates'] == [0]
+
+    overlap = {"consumer": "processor", "partitions": [
+        {"partition": 0, "from_offset": 5, "to_offset": 14, "stats": [{"monitor_id": monitor_id, "total": 10, "up": 10}]}
+    ]}
+    assert client.post('/monitors/stats/bulk', json=overlap, headers=internal).json['conflicts'] == [0]
+
+    checkpoints = client.get('/monitors/stats/checkpoints', query_string={'consumer': 'processor'}, headers=internal)
+    assert checkpoints.json == {"0": 9}
+
+    # A retried segment that was already counted does not hold back newer counts
+    retried = {"consumer": "processor", "partitions": [
+        {"partition": 0, "from_offset": 10, "to_offset": 19, "stats": [{"monitor_id": monitor_id, "total": 10, "up": 10}]},
+        {"partition": 0, "from_offset": 0, "to_offset": 9, "stats": [{"monitor_id": monitor_id, "total": 10, "up": 7}]}
+    ]}
+    result = client.post('/monitors/stats/bulk', json=retried, headers=internal).json
+    assert result['duplicates'] == [0] and result['applied'] == [0]
+    assert result['checkpoints'] == {"0": 19}
+
+    stats = client.get('/monitors', headers=headers).json[0]
+    assert stats['uptime_percent'] == 85.0
+
+def test_notification_routes_follow_profile_changes(client):
+    """Test the route feed: full snapshot, then changed profiles and new monitors."""
+    internal = {'X-Internal-API-Key': 'test-internal-key-123'}
+    headers = auth_headers(client, "routeuser")
+    first_id = client.post('/monitors', json={"url": "https://example.com"}, headers=headers).json['id']
+
+    snapshot = client.get('/notification_routes', headers=internal).json
+    assert snapshot['full'] is True
+    assert snapshot['monitors'] == [{"id": first_id, "user_id": snapshot['users'][0]['user_id']}]
+    assert snapshot['users'][0]['email'] == "routeuser@example.com"
+    assert snapshot['users'][0]['slack_webhook_url'] is None
+
+    client.put('/profile', json={"slack_webhook_url": "https://hooks.slack.com/services/T0/B0/x"}, headers=headers)
+    delta = client.get('/notification_routes', query_string={'since': snapshot['cursor']}, headers=internal).json
+    assert delta['full'] is False
+    assert delta['users'][0]['slack_webhook_url'] == "https://hooks.slack.com/services/T0/B0/x"